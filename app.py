@@ -1,67 +1,105 @@
-from flask import Flask, render_template, request, jsonify
+import os
+import sys
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 import requests
 import threading
 import time
-import json
-import websocket
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from account_mirror import get_account_mirror
+from endpoints import make_client
+from fanout import PriceFanout
+from latency import get_latency_metrics
+from market_data import create_market_data
+from risk import RiskRejected, get_risk_engine
+from stream_manager import get_stream_manager
+from symbol_registry import get_registry
+from tick_history import TickHistory
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'trading_bot_secret'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Shared exchange info, loaded from the disk snapshot when available
+symbol_registry = get_registry()
+symbol_registry.load_async()
+risk = get_risk_engine()
+
 # Real-time data
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
 prices = {}
+price_history = TickHistory()
+
+# Ticks are coalesced and pushed per client at this rate
+price_fanout = PriceFanout(socketio, 'price_update', rate_hz=float(os.getenv('FANOUT_RATE_HZ', 10)))
 balance_data = {'balance': 0, 'last_update': time.time()}
 
-# Live trading mode
+# Live trading mode: with API credentials the balance is mirrored from the user-data stream
 client = None
+account = None
 print("Initializing live trading system...")
 
-def on_message(ws, message):
+def on_price(symbol, price, event_time=None):
+    prices[symbol] = price
+    price_history.append(symbol, event_time or int(time.time() * 1000), price)
+    
+    # Marked dirty here, sent with the next fan-out flush
+    price_fanout.update(symbol, price)
+
+def on_message(stream, ticker):
     """Handle WebSocket price updates"""
     try:
-        data = json.loads(message)
-        symbol = data['s']
-        price = float(data['c'])
-        prices[symbol] = price
-        
-        # Emit to all connected clients
-        socketio.emit('price_update', {symbol: price})
+        on_price(ticker.symbol, ticker.price, ticker.event_time)
     except Exception as e:
         print(f"WebSocket message error: {e}")
 
-def on_error(ws, error):
-    print(f"WebSocket error: {error}")
-
-def on_close(ws, close_status_code, close_msg):
-    print("WebSocket connection closed")
-    # Reconnect after 5 seconds
-    time.sleep(5)
-    start_websocket()
-
 def start_websocket():
     """Start real-time price WebSocket"""
-    symbols = ['btcusdt', 'ethusdt', 'adausdt', 'solusdt']
-    streams = [f"{symbol}@ticker" for symbol in symbols]
-    stream_url = f"wss://stream.binance.com:9443/ws/{'/'.join(streams)}"
-    
-    ws = websocket.WebSocketApp(
-        stream_url,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
+    if os.getenv('MARKET_DATA_BACKEND') == 'board':
+        # Several workers: read the shared price board instead of opening a socket each
+        create_market_data(SYMBOLS, 'board').add_listener(on_price)
+        return
+    streams = [f"{symbol.lower()}@ticker" for symbol in SYMBOLS]
     
-    def run_ws():
-        ws.run_forever()
-    
-    ws_thread = threading.Thread(target=run_ws)
-    ws_thread.daemon = True
-    ws_thread.start()
+    # The shared stream manager owns the connection and its reconnects
+    get_stream_manager().subscribe(streams, on_message)
+
+def publish_balance(balance):
+    balance_data['balance'] = balance
+    balance_data['last_update'] = time.time()
+    socketio.emit('balance_update', {
+        'balance': f"${balance:.2f} USDT",
+        'timestamp': time.strftime('%H:%M:%S')
+    })
+
+def on_account_event(event):
+    # Pushed as the exchange reports it; no REST polling
+    if event.get('e') == 'ACCOUNT_UPDATE':
+        publish_balance(account.balance('USDT'))
+
+def start_account():
+    """Mirror the real account when BINANCE_API_KEY/BINANCE_API_SECRET are set"""
+    global client, account
+    api_key = os.getenv('BINANCE_API_KEY')
+    api_secret = os.getenv('BINANCE_API_SECRET')
+    if not api_key or not api_secret:
+        return False
+    try:
+        client = make_client(api_key, api_secret, testnet=True)
+        account = get_account_mirror(client)
+        account.add_listener(on_account_event)
+        account.start()
+        publish_balance(account.balance('USDT'))
+        return True
+    except Exception as e:
+        print(f"Account stream unavailable, simulating balance: {e}")
+        client = account = None
+        return False
 
 def fetch_live_balance():
-    """Fetch live balance updates"""
+    """Simulated balance for demo mode (no API credentials)"""
     import random
     live_balance = 1000.00
     
@@ -82,13 +120,7 @@ def fetch_live_balance():
             elif live_balance > 1200:
                 live_balance = 1000.00
             
-            balance_data['balance'] = live_balance
-            balance_data['last_update'] = time.time()
-            
-            socketio.emit('balance_update', {
-                'balance': f"${live_balance:.2f} USDT",
-                'timestamp': time.strftime('%H:%M:%S')
-            })
+            publish_balance(live_balance)
             
             time.sleep(3)  # Update every 3 seconds
         except Exception as e:
@@ -97,9 +129,11 @@ def fetch_live_balance():
 
 # Start real-time WebSocket and live balance
 start_websocket()
-balance_thread = threading.Thread(target=fetch_live_balance)
-balance_thread.daemon = True
-balance_thread.start()
+price_fanout.start()
+if not start_account():
+    balance_thread = threading.Thread(target=fetch_live_balance)
+    balance_thread.daemon = True
+    balance_thread.start()
 
 @app.route('/')
 def index():
@@ -117,10 +151,32 @@ def get_balance():
 def get_prices():
     return jsonify(prices)
 
+@app.route('/metrics')
+def get_metrics():
+    # Stage latency histograms; ?format=prometheus for scrapers
+    if request.args.get('format') == 'prometheus':
+        return Response(get_latency_metrics().prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(get_latency_metrics().snapshot())
+
+@app.route('/api/history/<symbol>')
+def get_history(symbol):
+    bar_seconds = request.args.get('bar', 60, type=int)
+    if bar_seconds <= 0:
+        return jsonify({'status': 'error', 'message': 'bar must be a positive number of seconds'}), 400
+    return jsonify(price_history.ohlcv(symbol.upper(), bar_seconds * 1000))
+
 @app.route('/api/order', methods=['POST'])
 def place_order():
     data = request.json
     current_price = prices.get(data['symbol'], 0)
+    if symbol_registry.loaded:
+        try:
+            # Filters, price band and limits are checked before anything is sent
+            checked = risk.check({'symbol': data['symbol'], 'side': data['side'], 'type': 'MARKET',
+                                  'quantity': data['quantity']}, last_price=current_price)
+        except RiskRejected as e:
+            return jsonify({"status": "error", "message": f"❌ Rejected: {e}"})
+        data['quantity'] = checked['quantity']
     
     if not client:
         # Demo mode
@@ -148,9 +204,20 @@ def handle_connect():
     print('Client connected')
     emit('price_update', prices)
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    symbols = [s.upper() for s in data.get('symbols', [])]
+    price_fanout.subscribe(request.sid, symbols)
+    emit('price_update', {s: prices[s] for s in symbols if s in prices})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    price_fanout.unsubscribe(request.sid, [s.upper() for s in data.get('symbols', [])])
+
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    price_fanout.remove_client(request.sid)
 
 if __name__ == '__main__':
     socketio.run(app, debug=True, port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Messages/sec per tick decoder backend on recorded combined-stream payloads
+(ticker, trade and depth frames).
+
+    python benchmarks/bench_decoders.py --rounds 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tick_decoder import TickDecoder, available_backends
+
+PAYLOADS = os.path.join(os.path.dirname(__file__), 'data', 'stream_payloads.jsonl')
+
+
+def load_payloads(path=PAYLOADS):
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def bench(decode, payloads, rounds, repeats=5):
+    """Best of ``repeats`` timed passes, to keep scheduler noise out of the numbers"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in payloads:
+                decode(message)
+        best = min(best, time.perf_counter() - start)
+    return len(payloads) * rounds / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tick decoder throughput benchmark')
+    parser.add_argument('--rounds', type=int, default=20, help='Passes over the recorded payloads per repeat')
+    args = parser.parse_args()
+
+    payloads = load_payloads()
+    print(f"{len(payloads)} recorded frames x {args.rounds} rounds")
+
+    # Baseline: what the old on_message handlers did (json.loads into a dict)
+    rate = bench(json.loads, payloads, args.rounds)
+    print(f"{'json.loads (dict)':<22}{rate:>14,.0f} msg/sec")
+
+    for backend in available_backends():
+        rate = bench(TickDecoder(backend).decode, payloads, args.rounds)
+        print(f"{backend + ' -> records':<22}{rate:>14,.0f} msg/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Orders/sec through OrderGateway against a local mock order endpoint, and
+grid deployment time through the batch endpoint.
+
+    python benchmarks/bench_gateway.py --orders 2000 --latency-ms 5 --grid-levels 100
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from order_gateway import OrderGateway
+
+
+def start_mock_endpoint(latency_ms):
+    """Serve the order and batch endpoints on a random local port; returns the base URL"""
+    order_ids = itertools.count(1)
+    ready = threading.Event()
+    address = {}
+
+    async def create_order(request):
+        form = await request.post()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return web.json_response({
+            'orderId': next(order_ids),
+            'symbol': form['symbol'],
+            'status': 'NEW',
+            'executedQty': '0'
+        })
+
+    async def batch_orders(request):
+        form = await request.post()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return web.json_response([
+            {'orderId': next(order_ids), 'symbol': order['symbol'], 'status': 'NEW', 'price': order['price']}
+            for order in json.loads(form['batchOrders'])
+        ])
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post('/fapi/v1/order', create_order)
+        app.router.add_post('/fapi/v1/batchOrders', batch_orders)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        address['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.daemon = True
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop)
+    ready.wait()
+    return f"http://127.0.0.1:{address['port']}/fapi"
+
+
+def order_params(i):
+    return dict(symbol='BTCUSDT', side='BUY', type='LIMIT', timeInForce='GTC',
+                quantity=0.001, price=50000 + i % 100)
+
+
+def run_serial(gateway, count):
+    start = time.perf_counter()
+    for i in range(count):
+        gateway.create_order(**order_params(i))
+    return count / (time.perf_counter() - start)
+
+
+def run_concurrent(gateway, count):
+    start = time.perf_counter()
+    futures = [gateway.submit_order(**order_params(i)) for i in range(count)]
+    for future in futures:
+        future.result()
+    return count / (time.perf_counter() - start)
+
+
+def run_grid(gateway, levels):
+    """Seconds to deploy a grid: one call per level vs batched and concurrent"""
+    orders = [order_params(i) for i in range(levels)]
+    start = time.perf_counter()
+    for order in orders:
+        gateway.create_order(**order)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = gateway.place_orders(orders)
+    batched = time.perf_counter() - start
+    assert all('orderId' in r for r in results)
+    return serial, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OrderGateway throughput benchmark')
+    parser.add_argument('--orders', type=int, default=1000, help='Orders per run')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated exchange latency')
+    parser.add_argument('--pool-size', type=int, default=50, help='Keep-alive connections')
+    parser.add_argument('--grid-levels', type=int, default=100, help='Levels in the grid deployment run')
+    args = parser.parse_args()
+
+    base_url = start_mock_endpoint(args.latency_ms)
+    gateway = OrderGateway('bench-key', 'bench-secret', base_url, pool_size=args.pool_size)
+    gateway.create_order(**order_params(0))  # warm the connection pool
+
+    serial = run_serial(gateway, min(args.orders, 200))
+    concurrent = run_concurrent(gateway, args.orders)
+    grid_serial, grid_batched = run_grid(gateway, args.grid_levels)
+    gateway.close()
+
+    print(f"Mock latency: {args.latency_ms}ms, pool size: {args.pool_size}")
+    print(f"Serial (one in flight):     {serial:10.1f} orders/sec")
+    print(f"Concurrent (pooled):        {concurrent:10.1f} orders/sec")
+    print(f"Speedup:                    {concurrent / serial:10.1f}x")
+    print(f"Grid of {args.grid_levels} levels, serial:  {grid_serial * 1000:8.1f} ms")
+    print(f"Grid of {args.grid_levels} levels, batched: {grid_batched * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
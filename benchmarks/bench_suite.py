@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite against the local mock exchange, with results
+written as JSON so runs can be compared.
+
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --output after.json --compare before.json
+
+Sections (select with --only):
+  orders   BasicBot order latency (p50/p99, one at a time) and throughput (many in flight)
+  ingest   RealTimeBot.on_message records/sec for tickers, trades and depth diffs
+  fanout   tick-to-browser latency through app.py and live_demo.py Socket.IO emits
+  deploy   GridOrder and TWAPOrder deployment time
+  triggers TriggerEngine ticks/sec and per-tick latency with many pending triggers (in-process)
+
+The mock exchange runs in a subprocess so it does not share the GIL with the
+code being measured.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from mock_exchange import DEFAULT_SYMBOLS, MockExchange
+from tick_decoder import DepthUpdate, Ticker, Trade, TickDecoder
+
+SECTIONS = ('orders', 'ingest', 'fanout', 'deploy', 'triggers')
+API_KEY = 'bench-key'
+API_SECRET = 'bench-secret'
+
+
+def start_mock(port, latency_ms):
+    """Run src/mock_exchange.py in a subprocess and wait until it answers"""
+    process = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'src', 'mock_exchange.py'),
+        '--port', str(port), '--latency-ms', str(latency_ms), '--seed', '1',
+        '--weight-limit', str(10 ** 9), '--order-limit', str(10 ** 9),
+        '--tick-ms', '20', '--ticker-ms', '100'
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/fapi/v1/ping", timeout=1).raise_for_status()
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Mock exchange did not start on port {port}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def latency_stats(seconds):
+    ms = np.asarray(seconds) * 1000
+    if not len(ms):
+        return {'samples': 0}
+    return {
+        'samples': len(ms),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+        'max_ms': round(float(ms.max()), 3)
+    }
+
+
+def quiet_console():
+    # Keep the bots' file logging (part of the measured path) but not the console echo
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if type(handler) is logging.StreamHandler:
+            root.removeHandler(handler)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+
+# Sections
+
+def bench_orders(base_url, count, concurrency):
+    from trading_bot import BasicBot
+
+    bot = BasicBot(API_KEY, API_SECRET, base_url=base_url)
+    quiet_console()
+    bot.market_order('BTCUSDT', 'BUY', 0.001)  # warm the connection pool
+
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        bot.market_order('BTCUSDT', 'BUY' if i % 2 else 'SELL', 0.001)
+        latencies.append(time.perf_counter() - start)
+
+    pending = set()
+    start = time.perf_counter()
+    for i in range(count):
+        if len(pending) >= concurrency:
+            _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        pending.add(bot.gateway.submit_order(symbol='BTCUSDT', side='BUY' if i % 2 else 'SELL',
+                                             type='MARKET', quantity=0.001))
+    wait(pending)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'serial': latency_stats(latencies),
+        'concurrent': {'orders': count, 'concurrency': concurrency,
+                       'orders_per_sec': round(count / elapsed, 1)}
+    }
+
+
+def recorded_frames(steps):
+    """Combined-stream frames from an offline exchange, plus the depth snapshots they follow"""
+    exchange = MockExchange(seed=7)
+    snapshots = {symbol: exchange.depth(symbol, 1000) for symbol in exchange.markets}
+    frames = []
+    for _ in range(steps):
+        for stream, data in exchange.step(ticker=True):
+            if not stream.endswith('@depth'):
+                frames.append(json.dumps({'stream': stream, 'data': data}))
+    return frames, snapshots
+
+
+def bench_ingest(base_url, steps, repeats=5):
+    from order_book import OrderBookSync
+    from realtime_bot import RealTimeBot
+
+    frames, snapshots = recorded_frames(steps)
+    decoder = TickDecoder()
+    records = [decoder.decode(frame) for frame in frames]
+
+    def run(kind=None, decode=False):
+        # A fresh bot per pass so every depth diff applies in sequence
+        bot = RealTimeBot(API_KEY, API_SECRET, base_url=base_url)
+        for symbol in snapshots:
+            bot.books[symbol] = OrderBookSync(symbol, snapshots.__getitem__)
+        first = {}
+        for stream, record in records:
+            if record.__class__ is DepthUpdate:
+                first.setdefault(record.symbol, record)
+        for record in first.values():
+            bot.on_message(None, record)
+        deadline = time.time() + 5
+        while not all(sync.synced for sync in bot.books.values()) and time.time() < deadline:
+            time.sleep(0.01)
+
+        batch = [(s, r) for s, r in records if r not in first.values() and (kind is None or r.__class__ is kind)]
+        start = time.perf_counter()
+        if decode:
+            source = [f for f, (_, r) in zip(frames, records) if r not in first.values()]
+            for frame in source:
+                stream, record = decoder.decode(frame)
+                bot.on_message(stream, record)
+        else:
+            on_message = bot.on_message
+            for stream, record in batch:
+                on_message(stream, record)
+        return len(batch) / (time.perf_counter() - start)
+
+    results = {'records': len(records)}
+    for name, kind in (('ticker', Ticker), ('trade', Trade), ('depth', DepthUpdate), ('mixed', None)):
+        results[f"{name}_per_sec"] = round(max(run(kind) for _ in range(repeats)))
+    results['decode_and_dispatch_per_sec'] = round(max(run(decode=True) for _ in range(repeats)))
+    return results
+
+
+def bench_fanout(seconds):
+    """Tick-to-browser latency: age of each newly displayed price, from the
+    mock's ticker event time to its arrival at a Socket.IO client"""
+    import socketio as socketio_client
+
+    import app as dashboard
+    import live_demo
+    from stream_manager import get_stream_manager
+
+    quiet_console()
+    symbols = dashboard.SYMBOLS
+    published = {}
+    last_price = {}
+
+    def on_ticker(stream, ticker):
+        # Stamp a price when it first appears, not when it repeats or comes back later
+        if last_price.get(ticker.symbol) != ticker.price:
+            last_price[ticker.symbol] = ticker.price
+            published[(ticker.symbol, ticker.price)] = ticker.event_time / 1000
+
+    get_stream_manager().subscribe([f"{s.lower()}@ticker" for s in symbols], on_ticker)
+
+    def serve(module):
+        port = free_port()
+        thread = threading.Thread(target=module.socketio.run, args=(module.app,),
+                                  kwargs={'port': port, 'allow_unsafe_werkzeug': True, 'log_output': False})
+        thread.daemon = True
+        thread.start()
+        time.sleep(0.5)
+        return f"http://127.0.0.1:{port}"
+
+    def measure(url, event, prices_of):
+        samples = []
+        last_seen = {}
+        client = socketio_client.Client()
+
+        @client.on(event)
+        def on_update(data):
+            received = time.time()
+            for symbol, price in prices_of(data).items():
+                if last_seen.get(symbol) == price:
+                    continue
+                last_seen[symbol] = price
+                sent = published.get((symbol, price))
+                if sent is not None:
+                    samples.append(received - sent)
+            return True  # ack, so the fan-out keeps sending
+
+        client.connect(url, wait_timeout=10)
+        client.emit('subscribe', {'symbols': symbols})
+        time.sleep(1)   # skip the snapshot frames sent on connect
+        del samples[:]
+        time.sleep(seconds)
+        client.disconnect()
+        return latency_stats(samples)
+
+    return {
+        'app': measure(serve(dashboard), 'price_update', lambda data: data),
+        'live_demo': measure(serve(live_demo), 'market_update',
+                             lambda data: {s: q['price'] for s, q in data.get('prices', {}).items()})
+    }
+
+
+def bench_deploy(base_url, levels, slices, repeats):
+    from advanced.grid import GridOrder
+    from advanced.twap import TWAPOrder
+    from trading_bot import BasicBot
+
+    bot = BasicBot(API_KEY, API_SECRET, base_url=base_url)
+    quiet_console()
+    grid = GridOrder(bot.client)
+    twap = TWAPOrder(bot.client)
+    tick = float(DEFAULT_SYMBOLS['BTCUSDT'][1])
+
+    grid_times, placed = [], []
+    for _ in range(repeats):
+        price = float(bot.client.futures_symbol_ticker(symbol='BTCUSDT')['price'])
+        low = round(price - levels / 2 * tick * 10, 1)
+        start = time.perf_counter()
+        results = grid.place_order('BTCUSDT', 0.001, low, round(low + (levels - 1) * tick * 10, 1), levels,
+                                   mid_price=price)
+        grid_times.append(time.perf_counter() - start)
+        placed.append(sum(1 for r in results or () if r['status'] == 'PLACED'))
+        bot.client.futures_cancel_all_open_orders(symbol='BTCUSDT')
+
+    twap_times, filled = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        schedule = twap.place_order('BTCUSDT', 'BUY', round(0.001 * slices, 3), slices, 0)
+        schedule.wait(timeout=60)
+        twap_times.append(time.perf_counter() - start)
+        filled.append(schedule.progress()['filled_qty'])
+
+    return {
+        'grid': dict(latency_stats(grid_times), levels=levels, placed=min(placed)),
+        'twap': dict(latency_stats(twap_times), slices=slices, filled_qty=min(filled))
+    }
+
+
+def bench_triggers(count, symbols=20, ticks=200000):
+    from concurrent.futures import Future
+    from trigger_engine import TriggerEngine
+
+    def submit_order(**order):
+        future = Future()
+        future.set_result({'orderId': 0, 'status': 'NEW'})
+        return future
+
+    engine = TriggerEngine(submit_order)
+    rng = np.random.default_rng(7)
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    for name in names:
+        engine.on_price(name, 100.0)
+    kinds = rng.random(count)
+    for i in range(count):
+        name = names[i % symbols]
+        if kinds[i] < 0.4:
+            engine.stop(name, 'SELL', 1, float(rng.uniform(50, 99.9)))
+        elif kinds[i] < 0.8:
+            engine.take_profit(name, 'SELL', 1, float(rng.uniform(100.1, 150)))
+        else:
+            engine.trailing_stop(name, 'SELL', 1, float(rng.choice([1, 2, 5, 10, 20])))
+
+    # Independent random walks, one tick per symbol in turn
+    walks = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.0002, (ticks // symbols, symbols)), axis=0))
+    on_price = engine.on_price
+    clock = time.perf_counter
+    samples = []
+    start = clock()
+    for row in walks.tolist():
+        for name, price in zip(names, row):
+            t = clock()
+            on_price(name, price)
+            samples.append(clock() - t)
+    elapsed = clock() - start
+    return dict(latency_stats(samples), triggers=count, symbols=symbols,
+                ticks_per_sec=round(len(samples) / elapsed), fired=engine.fired)
+
+
+# Reporting
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(previous, current):
+    before, after = flatten(previous.get('results', {})), flatten(current['results'])
+    print(f"\n{'metric':<44}{'before':>14}{'after':>14}{'change':>10}")
+    for key, value in after.items():
+        if key in before and before[key]:
+            change = (value - before[key]) / before[key] * 100
+            print(f"{key:<44}{before[key]:>14,.3f}{value:>14,.3f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end benchmark suite against the mock exchange')
+    parser.add_argument('--only', default=','.join(SECTIONS), help='Comma-separated sections to run')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--compare', help='Previous results file to diff against')
+    parser.add_argument('--port', type=int, default=8766, help='Mock exchange port')
+    parser.add_argument('--latency-ms', type=float, default=1, help='Mock exchange latency per request')
+    parser.add_argument('--orders', type=int, default=500, help='Orders per order-submission run')
+    parser.add_argument('--concurrency', type=int, default=50, help='Orders in flight for the throughput run')
+    parser.add_argument('--steps', type=int, default=2000, help='Exchange steps of recorded frames for ingest')
+    parser.add_argument('--fanout-seconds', type=float, default=10, help='Measurement window per dashboard')
+    parser.add_argument('--grid-levels', type=int, default=100, help='Levels per grid deployment')
+    parser.add_argument('--twap-slices', type=int, default=20, help='Slices per TWAP deployment')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per deployment measurement')
+    parser.add_argument('--triggers', type=int, default=50000, help='Pending triggers for the trigger engine run')
+    args = parser.parse_args()
+
+    sections = [s.strip() for s in args.only.split(',') if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    process, base_url = start_mock(args.port, args.latency_ms)
+    # The dashboards and the default stream manager follow BINANCE_BASE_URL
+    os.environ['BINANCE_BASE_URL'] = base_url
+    results = {}
+    try:
+        if 'orders' in sections:
+            print("Measuring order submission...")
+            results['orders'] = bench_orders(base_url, args.orders, args.concurrency)
+        if 'ingest' in sections:
+            print("Measuring tick ingestion...")
+            results['ingest'] = bench_ingest(base_url, args.steps)
+        if 'deploy' in sections:
+            print("Measuring grid and TWAP deployment...")
+            results['deploy'] = bench_deploy(base_url, args.grid_levels, args.twap_slices, args.repeats)
+        if 'triggers' in sections:
+            print("Measuring trigger evaluation...")
+            results['triggers'] = bench_triggers(args.triggers)
+        if 'fanout' in sections:
+            print("Measuring tick-to-browser latency...")
+            results['fanout'] = bench_fanout(args.fanout_seconds)
+    finally:
+        process.terminate()
+        process.wait()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,100 +1,103 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, jsonify
+import os
+import sys
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
-import requests
 import threading
 import time
 import json
 import random
 
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from latency import get_latency_metrics
+from market_data import create_market_data
+from order_journal import OrderJournal, page_params
+from portfolio import Portfolio
+from risk import RiskRejected, get_risk_engine
+from symbol_registry import get_registry
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'trading_bot_secret'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Live trading simulation
+# Shared exchange info, loaded from the disk snapshot when available
+symbol_registry = get_registry()
+symbol_registry.load_async()
+
+# Live trading simulation: cash, positions and P&L live in the portfolio engine
+portfolio = Portfolio(initial_balance=10000.00)
 trading_data = {
-    'balance': 10000.00,
-    'initial_balance': 10000.00,
-    'positions': {},
-    'orders': [],
     'prices': {},
     'last_update': time.time()
 }
 
+# Every order is journaled to disk; only the most recent stay in memory
+order_journal = OrderJournal(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'live_demo_orders.db'))
+
+# Latest 24hr quotes for just these symbols, pushed by the stream (or polled)
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
+market_data = create_market_data(SYMBOLS)
+# Every tick marks its own position to market, so the loop below only reads
+market_data.add_listener(portfolio.update_price)
+for symbol, quote in market_data.snapshot().items():
+    portfolio.update_price(symbol, quote['price'])
+
+# Pre-trade checks against the exchange filters; positions come from the portfolio
+risk = get_risk_engine()
+risk.position_source = lambda symbol: portfolio.snapshot.positions.get(symbol, {}).get('quantity', 0.0)
+
+def market_payload(status, prices=None):
+    """market_update frame built from one consistent portfolio snapshot"""
+    snapshot = portfolio.snapshot
+    return {
+        'prices': trading_data['prices'] if prices is None else prices,
+        'balance': snapshot.balance,
+        'portfolio_value': snapshot.portfolio_value,
+        'pnl': snapshot.pnl,
+        'pnl_percent': snapshot.pnl_percent,
+        'positions': snapshot.positions,
+        'timestamp': time.strftime('%H:%M:%S'),
+        'status': status
+    }
+
 def fetch_real_prices():
-    """Fetch actual prices from Binance and simulate trading"""
-    symbols = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
-    
+    """Read actual prices from the market data cache and push them to the dashboard"""
     while True:
         try:
-            # Get real prices from Binance public API
-            response = requests.get('https://api.binance.com/api/v3/ticker/24hr', timeout=10)
-            data = response.json()
-            
             price_updates = {}
+            previous = trading_data['prices']
             
-            for item in data:
-                if item['symbol'] in symbols:
-                    symbol = item['symbol']
-                    current_price = float(item['lastPrice'])
-                    change_24h = float(item['priceChangePercent'])
-                    volume = float(item['volume'])
-                    
-                    # Store previous price for comparison
-                    prev_price = trading_data['prices'].get(symbol, {}).get('price', current_price)
-                    
-                    price_updates[symbol] = {
-                        'price': current_price,
-                        'change_24h': change_24h,
-                        'volume': volume,
-                        'trend': 'up' if current_price > prev_price else 'down' if current_price < prev_price else 'neutral',
-                        'timestamp': time.time()
-                    }
-            
-            # Update stored prices
-            trading_data['prices'].update(price_updates)
-            
-            # Calculate portfolio value based on positions
-            portfolio_value = trading_data['balance']
-            for symbol, position in trading_data['positions'].items():
-                if symbol in price_updates:
-                    current_price = price_updates[symbol]['price']
-                    position_value = position['quantity'] * current_price
-                    portfolio_value += position_value - position['cost']
+            for symbol, quote in market_data.snapshot().items():
+                current_price = quote['price']
+                
+                # Store previous price for comparison
+                prev_price = previous.get(symbol, {}).get('price', current_price)
+                
+                price_updates[symbol] = {
+                    'price': current_price,
+                    'change_24h': quote['change_24h'],
+                    'volume': quote['volume'],
+                    'trend': 'up' if current_price > prev_price else 'down' if current_price < prev_price else 'neutral',
+                    'timestamp': quote['timestamp']
+                }
             
-            # Calculate P&L
-            total_pnl = portfolio_value - trading_data['initial_balance']
-            pnl_percent = (total_pnl / trading_data['initial_balance']) * 100
+            # Swapped in whole so request threads never see a half-updated dict
+            trading_data['prices'] = dict(previous, **price_updates)
             
             # Emit live updates
-            socketio.emit('market_update', {
-                'prices': price_updates,
-                'balance': trading_data['balance'],
-                'portfolio_value': portfolio_value,
-                'pnl': total_pnl,
-                'pnl_percent': pnl_percent,
-                'positions': trading_data['positions'],
-                'timestamp': time.strftime('%H:%M:%S'),
-                'status': 'LIVE'
-            })
+            payload = market_payload('LIVE', price_updates)
+            socketio.emit('market_update', payload)
             
-            print(f"Updated {len(price_updates)} symbols - Portfolio: ${portfolio_value:.2f}")
+            print(f"Updated {len(price_updates)} symbols - Portfolio: ${payload['portfolio_value']:.2f}")
             time.sleep(3)  # Update every 3 seconds
             
         except Exception as e:
             print(f"Error fetching prices: {e}")
             # Emit error status
-            socketio.emit('market_update', {
-                'prices': trading_data['prices'],
-                'balance': trading_data['balance'],
-                'portfolio_value': trading_data['balance'],
-                'pnl': 0,
-                'pnl_percent': 0,
-                'positions': trading_data['positions'],
-                'timestamp': time.strftime('%H:%M:%S'),
-                'status': 'ERROR',
-                'error': str(e)
-            })
+            payload = market_payload('ERROR')
+            payload['error'] = str(e)
+            socketio.emit('market_update', payload)
             time.sleep(10)
 
 # Start price fetching
@@ -106,6 +109,20 @@ price_thread.start()
 def index():
     return render_template('live_demo.html')
 
+@app.route('/metrics')
+def get_metrics():
+    # Stage latency histograms; ?format=prometheus for scrapers
+    if request.args.get('format') == 'prometheus':
+        return Response(get_latency_metrics().prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(get_latency_metrics().snapshot())
+
+@app.route('/api/history/<symbol>')
+def get_history(symbol):
+    bar_seconds = request.args.get('bar', 60, type=int)
+    if bar_seconds <= 0:
+        return jsonify({'status': 'error', 'message': 'bar must be a positive number of seconds'}), 400
+    return jsonify(market_data.history.ohlcv(symbol.upper(), bar_seconds * 1000))
+
 @app.route('/api/order', methods=['POST'])
 def execute_order():
     try:
@@ -114,59 +131,22 @@ def execute_order():
         side = data['side']
         quantity = float(data['quantity'])
         
-        # Get current price
-        if symbol not in trading_data['prices']:
-            return jsonify({'status': 'error', 'message': 'Symbol price not available'})
+        if symbol_registry.loaded:
+            try:
+                checked = risk.check({'symbol': symbol, 'side': side, 'type': 'MARKET', 'quantity': quantity},
+                                     last_price=portfolio.price(symbol))
+            except RiskRejected as e:
+                return jsonify({'status': 'error', 'message': f'Rejected: {e}'})
+            quantity = checked['quantity']
         
-        current_price = trading_data['prices'][symbol]['price']
+        # Fill against the last tick; the portfolio checks cash and holdings
+        try:
+            current_price = portfolio.execute(symbol, side, quantity)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)})
         order_value = quantity * current_price
-        
-        # Check if we have enough balance for buy orders
-        if side == 'BUY' and order_value > trading_data['balance']:
-            return jsonify({'status': 'error', 'message': 'Insufficient balance'})
-        
-        # Execute the order
         order_id = f"ORD_{int(time.time() * 1000)}"
         
-        if side == 'BUY':
-            # Buy order - reduce balance, increase position
-            trading_data['balance'] -= order_value
-            
-            if symbol in trading_data['positions']:
-                # Add to existing position
-                old_qty = trading_data['positions'][symbol]['quantity']
-                old_cost = trading_data['positions'][symbol]['cost']
-                new_qty = old_qty + quantity
-                new_cost = old_cost + order_value
-                
-                trading_data['positions'][symbol] = {
-                    'quantity': new_qty,
-                    'avg_price': new_cost / new_qty,
-                    'cost': new_cost
-                }
-            else:
-                # New position
-                trading_data['positions'][symbol] = {
-                    'quantity': quantity,
-                    'avg_price': current_price,
-                    'cost': order_value
-                }
-        
-        else:  # SELL
-            # Check if we have enough position to sell
-            if symbol not in trading_data['positions'] or trading_data['positions'][symbol]['quantity'] < quantity:
-                return jsonify({'status': 'error', 'message': 'Insufficient position'})
-            
-            # Sell order - increase balance, reduce position
-            trading_data['balance'] += order_value
-            
-            position = trading_data['positions'][symbol]
-            position['quantity'] -= quantity
-            position['cost'] -= (position['cost'] / (position['quantity'] + quantity)) * quantity
-            
-            if position['quantity'] <= 0:
-                del trading_data['positions'][symbol]
-        
         # Record the order
         order = {
             'id': order_id,
@@ -179,27 +159,16 @@ def execute_order():
             'status': 'FILLED'
         }
         
-        trading_data['orders'].append(order)
-        
-        # Keep only last 50 orders
-        if len(trading_data['orders']) > 50:
-            trading_data['orders'] = trading_data['orders'][-50:]
+        order_journal.append(order)
         
         # Emit balance update
-        portfolio_value = trading_data['balance']
-        for pos_symbol, position in trading_data['positions'].items():
-            if pos_symbol in trading_data['prices']:
-                pos_price = trading_data['prices'][pos_symbol]['price']
-                portfolio_value += position['quantity'] * pos_price
-        
-        total_pnl = portfolio_value - trading_data['initial_balance']
-        
+        snapshot = portfolio.snapshot
         socketio.emit('order_executed', {
             'order': order,
-            'balance': trading_data['balance'],
-            'portfolio_value': portfolio_value,
-            'pnl': total_pnl,
-            'positions': trading_data['positions']
+            'balance': snapshot.balance,
+            'portfolio_value': snapshot.portfolio_value,
+            'pnl': snapshot.pnl,
+            'positions': snapshot.positions
         })
         
         return jsonify({
@@ -207,7 +176,7 @@ def execute_order():
             'message': f'✅ EXECUTED: {side} {quantity} {symbol} @ ${current_price:,.4f}',
             'order_id': order_id,
             'execution_price': current_price,
-            'new_balance': trading_data['balance']
+            'new_balance': snapshot.balance
         })
         
     except Exception as e:
@@ -215,35 +184,19 @@ def execute_order():
 
 @app.route('/api/orders')
 def get_orders():
-    return jsonify(trading_data['orders'][-20:])  # Last 20 orders
+    # Newest first; pass next_cursor back as ?cursor= for the next page
+    orders, next_cursor = order_journal.page(**page_params(request.args))
+    return jsonify({'orders': orders, 'next_cursor': next_cursor})
 
 @app.route('/api/positions')
 def get_positions():
-    return jsonify(trading_data['positions'])
+    return jsonify(portfolio.snapshot.positions)
 
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
     # Send current data immediately
-    portfolio_value = trading_data['balance']
-    for symbol, position in trading_data['positions'].items():
-        if symbol in trading_data['prices']:
-            current_price = trading_data['prices'][symbol]['price']
-            portfolio_value += position['quantity'] * current_price
-    
-    total_pnl = portfolio_value - trading_data['initial_balance']
-    pnl_percent = (total_pnl / trading_data['initial_balance']) * 100
-    
-    emit('market_update', {
-        'prices': trading_data['prices'],
-        'balance': trading_data['balance'],
-        'portfolio_value': portfolio_value,
-        'pnl': total_pnl,
-        'pnl_percent': pnl_percent,
-        'positions': trading_data['positions'],
-        'timestamp': time.strftime('%H:%M:%S'),
-        'status': 'CONNECTED'
-    })
+    emit('market_update', market_payload('CONNECTED'))
 
 if __name__ == '__main__':
     print("Starting Live Trading Demo...")
@@ -2,23 +2,18 @@
 import os
 import sys
 import logging
-from binance.client import Client
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from account_mirror import wallet_balance
+from endpoints import make_client
 from market_orders import MarketOrder
 from limit_orders import LimitOrder
+from log_pipeline import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# JSON lines written by a background listener; logging calls only enqueue
+setup_logging('bot.log')
 
 def main():
     print("Binance Futures Trading Bot")
@@ -44,12 +39,12 @@ def main():
     
     try:
         # Initialize Binance client (testnet)
-        client = Client(api_key, api_secret, testnet=True)
+        client = make_client(api_key, api_secret, testnet=True)
         
         # Test connection
-        account = client.futures_account()
+        balance = wallet_balance(client)
         print(f"SUCCESS: Connected to Binance Testnet")
-        print(f"Account Balance: {account['totalWalletBalance']} USDT")
+        print(f"Account Balance: {balance} USDT")
         
         # Initialize order handlers
         market_order = MarketOrder(client)
@@ -61,7 +56,7 @@ def main():
         print("   python src/limit_orders.py BTCUSDT BUY 0.01 50000")
         
     except Exception as e:
-        logging.error(f"Failed to connect: {e}")
+        logging.error("Failed to connect: %s", e)
         print(f"ERROR: Connection failed: {e}")
 
 if __name__ == "__main__":
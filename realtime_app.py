@@ -1,50 +1,65 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, jsonify
+import os
+import sys
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
-import requests
 import threading
 import time
 import json
 
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from latency import get_latency_metrics
+from market_data import create_market_data
+from order_journal import OrderJournal, page_params
+from risk import RiskRejected, get_risk_engine
+from symbol_registry import get_registry
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'trading_bot_secret'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Shared exchange info, loaded from the disk snapshot when available
+symbol_registry = get_registry()
+symbol_registry.load_async()
+
 # Global data storage
 live_data = {
     'prices': {},
     'balance': 1000.00,
-    'orders': [],
     'pnl': 0.00
 }
 
+# Every order is journaled to disk; only the most recent stay in memory
+order_journal = OrderJournal(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'realtime_orders.db'))
+
+# Latest quotes for just these symbols, pushed by the stream (or polled)
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
+market_data = create_market_data(SYMBOLS)
+
+# Pre-trade checks against the exchange filters, banded around the last tick
+risk = get_risk_engine()
+market_data.add_listener(risk.update_price)
+
 def fetch_live_prices():
-    """Fetch real-time prices from Binance API"""
-    symbols = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
-    
+    """Publish real-time prices from the shared market data cache"""
     while True:
         try:
-            # Get real prices from Binance
-            url = 'https://api.binance.com/api/v3/ticker/price'
-            response = requests.get(url, timeout=5)
-            data = response.json()
-            
-            # Filter and update prices
-            for item in data:
-                if item['symbol'] in symbols:
-                    old_price = live_data['prices'].get(item['symbol'], 0)
-                    new_price = float(item['price'])
-                    
-                    # Calculate change
-                    change = 0
-                    if old_price > 0:
-                        change = ((new_price - old_price) / old_price) * 100
-                    
-                    live_data['prices'][item['symbol']] = {
-                        'price': new_price,
-                        'change': change,
-                        'timestamp': time.time()
-                    }
+            # Update prices from the latest snapshot
+            for symbol, quote in market_data.snapshot().items():
+                old_price = live_data['prices'].get(symbol, {}).get('price', 0)
+                new_price = quote['price']
+                
+                # Calculate change
+                change = 0
+                if old_price > 0:
+                    change = ((new_price - old_price) / old_price) * 100
+                
+                live_data['prices'][symbol] = {
+                    'price': new_price,
+                    'change': change,
+                    'timestamp': quote['timestamp']
+                }
             
             # Simulate realistic balance changes based on market movement
             btc_change = live_data['prices'].get('BTCUSDT', {}).get('change', 0)
@@ -104,6 +119,20 @@ def get_balance():
         'timestamp': time.strftime('%H:%M:%S')
     })
 
+@app.route('/metrics')
+def get_metrics():
+    # Stage latency histograms; ?format=prometheus for scrapers
+    if request.args.get('format') == 'prometheus':
+        return Response(get_latency_metrics().prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(get_latency_metrics().snapshot())
+
+@app.route('/api/history/<symbol>')
+def get_history(symbol):
+    bar_seconds = request.args.get('bar', 60, type=int)
+    if bar_seconds <= 0:
+        return jsonify({'status': 'error', 'message': 'bar must be a positive number of seconds'}), 400
+    return jsonify(market_data.history.ohlcv(symbol.upper(), bar_seconds * 1000))
+
 @app.route('/api/order', methods=['POST'])
 def place_order():
     try:
@@ -116,6 +145,14 @@ def place_order():
         # Get current price
         current_price = live_data['prices'].get(symbol, {}).get('price', 0)
         
+        if symbol_registry.loaded:
+            try:
+                checked = risk.check({'symbol': symbol, 'side': side, 'type': order_type, 'quantity': quantity},
+                                     last_price=current_price)
+            except RiskRejected as e:
+                return jsonify({'status': 'error', 'message': f'❌ Rejected: {e}'})
+            quantity = checked['quantity']
+        
         # Simulate order execution
         order_id = f"ORDER_{int(time.time())}"
         
@@ -140,7 +177,7 @@ def place_order():
             'timestamp': time.strftime('%H:%M:%S')
         }
         
-        live_data['orders'].append(order)
+        order_journal.append(order)
         
         # Emit balance update
         pnl_color = 'green' if live_data['pnl'] >= 0 else 'red'
@@ -168,7 +205,9 @@ def place_order():
 
 @app.route('/api/orders')
 def get_orders():
-    return jsonify(live_data['orders'][-10:])  # Last 10 orders
+    # Newest first; pass next_cursor back as ?cursor= for the next page
+    orders, next_cursor = order_journal.page(**page_params(request.args))
+    return jsonify({'orders': orders, 'next_cursor': next_cursor})
 
 @socketio.on('connect')
 def handle_connect():
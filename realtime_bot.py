@@ -1,69 +1,135 @@
 #!/usr/bin/env python3
-import websocket
-import json
-import threading
+import argparse
+import os
+import sys
 import time
-from binance import Client
+from functools import partial
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from endpoints import env_base_url, make_client, stream_url
+from latency import get_latency_metrics
+from order_book import OrderBookSync, fetch_spot_snapshot
+from sharding import ShardCoordinator
+from stream_manager import SPOT_STREAM_URL, get_stream_manager
+from tick_decoder import DepthUpdate, Trade
+from tick_history import TickHistory
 
 class RealTimeBot:
-    def __init__(self, api_key, api_secret, testnet=True):
-        self.client = Client(api_key, api_secret, testnet=testnet)
+    def __init__(self, api_key, api_secret, testnet=True, base_url=None):
+        self.base_url = base_url or env_base_url()
+        self.client = make_client(api_key, api_secret, testnet=testnet, base_url=self.base_url)
         self.prices = {}
-        self.ws = None
-        
-    def on_message(self, ws, message):
-        data = json.loads(message)
-        symbol = data['s']
-        price = float(data['c'])
-        self.prices[symbol] = price
-        print(f"{symbol}: ${price:,.2f}")
+        self.books = {}
+        self.history = TickHistory()
+        self.streams = []
+        # Optional strategy(bot, stream, record), called after every record is applied
+        self.strategy = None
+        self.records = 0
+        if self.base_url:
+            # Streams and depth snapshots come from the same host as REST
+            self.stream_manager = get_stream_manager(stream_url(self.base_url))
+            self.fetch_snapshot = partial(fetch_spot_snapshot, url=f"{self.base_url.rstrip('/')}/api/v3/depth")
+        else:
+            self.stream_manager = get_stream_manager(SPOT_STREAM_URL)
+            self.fetch_snapshot = fetch_spot_snapshot
         
-    def on_error(self, ws, error):
-        print(f"WebSocket error: {error}")
+    def on_message(self, stream, record):
+        # Hot path: records arrive decoded, and printing is left to monitor_prices
+        if record.__class__ is DepthUpdate:
+            self.books[record.symbol].on_event(record)
+        elif record.__class__ is Trade:
+            self.history.append(record.symbol, record.trade_time, record.price, record.qty)
+        else:
+            self.prices[record.symbol] = record.price
+        self.records += 1
+        if self.strategy is not None:
+            self.strategy(self, stream, record)
         
-    def on_close(self, ws, close_status_code, close_msg):
-        print("WebSocket connection closed")
-        
-    def start_price_stream(self, symbols):
+    def start_price_stream(self, symbols, depth=False, trades=False):
         streams = [f"{symbol.lower()}@ticker" for symbol in symbols]
-        stream_url = f"wss://stream.binance.com:9443/ws/{'/'.join(streams)}"
+        if trades:
+            # Trades feed the tick history used for OHLCV bars and returns
+            streams += [f"{symbol.lower()}@trade" for symbol in symbols]
+        if depth:
+            # Local L2 books built from a REST snapshot plus 100ms diffs
+            for symbol in symbols:
+                self.books[symbol.upper()] = OrderBookSync(symbol.upper(), self.fetch_snapshot)
+            streams += [f"{symbol.lower()}@depth@100ms" for symbol in symbols]
         
-        self.ws = websocket.WebSocketApp(
-            stream_url,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close
-        )
+        # Shared, sharded connections with backoff reconnects
+        self.stream_manager.subscribe(streams, self.on_message)
+        self.streams += streams
         
-        # Start WebSocket in separate thread
-        ws_thread = threading.Thread(target=self.ws.run_forever)
-        ws_thread.daemon = True
-        ws_thread.start()
+    def stop_price_stream(self):
+        self.stream_manager.unsubscribe(self.streams, self.on_message)
+        self.streams = []
         
     def get_current_price(self, symbol):
         return self.prices.get(symbol, 0)
         
-    def monitor_prices(self, symbols):
+    def get_ohlcv(self, symbol, bar_seconds=60):
+        """OHLCV bars from the local trade history (needs trades=True)"""
+        return self.history.ohlcv(symbol, bar_seconds * 1000)
+        
+    def get_order_book(self, symbol):
+        """Local order book for a symbol, or None until it has synced"""
+        sync = self.books.get(symbol)
+        return sync.book if sync and sync.synced else None
+        
+    def monitor_prices(self, symbols, depth=False, trades=False):
         print("Starting real-time price monitoring...")
-        self.start_price_stream(symbols)
+        self.start_price_stream(symbols, depth=depth, trades=trades)
         
         try:
             while True:
                 time.sleep(1)
+                if self.prices:
+                    print(" | ".join(f"{symbol}: ${price:,.2f}" for symbol, price in sorted(self.prices.items())))
         except KeyboardInterrupt:
             print("\nStopping price monitor...")
-            if self.ws:
-                self.ws.close()
+            self.stop_price_stream()
+            get_latency_metrics().dump()
+
+def monitor_sharded(coordinator):
+    """Print merged prices and per-shard health until interrupted"""
+    print(f"Starting sharded price monitoring on {len(coordinator.shards)} workers...")
+    coordinator.start()
+    try:
+        while True:
+            time.sleep(1)
+            prices = coordinator.prices()
+            if prices:
+                status = coordinator.status()
+                print(" | ".join(f"{symbol}: ${price:,.2f}" for symbol, price in sorted(prices.items())) +
+                      f"  [{status['alive']}/{status['workers']} workers, {status['records']:,} records]")
+    except KeyboardInterrupt:
+        print("\nStopping shard workers...")
+        coordinator.stop()
 
 def main():
+    parser = argparse.ArgumentParser(description='Real-time price monitor')
+    parser.add_argument('--symbols', default='BTCUSDT,ETHUSDT,ADAUSDT,SOLUSDT', help='Comma-separated symbols')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Shard the symbols across this many processes (0: run in this process)')
+    parser.add_argument('--trades', action='store_true', help='Also stream trades')
+    parser.add_argument('--depth', action='store_true', help='Also maintain local order books')
+    parser.add_argument('--base-url', help='Exchange root URL, e.g. http://127.0.0.1:8765 for the mock exchange')
+    args = parser.parse_args()
+    
     # Demo mode - replace with real keys
     API_KEY = "your_api_key"
     API_SECRET = "your_secret"
     
-    symbols = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'SOLUSDT']
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    
+    if args.workers:
+        factory = partial(RealTimeBot, API_KEY, API_SECRET, base_url=args.base_url)
+        monitor_sharded(ShardCoordinator(symbols, factory, workers=args.workers, trades=args.trades, depth=args.depth))
+        return
     
-    bot = RealTimeBot(API_KEY, API_SECRET)
-    bot.monitor_prices(symbols)
+    bot = RealTimeBot(API_KEY, API_SECRET, base_url=args.base_url)
+    bot.monitor_prices(symbols, depth=args.depth, trades=args.trades)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -17,6 +17,8 @@ def main():
     
     try:
         bot = BasicBot(api_key, api_secret)
+        # Balance checks below then read the user-data stream instead of REST
+        bot.account_mirror()
         balance = bot.get_balance()
         print(f"\n✅ Connected! Balance: {balance} USDT")
         
@@ -66,13 +68,18 @@ def main():
                 intervals = int(input("Number of intervals (default 10): ") or "10")
                 
                 order = bot.twap_order(symbol, side, quantity, duration, intervals)
-                print(f"✅ TWAP order started: {order['message']}")
+                print(f"✅ TWAP order started: {order['message']} (id {order['schedule_id']})")
                 
             elif choice == '5':
                 balance = bot.get_balance()
                 print(f"Balance: {balance} USDT")
                 
             elif choice == '6':
+                active = bot.twap_scheduler.active()
+                if active:
+                    print(f"Waiting for {len(active)} TWAP order(s) to finish...")
+                    for schedule in active:
+                        schedule.wait()
                 print("Goodbye!")
                 break
                 
@@ -0,0 +1,370 @@
+import json
+import logging
+import random
+import threading
+import time
+
+import websocket
+
+from endpoints import env_base_url, stream_url
+
+FUTURES_USER_STREAM_URL = 'wss://fstream.binance.com/ws'
+FUTURES_TESTNET_USER_STREAM_URL = 'wss://stream.binancefuture.com/ws'
+KEEPALIVE_INTERVAL = 30 * 60    # listenKeys expire after 60 minutes without a keepalive
+RECONCILE_INTERVAL = 5 * 60     # REST snapshot compared against the mirror
+BACKOFF_BASE = 1
+BACKOFF_CAP = 60
+STABLE_AFTER = 60
+CONNECT_TIMEOUT = 10            # start() waits this long for the stream before loading the snapshot
+OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+
+def _rest_order(order):
+    return {
+        'orderId': order['orderId'],
+        'symbol': order['symbol'],
+        'clientOrderId': order['clientOrderId'],
+        'side': order['side'],
+        'type': order['type'],
+        'status': order['status'],
+        'price': float(order['price']),
+        'stopPrice': float(order.get('stopPrice', 0)),
+        'origQty': float(order['origQty']),
+        'executedQty': float(order['executedQty']),
+        'reduceOnly': order.get('reduceOnly', False),
+        'updateTime': order.get('updateTime', 0)
+    }
+
+
+def _stream_order(o, event_time):
+    return {
+        'orderId': o['i'],
+        'symbol': o['s'],
+        'clientOrderId': o['c'],
+        'side': o['S'],
+        'type': o['o'],
+        'status': o['X'],
+        'price': float(o['p']),
+        'stopPrice': float(o.get('sp', 0)),
+        'origQty': float(o['q']),
+        'executedQty': float(o['z']),
+        'reduceOnly': o.get('R', False),
+        'updateTime': o.get('T', event_time)
+    }
+
+
+class AccountMirror:
+    """Futures balances, positions and open orders kept in memory from the user-data stream.
+
+    ``start`` connects the stream, then takes one REST snapshot, so no
+    event falls between the two; ACCOUNT_UPDATE and ORDER_TRADE_UPDATE
+    events then keep the mirror current, so ``balance``,
+    ``position`` and ``open_orders`` are local lookups that cost no request
+    weight. A maintenance thread renews the listenKey and reconciles against
+    REST every ``reconcile_interval`` seconds and after each reconnect; keys
+    an event touched while the REST snapshot was in flight keep the event's
+    newer value. Listeners get every raw event after it has been applied,
+    and a ``{'e': 'reconciled'}`` event after each REST reconciliation.
+    """
+
+    def __init__(self, client, base_url=None, reconcile_interval=RECONCILE_INTERVAL):
+        self.client = client
+        base_url = base_url or env_base_url()
+        if base_url:
+            self.stream_base = stream_url(base_url, 'ws')
+        else:
+            self.stream_base = FUTURES_TESTNET_USER_STREAM_URL if client.testnet else FUTURES_USER_STREAM_URL
+        self.reconcile_interval = reconcile_interval
+        self.balances = {}      # asset -> {'wallet_balance', 'cross_wallet_balance'}
+        self.positions = {}     # symbol -> {'amount', 'entry_price', 'unrealized_pnl'}
+        self.orders = {}        # orderId -> open order
+        self.listeners = []
+        self.listen_key = None
+        self.connected = False
+        self.events = 0
+        self.reconciled_at = 0
+        self.drift = 0
+        self._touched = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._resync = threading.Event()
+        self._opened = threading.Event()
+        self._snapshot_pending = False
+        self._stop = threading.Event()
+        self._threads = []
+        self.ws = None
+
+    @property
+    def started(self):
+        return bool(self._threads)
+
+    def start(self, connect_timeout=CONNECT_TIMEOUT):
+        """Start streaming, then load the REST snapshot; later calls return at once"""
+        with self._start_lock:
+            if self._threads:
+                return self
+            # Events from the connect on are applied, and the snapshot below keeps the ones it overlaps
+            with self._lock:
+                self._snapshot_pending = True
+            for target, name in ((self._run_stream, 'account-stream'), (self._run_maintenance, 'account-maintenance')):
+                thread = threading.Thread(target=target, name=name)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            if not self._opened.wait(connect_timeout):
+                logging.warning("Account stream not connected after %ss, loading the snapshot first", connect_timeout)
+            with self._lock:
+                # A connect from now on resyncs by itself
+                self._snapshot_pending = False
+            try:
+                self.reconcile()
+            except Exception:
+                # Streaming carries on; the maintenance thread retries the snapshot
+                self._resync.set()
+                raise
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._resync.set()
+        if self.ws:
+            self.ws.close()
+        if self.listen_key:
+            try:
+                self.client.futures_stream_close(self.listen_key)
+            except Exception as e:
+                logging.warning("Error closing listenKey: %s", e)
+
+    def add_listener(self, listener):
+        """Call ``listener(event)`` for every user-data event once the mirror has applied it"""
+        self.listeners.append(listener)
+
+    # Local reads
+
+    def balance(self, asset='USDT'):
+        entry = self.balances.get(asset)
+        return entry['wallet_balance'] if entry else 0.0
+
+    def position(self, symbol):
+        return self.positions.get(symbol)
+
+    def position_amount(self, symbol):
+        """Signed position size, usable as the risk engine's position source"""
+        entry = self.positions.get(symbol)
+        return entry['amount'] if entry else 0.0
+
+    def open_orders(self, symbol=None):
+        with self._lock:
+            orders = list(self.orders.values())
+        return [o for o in orders if o['symbol'] == symbol] if symbol else orders
+
+    # Stream events
+
+    def _touch(self, key):
+        if self._touched is not None:
+            self._touched.add(key)
+
+    def apply(self, event):
+        """Apply one user-data event (a decoded ``/ws/<listenKey>`` frame)"""
+        kind = event.get('e')
+        with self._lock:
+            if kind == 'ACCOUNT_UPDATE':
+                update = event['a']
+                balances = dict(self.balances)
+                for b in update.get('B', []):
+                    balances[b['a']] = {'wallet_balance': float(b['wb']), 'cross_wallet_balance': float(b['cw'])}
+                    self._touch(('balance', b['a']))
+                positions = dict(self.positions)
+                for p in update.get('P', []):
+                    amount = float(p['pa'])
+                    if amount:
+                        positions[p['s']] = {'amount': amount, 'entry_price': float(p['ep']),
+                                             'unrealized_pnl': float(p['up'])}
+                    else:
+                        positions.pop(p['s'], None)
+                    self._touch(('position', p['s']))
+                # Swapped whole so readers never see a half-applied update
+                self.balances = balances
+                self.positions = positions
+            elif kind == 'ORDER_TRADE_UPDATE':
+                order = _stream_order(event['o'], event.get('E', 0))
+                known = self.orders.get(order['orderId'])
+                if known is None or known['updateTime'] <= order['updateTime']:
+                    if order['status'] in OPEN_STATUSES:
+                        self.orders[order['orderId']] = order
+                    else:
+                        self.orders.pop(order['orderId'], None)
+                self._touch(('order', order['orderId']))
+            elif kind == 'listenKeyExpired':
+                logging.warning("listenKey expired, reconnecting the account stream")
+                if self.ws:
+                    self.ws.close()
+            self.events += 1
+        self._notify(event)
+
+    def _notify(self, event):
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logging.error("Account listener failed: %s", e)
+
+    def _on_message(self, ws, message):
+        self.apply(json.loads(message))
+
+    def _on_open(self, ws):
+        self.connected = True
+        with self._lock:
+            if not self._snapshot_pending:
+                # Events may have been missed while disconnected
+                self._resync.set()
+        self._opened.set()
+        logging.info("Account stream connected")
+
+    def _on_error(self, ws, error):
+        logging.error("Account stream error: %s", error)
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+
+    def _run_stream(self):
+        attempt = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.listen_key = self.client.futures_stream_get_listen_key()
+                self.ws = websocket.WebSocketApp(
+                    f"{self.stream_base}/{self.listen_key}",
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close
+                )
+                self.ws.run_forever()
+            except Exception as e:
+                logging.error("Account stream failed: %s", e)
+            self.connected = False
+            if self._stop.is_set():
+                break
+            if time.monotonic() - started > STABLE_AFTER:
+                attempt = 0
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            logging.warning("Account stream closed, reconnecting in %.1fs", delay)
+            self._stop.wait(delay)
+
+    # Keepalive and reconciliation
+
+    def _run_maintenance(self):
+        next_keepalive = time.monotonic() + KEEPALIVE_INTERVAL
+        next_reconcile = time.monotonic() + self.reconcile_interval
+        while not self._stop.is_set():
+            resync = self._resync.wait(max(0, min(next_keepalive, next_reconcile) - time.monotonic()))
+            if self._stop.is_set():
+                break
+            now = time.monotonic()
+            if resync or now >= next_reconcile:
+                self._resync.clear()
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logging.error("Account reconciliation failed: %s", e)
+                next_reconcile = now + self.reconcile_interval
+            if now >= next_keepalive:
+                try:
+                    if self.listen_key:
+                        self.client.futures_stream_keepalive(self.listen_key)
+                except Exception as e:
+                    logging.error("listenKey keepalive failed: %s", e)
+                next_keepalive = now + KEEPALIVE_INTERVAL
+
+    def reconcile(self):
+        """Replace the mirror with a REST snapshot; returns how many entries had drifted"""
+        with self._lock:
+            self._touched = set()
+        try:
+            account = self.client.futures_account()
+            open_orders = self.client.futures_get_open_orders()
+        except Exception:
+            with self._lock:
+                self._touched = None
+            raise
+
+        balances = {
+            b['asset']: {'wallet_balance': float(b['walletBalance']),
+                         'cross_wallet_balance': float(b.get('crossWalletBalance', b['walletBalance']))}
+            for b in account.get('assets', [])
+        }
+        positions = {}
+        for p in account.get('positions', []):
+            amount = float(p['positionAmt'])
+            if amount:
+                positions[p['symbol']] = {
+                    'amount': amount,
+                    'entry_price': float(p['entryPrice']),
+                    'unrealized_pnl': float(p.get('unrealizedProfit', p.get('unRealizedProfit', 0)))
+                }
+        orders = {o['orderId']: _rest_order(o) for o in open_orders}
+
+        with self._lock:
+            touched, self._touched = self._touched, None
+            drift = []
+            for asset in set(balances) | set(self.balances):
+                if ('balance', asset) in touched:
+                    balances[asset] = self.balances[asset]
+                elif (self.balances.get(asset) or {}).get('wallet_balance') != (balances.get(asset) or {}).get('wallet_balance'):
+                    drift.append(f"balance {asset}")
+            for symbol in set(positions) | set(self.positions):
+                if ('position', symbol) in touched:
+                    if symbol in self.positions:
+                        positions[symbol] = self.positions[symbol]
+                    else:
+                        positions.pop(symbol, None)
+                elif (self.positions.get(symbol) or {}).get('amount') != (positions.get(symbol) or {}).get('amount'):
+                    drift.append(f"position {symbol}")
+            for order_id in set(orders) | set(self.orders):
+                if ('order', order_id) in touched:
+                    if order_id in self.orders:
+                        orders[order_id] = self.orders[order_id]
+                    else:
+                        orders.pop(order_id, None)
+                elif (order_id in orders) != (order_id in self.orders):
+                    drift.append(f"order {order_id}")
+            self.balances = balances
+            self.positions = positions
+            self.orders = orders
+            self.reconciled_at = time.time()
+
+        # The first load fills an empty mirror, which is not drift
+        if drift and self.events:
+            self.drift += len(drift)
+            logging.warning("Account mirror corrected %d drifted entries: %s", len(drift), ', '.join(drift[:10]))
+        # Lets listeners re-check state that events missed while disconnected would have changed
+        self._notify({'e': 'reconciled', 'E': int(self.reconciled_at * 1000)})
+        return len(drift)
+
+    def status(self):
+        return {'connected': self.connected, 'events': self.events, 'reconciled_at': self.reconciled_at,
+                'drift': self.drift, 'open_orders': len(self.orders), 'positions': len(self.positions)}
+
+
+def wallet_balance(client, base_url=None, asset='USDT'):
+    """Wallet balance from the shared mirror once started; before that, from one REST call"""
+    mirror = get_account_mirror(client, base_url)
+    if mirror.started:
+        return mirror.balance(asset)
+    return float(client.futures_account()['totalWalletBalance'])
+
+
+def get_account_mirror(client, base_url=None):
+    """Return the shared (not yet started) mirror for a python-binance client's account"""
+    base_url = base_url or env_base_url()
+    key = (client.API_KEY, base_url, client.testnet)
+    with _mirrors_lock:
+        mirror = _mirrors.get(key)
+        if mirror is None:
+            mirror = _mirrors[key] = AccountMirror(client, base_url)
+        return mirror
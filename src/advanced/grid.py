@@ -1,35 +1,273 @@
+import itertools
 import logging
+import threading
 import time
 from binance.client import Client
 from binance.enums import *
 
+import numpy as np
+
+from order_gateway import gateway_for
+from symbol_registry import get_registry
+
+BUY, IDLE, SELL = 1, 0, -1
+SPACINGS = ('arithmetic', 'geometric')
+
+
+def grid_levels(price_low, price_high, grid_count, spacing='arithmetic', tick_size=None):
+    """Level prices from low to high: equal steps, or equal ratios for 'geometric'"""
+    if spacing not in SPACINGS:
+        raise ValueError(f"Unknown grid spacing: {spacing}")
+    if spacing == 'geometric':
+        levels = np.geomspace(price_low, price_high, grid_count)
+    else:
+        levels = np.linspace(price_low, price_high, grid_count)
+    if tick_size:
+        levels = np.round(levels / tick_size) * tick_size
+    return levels
+
+
+def grid_sides(levels, mid_price):
+    """Buy below the mid, sell above it; the level nearest the mid stays idle as the gap"""
+    sides = np.where(levels < mid_price, BUY, SELL).astype(np.int8)
+    sides[np.abs(levels - mid_price).argmin()] = IDLE
+    return sides
+
+
+def _tick_size(registry, symbol):
+    info = registry.get(symbol) or {}
+    for f in info.get('filters', []):
+        if f['filterType'] == 'PRICE_FILTER':
+            return float(f['tickSize'])
+    return None
+
+
+def _mid_price(client, symbol, price_low, price_high):
+    # Live price when the client can quote one, else the middle of the range
+    if hasattr(client, 'futures_symbol_ticker'):
+        return float(client.futures_symbol_ticker(symbol=symbol)['price'])
+    return (price_low + price_high) / 2
+
+
 class GridOrder:
     def __init__(self, client: Client):
         self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
 
-    def place_order(self, symbol, quantity_per_grid, price_low, price_high, grid_count):
+    def place_order(self, symbol, quantity_per_grid, price_low, price_high, grid_count,
+                    mid_price=None, spacing='arithmetic'):
+        """Deploy a static grid through the batch endpoint and return one result per placed level.
+
+        Levels below ``mid_price`` buy and levels above sell; the level
+        nearest the mid is left out, so ``grid_count - 1`` orders go out.
+        Without ``mid_price`` the live price is fetched with one ticker
+        request, so callers that already know it should pass it. See
+        GridEngine for a grid that re-arms itself on fills.
+        """
         try:
-            price_step = (price_high - price_low) / (grid_count - 1)
-            orders = []
-            
-            for i in range(grid_count):
-                price = price_low + (i * price_step)
-                
-                # Place buy orders below current price, sell orders above
-                side = SIDE_BUY if i < grid_count // 2 else SIDE_SELL
-                
-                order = self.client.futures_create_order(
-                    symbol=symbol,
-                    side=side,
-                    type=FUTURE_ORDER_TYPE_LIMIT,
-                    timeInForce=TIME_IN_FORCE_GTC,
-                    quantity=quantity_per_grid,
-                    price=price
-                )
-                logging.info("Grid order %d placed: %s", i+1, order)
-                orders.append(order)
-                
-            return orders
+            if not self.registry.contains(symbol):
+                logging.error("Unknown symbol: %s", symbol)
+                return None
+            levels = grid_levels(price_low, price_high, grid_count, spacing, _tick_size(self.registry, symbol))
+            if mid_price is None:
+                mid_price = _mid_price(self.client, symbol, price_low, price_high)
+            sides = grid_sides(levels, mid_price)
+            armed = np.flatnonzero(sides)
+
+            orders = [dict(
+                symbol=symbol,
+                side=SIDE_BUY if sides[i] == BUY else SIDE_SELL,
+                type=FUTURE_ORDER_TYPE_LIMIT,
+                timeInForce=TIME_IN_FORCE_GTC,
+                quantity=quantity_per_grid,
+                price=float(levels[i])
+            ) for i in armed]
+
+            # Levels go out five per request with every batch in flight at once
+            responses = self.gateway.place_orders(orders)
+
+            results = []
+            for i, order, response in zip(armed, orders, responses):
+                placed = 'orderId' in response
+                if placed:
+                    logging.info("Grid order %d placed: %s", i+1, response)
+                else:
+                    logging.error("Grid order %d failed: %s", i+1, response.get('msg'))
+                results.append({
+                    'level': int(i) + 1,
+                    'side': order['side'],
+                    'price': order['price'],
+                    'status': 'PLACED' if placed else 'FAILED',
+                    'order': response if placed else None,
+                    'error': None if placed else response.get('msg')
+                })
+
+            failed = sum(1 for r in results if r['status'] == 'FAILED')
+            if failed:
+                logging.warning("Grid %s deployed with %d/%d levels failed", symbol, failed, len(results))
+            return results
         except Exception as e:
             logging.error("Error placing grid orders: %s", e)
-            return None
\ No newline at end of file
+            return None
+
+
+class Grid:
+    """One live ladder: level prices, the side armed at each level and its client order id"""
+
+    def __init__(self, grid_id, symbol, levels, quantity):
+        self.id = grid_id
+        self.symbol = symbol
+        self.levels = levels
+        self.quantity = quantity
+        self.sides = np.zeros(len(levels), dtype=np.int8)
+        self.client_ids = [None] * len(levels)
+        self.fills = 0
+        self.active = True
+        self.created_at = time.time()
+
+    def status(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'active': self.active,
+            'fills': self.fills,
+            'levels': self.levels.tolist(),
+            'sides': ['BUY' if s == BUY else 'SELL' if s == SELL else None for s in self.sides.tolist()]
+        }
+
+
+class GridEngine:
+    """Fill-reactive grids for any number of symbols.
+
+    Each grid arms a BUY below and a SELL above the mid at every level but
+    the one nearest it. When a level fills it goes idle and only its opposite
+    neighbour is re-armed (a BUY fill at level i quotes a SELL at i+1, a SELL
+    fill at i a BUY at i-1): a dict lookup by clientOrderId and one order,
+    whatever the number of grids. Fills arrive as order updates from the
+    account mirror (``attach``) or any source calling ``on_order_update``;
+    with the order gateway they are handled on its event loop. ``add_grid``
+    and ``stop`` run on the caller's thread, so slots and grid arrays are
+    only changed under the engine's lock; orders are sent outside it.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
+        self.loop = getattr(self.gateway, 'loop', None)
+        self.grids = {}
+        self._slots = {}        # clientOrderId -> (grid, level)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_grid(self, symbol, quantity_per_grid, price_low, price_high, grid_count,
+                 mid_price=None, spacing='arithmetic'):
+        """Compute the ladder around the mid price and arm it; returns the Grid"""
+        if not self.registry.contains(symbol):
+            raise ValueError(f"Unknown symbol: {symbol}")
+        levels = grid_levels(price_low, price_high, grid_count, spacing, _tick_size(self.registry, symbol))
+        if mid_price is None:
+            mid_price = _mid_price(self.client, symbol, price_low, price_high)
+        sides = grid_sides(levels, mid_price)
+        armed = np.flatnonzero(sides)
+        with self._lock:
+            grid = Grid(next(self._ids), symbol, levels, quantity_per_grid)
+            self.grids[grid.id] = grid
+            # Slots are registered before sending, so a fill can never beat its ack
+            orders = [self._slot_order(grid, i, sides[i]) for i in armed]
+        # Blocks on the acks: never call from the gateway loop
+        for order, response in zip(orders, self.gateway.place_orders(orders)):
+            if 'orderId' not in response:
+                logging.error("Grid %d level %s failed: %s", grid.id, order['price'], response.get('msg'))
+                self._release(order['newClientOrderId'])
+        logging.info("Grid %d armed %d levels on %s", grid.id, len(armed), symbol)
+        return grid
+
+    def _slot_order(self, grid, level, side):
+        # Caller holds the lock
+        client_id = f"grid{grid.id}_{level}_{next(self._seq)}"
+        grid.sides[level] = side
+        grid.client_ids[level] = client_id
+        self._slots[client_id] = (grid, level)
+        return dict(
+            symbol=grid.symbol,
+            side=SIDE_BUY if side == BUY else SIDE_SELL,
+            type=FUTURE_ORDER_TYPE_LIMIT,
+            timeInForce=TIME_IN_FORCE_GTC,
+            quantity=grid.quantity,
+            price=float(grid.levels[level]),
+            newClientOrderId=client_id
+        )
+
+    def _release(self, client_id):
+        with self._lock:
+            slot = self._slots.pop(client_id, None)
+            if slot is not None:
+                grid, level = slot
+                if grid.client_ids[level] == client_id:
+                    grid.sides[level] = IDLE
+                    grid.client_ids[level] = None
+        return slot
+
+    def _send(self, order):
+        future = self.gateway.submit_order(**order)
+        future.add_done_callback(lambda f: self._armed(order, f))
+
+    def _armed(self, order, future):
+        if future.exception() is not None:
+            logging.error("Grid re-arm %s @ %s failed: %s", order['side'], order['price'], future.exception())
+            self._call(self._release, order['newClientOrderId'])
+
+    def _call(self, fn, *args):
+        # Fills are handled on the gateway loop when there is one, in arrival order
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(fn, *args)
+        else:
+            fn(*args)
+
+    def on_order_update(self, order):
+        """Handle an order dict carrying ``clientOrderId`` and ``status``"""
+        client_id = order.get('clientOrderId')
+        status = order.get('status')
+        if status == 'FILLED':
+            rearm = None
+            with self._lock:
+                slot = self._slots.pop(client_id, None)
+                if slot is None:
+                    return
+                grid, level = slot
+                side = grid.sides[level]
+                grid.sides[level] = IDLE
+                grid.client_ids[level] = None
+                grid.fills += 1
+                neighbour = level + 1 if side == BUY else level - 1
+                if grid.active and 0 <= neighbour < len(grid.levels) and grid.sides[neighbour] == IDLE:
+                    rearm = self._slot_order(grid, neighbour, -side)
+            if rearm is not None:
+                self._send(rearm)
+        elif status in ('CANCELED', 'EXPIRED', 'REJECTED'):
+            self._release(client_id)
+
+    def _on_event(self, event):
+        if event.get('e') != 'ORDER_TRADE_UPDATE':
+            return
+        o = event['o']
+        if o['c'] in self._slots:
+            self._call(self.on_order_update, {'clientOrderId': o['c'], 'status': o['X']})
+
+    def attach(self, account):
+        """Take fills from an AccountMirror's user-data stream"""
+        account.add_listener(self._on_event)
+        return self
+
+    def stop(self, grid_id):
+        """Deactivate a grid and cancel its resting levels"""
+        with self._lock:
+            grid = self.grids[grid_id]
+            grid.active = False
+            resting = [c for c in grid.client_ids if c]
+        for client_id in resting:
+            self.gateway.submit_cancel(symbol=grid.symbol, origClientOrderId=client_id)
+        return grid
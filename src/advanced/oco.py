@@ -1,37 +1,322 @@
-# OCO is not directly available for futures in python-binance. 
-# For assignment purpose, we simulate placing two orders: take-profit and stop-loss.
 
+# OCO is not directly available for futures in python-binance.
+# OCOOrder places the two legs (take-profit and stop-loss); OCOManager links
+# them so the fill of one cancels the other. Both legs are reduce-only, so a
+# leg whose cancel lost the race cannot open a new position, and the rate
+# limiter queues them at REDUCE priority.
+
+import itertools
 import logging
+import re
+import secrets
+import threading
+import time
 from binance.client import Client
 from binance.enums import *
 
+from latency import get_latency_metrics
+from order_gateway import gateway_for
+from symbol_registry import get_registry
+
+LEGS = ('tp', 'sl')
+DONE_STATUSES = ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED')
+# oco_<process token>_<seq>_<leg>: the pair can be rebuilt from its legs' client ids alone
+CLIENT_ID = re.compile(r'^oco_([0-9a-f]+_\d+)_(tp|sl)$')
+UNKNOWN_ORDER = (-2011, -2013)
+
+
 class OCOOrder:
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, manager=None):
         self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
+        self.manager = manager
 
     def place_order(self, symbol, side, quantity, take_profit_price, stop_loss_price):
         """Place OCO order: take-profit and stop-loss simultaneously"""
         try:
+            if not self.registry.contains(symbol):
+                logging.error("Unknown symbol: %s", symbol)
+                return None
+            if self.manager is not None:
+                # Linked: a fill on either leg cancels the other
+                pair = self.manager.place(symbol, side, quantity, take_profit_price, stop_loss_price)
+                return pair.orders['tp'], pair.orders['sl']
             # Take profit order (opposite side)
             tp_side = SIDE_SELL if side.upper() == "BUY" else SIDE_BUY
-            tp = self.client.futures_create_order(
+            # Both legs are sent concurrently on the gateway loop
+            tp = self.gateway.submit_order(
                 symbol=symbol,
                 side=tp_side,
                 type=FUTURE_ORDER_TYPE_LIMIT,
                 timeInForce=TIME_IN_FORCE_GTC,
                 quantity=quantity,
-                price=take_profit_price
+                price=take_profit_price,
+                reduceOnly='true'
             )
             # Stop loss order (opposite side)
-            sl = self.client.futures_create_order(
+            sl = self.gateway.submit_order(
                 symbol=symbol,
                 side=tp_side,
                 type=FUTURE_ORDER_TYPE_STOP_MARKET,
                 stopPrice=stop_loss_price,
-                quantity=quantity
+                quantity=quantity,
+                reduceOnly='true'
             )
+            tp, sl = tp.result(), sl.result()
             logging.info("OCO simulated: TP=%s, SL=%s", tp, sl)
             return tp, sl
         except Exception as e:
             logging.error("Error placing OCO order: %s", e)
             return None
+
+
+class OCOPair:
+    """A take-profit and a stop-loss leg that cancel each other"""
+
+    def __init__(self, pair_id, symbol, exit_side, quantity, take_profit_price, stop_loss_price):
+        self.id = pair_id
+        self.symbol = symbol
+        self.exit_side = exit_side
+        self.quantity = quantity
+        self.take_profit_price = take_profit_price
+        self.stop_loss_price = stop_loss_price
+        self.client_ids = {leg: f"oco_{pair_id}_{leg}" for leg in LEGS}
+        self.order_ids = dict.fromkeys(LEGS)
+        self.orders = dict.fromkeys(LEGS)
+        self.status = 'ACTIVE'      # ACTIVE -> TRIGGERED (sibling cancel sent) -> DONE
+        self.triggered = None       # the leg that executed or ended first
+        self.done = set()
+        self.created_at = time.time()
+
+    @staticmethod
+    def sibling(leg):
+        return 'sl' if leg == 'tp' else 'tp'
+
+    def status_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'side': self.exit_side,
+            'quantity': self.quantity,
+            'take_profit_price': self.take_profit_price,
+            'stop_loss_price': self.stop_loss_price,
+            'status': self.status,
+            'triggered': self.triggered,
+            'order_ids': dict(self.order_ids)
+        }
+
+
+class OCOManager:
+    """Links OCO legs so the first to execute cancels its sibling.
+
+    Every live leg is indexed by clientOrderId and orderId, so an order
+    update is one dict lookup whatever the number of pairs. The first fill
+    (partial or full) on a leg, or a leg ending without us cancelling it,
+    sends the sibling's cancel straight from the event thread at cancel
+    priority. Fills come from an AccountMirror (``attach``) or any source
+    calling ``on_order_update``, e.g. the backtester's ``on_fill``.
+
+    Leg client ids carry the pair id, so ``recover`` rebuilds pairs from
+    the open orders after a restart and cancels legs whose sibling is gone.
+    It also runs after every mirror reconciliation, to catch fills that
+    happened while the stream was down.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
+        self.metrics = get_latency_metrics()
+        self.account = None
+        self.pairs = {}
+        self._by_client = {}        # clientOrderId -> (pair, leg)
+        self._by_order = {}         # orderId -> (pair, leg)
+        self._token = secrets.token_hex(4)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def place(self, symbol, side, quantity, take_profit_price, stop_loss_price):
+        """Place both legs of a position exit and return the linked OCOPair"""
+        if not self.registry.contains(symbol):
+            raise ValueError(f"Unknown symbol: {symbol}")
+        exit_side = SIDE_SELL if side.upper() == 'BUY' else SIDE_BUY
+        pair = OCOPair(f"{self._token}_{next(self._seq)}", symbol, exit_side, quantity,
+                       take_profit_price, stop_loss_price)
+        # Indexed before sending, so a fill can never beat its ack
+        with self._lock:
+            self._register(pair)
+        futures = {
+            'tp': self.gateway.submit_order(
+                symbol=symbol,
+                side=exit_side,
+                type=FUTURE_ORDER_TYPE_LIMIT,
+                timeInForce=TIME_IN_FORCE_GTC,
+                quantity=quantity,
+                price=take_profit_price,
+                reduceOnly='true',
+                newClientOrderId=pair.client_ids['tp']
+            ),
+            'sl': self.gateway.submit_order(
+                symbol=symbol,
+                side=exit_side,
+                type=FUTURE_ORDER_TYPE_STOP_MARKET,
+                stopPrice=stop_loss_price,
+                quantity=quantity,
+                reduceOnly='true',
+                newClientOrderId=pair.client_ids['sl']
+            )
+        }
+        # Both acks first: a leg that failed cancels a sibling the exchange already knows
+        updates = []
+        for leg, future in futures.items():
+            try:
+                pair.orders[leg] = future.result()
+                updates.append(pair.orders[leg])
+            except Exception as e:
+                logging.error("OCO %s %s leg failed: %s", pair.id, leg, e)
+                updates.append({'clientOrderId': pair.client_ids[leg], 'status': 'REJECTED'})
+        for update in updates:
+            self.on_order_update(update)
+        logging.info("OCO %s placed: %s TP %s / SL %s", pair.id, symbol, take_profit_price, stop_loss_price)
+        return pair
+
+    def _register(self, pair):
+        self.pairs[pair.id] = pair
+        for leg in LEGS:
+            self._by_client[pair.client_ids[leg]] = (pair, leg)
+
+    def _index_order(self, pair, leg, order_id):
+        if order_id is not None and pair.order_ids[leg] is None:
+            pair.order_ids[leg] = order_id
+            self._by_order[order_id] = (pair, leg)
+
+    def _forget(self, pair, leg):
+        self._by_client.pop(pair.client_ids[leg], None)
+        self._by_order.pop(pair.order_ids[leg], None)
+        pair.done.add(leg)
+        if len(pair.done) == len(LEGS):
+            pair.status = 'DONE'
+            self.pairs.pop(pair.id, None)
+
+    def on_order_update(self, order, received=None):
+        """Handle an order dict with ``clientOrderId`` or ``orderId``, ``status`` and ``executedQty``"""
+        with self._lock:
+            entry = self._by_client.get(order.get('clientOrderId')) or self._by_order.get(order.get('orderId'))
+            if entry is None:
+                return
+            pair, leg = entry
+            self._index_order(pair, leg, order.get('orderId'))
+            status = order.get('status')
+            executed = float(order.get('executedQty') or 0) > 0
+            if status in DONE_STATUSES:
+                self._forget(pair, leg)
+            if pair.status != 'ACTIVE' or not (executed or status in DONE_STATUSES):
+                return
+            pair.status = 'TRIGGERED'
+            pair.triggered = leg
+            sibling = pair.sibling(leg)
+        logging.info("OCO %s %s leg %s, cancelling %s", pair.id, leg, status, sibling)
+        self._cancel(pair, sibling, received or time.perf_counter_ns())
+
+    def _cancel(self, pair, leg, received):
+        future = self.gateway.submit_cancel(symbol=pair.symbol, origClientOrderId=pair.client_ids[leg])
+        future.add_done_callback(lambda f: self._cancelled(pair, leg, received, f))
+
+    def _cancelled(self, pair, leg, received, future):
+        error = future.exception()
+        if error is None:
+            if self.metrics.enabled:
+                self.metrics.record('oco_cancel', pair.symbol, 'CANCEL', time.perf_counter_ns() - received)
+            self.on_order_update(future.result())
+        elif getattr(error, 'code', None) in UNKNOWN_ORDER:
+            # Both legs executed before the cancel landed
+            logging.warning("OCO %s: %s leg already gone when cancelled", pair.id, leg)
+            with self._lock:
+                self._forget(pair, leg)
+        else:
+            # Left indexed: the next recover retries it
+            logging.error("OCO %s: cancelling %s leg failed: %s", pair.id, leg, error)
+
+    def _on_event(self, event):
+        kind = event.get('e')
+        if kind == 'ORDER_TRADE_UPDATE':
+            o = event['o']
+            if o['c'] in self._by_client:
+                self.on_order_update({'clientOrderId': o['c'], 'orderId': o['i'], 'status': o['X'],
+                                      'executedQty': o['z']}, time.perf_counter_ns())
+        elif kind == 'reconciled':
+            self.recover(self.account.open_orders())
+
+    def attach(self, account):
+        """Take fills from a started AccountMirror and recover pairs from its open orders"""
+        self.account = account
+        account.add_listener(self._on_event)
+        self.recover(account.open_orders())
+        return self
+
+    def recover(self, open_orders=None):
+        """Rebuild pairs from open OCO legs and settle any whose sibling is gone; returns pairs restored"""
+        if open_orders is None:
+            open_orders = self.client.futures_get_open_orders()
+        found = {}
+        for order in open_orders:
+            match = CLIENT_ID.match(order.get('clientOrderId') or '')
+            if match:
+                found.setdefault(match.group(1), {})[match.group(2)] = order
+
+        restored, orphans, missing = 0, [], []
+        with self._lock:
+            for pair_id, legs in found.items():
+                if pair_id in self.pairs:
+                    continue
+                tp, sl = legs.get('tp'), legs.get('sl')
+                any_leg = tp or sl
+                pair = OCOPair(pair_id, any_leg['symbol'], any_leg['side'], float(any_leg['origQty']),
+                               float(tp['price']) if tp else None, float(sl['stopPrice']) if sl else None)
+                self._register(pair)
+                for leg, order in legs.items():
+                    self._index_order(pair, leg, order['orderId'])
+                    pair.orders[leg] = order
+                restored += 1
+                if len(legs) < len(LEGS):
+                    # The other leg executed or was cancelled while we were away
+                    gone = pair.sibling(next(iter(legs)))
+                    self._forget(pair, gone)
+                    pair.status = 'TRIGGERED'
+                    pair.triggered = gone
+                    orphans.append((pair, pair.sibling(gone)))
+            for pair in list(self.pairs.values()):
+                for leg in LEGS:
+                    if leg not in pair.done and pair.order_ids[leg] is not None \
+                            and leg not in found.get(pair.id, {}):
+                        missing.append((pair, leg))
+
+        for pair, leg in orphans:
+            logging.warning("OCO %s lost its %s leg, cancelling %s", pair.id, pair.triggered, leg)
+            self._cancel(pair, leg, time.perf_counter_ns())
+        # Known legs absent from the open orders: ask the exchange what happened to them
+        for pair, leg in missing:
+            try:
+                order = self.client.futures_get_order(symbol=pair.symbol, origClientOrderId=pair.client_ids[leg])
+            except Exception as e:
+                logging.error("OCO %s: looking up %s leg failed: %s", pair.id, leg, e)
+                continue
+            self.on_order_update(order)
+        if restored:
+            logging.info("Recovered %d OCO pairs", restored)
+        return restored
+
+    def cancel(self, pair_id):
+        """Cancel both legs of a pair"""
+        pair = self.pairs[pair_id]
+        with self._lock:
+            pair.status = 'TRIGGERED'
+        for leg in LEGS:
+            if leg not in pair.done:
+                self._cancel(pair, leg, time.perf_counter_ns())
+        return pair
+
+    def status(self):
+        with self._lock:
+            return [pair.status_dict() for pair in self.pairs.values()]
@@ -2,14 +2,31 @@ import logging
 from binance.client import Client
 from binance.enums import *
 
+from order_gateway import gateway_for
+from stream_manager import futures_stream_manager
+from symbol_registry import get_registry
+from trigger_engine import get_trigger_engine
+
 class StopLimitOrder:
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, triggers=None):
         self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
+        # Local stops default to the client's shared engine on the futures trade stream
+        self.triggers = triggers or get_trigger_engine(self.gateway, futures_stream_manager(client))
+
+    def place_order(self, symbol, side, quantity, stop_price, limit_price, local=False):
+        """Place stop-limit order: triggers limit order when stop price is hit
 
-    def place_order(self, symbol, side, quantity, stop_price, limit_price):
-        """Place stop-limit order: triggers limit order when stop price is hit"""
+        With ``local`` the stop waits in the trigger engine and the Trigger is returned.
+        """
         try:
-            order = self.client.futures_create_order(
+            if not self.registry.contains(symbol):
+                logging.error("Unknown symbol: %s", symbol)
+                return None
+            if local:
+                return self.triggers.stop(symbol, side, quantity, stop_price, limit_price)
+            order = self.gateway.create_order(
                 symbol=symbol,
                 side=SIDE_BUY if side.upper() == "BUY" else SIDE_SELL,
                 type=FUTURE_ORDER_TYPE_STOP,
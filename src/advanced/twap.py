@@ -1,29 +1,52 @@
 import logging
-import time
 from binance.client import Client
 from binance.enums import *
 
+from order_gateway import gateway_for
+from risk import get_risk_engine
+from symbol_registry import get_registry
+from twap_scheduler import TWAPSchedule, get_twap_scheduler
+
 class TWAPOrder:
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, scheduler=None):
         self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
+        self.risk = get_risk_engine(client)
+        self.scheduler = scheduler or get_twap_scheduler()
 
     def place_order(self, symbol, side, total_quantity, slices, interval_sec):
-        """Place TWAP order: split large orders into smaller chunks over time"""
+        """Place TWAP order: split large orders into smaller chunks over time.
+
+        Returns the running TWAPSchedule immediately; call ``wait()`` on it for the
+        slice orders, or ``progress()``/``pause()``/``cancel()`` to manage it.
+        """
         try:
-            qty_per_order = total_quantity / slices
-            orders = []
-            for i in range(slices):
-                order = self.client.futures_create_order(
-                    symbol=symbol,
-                    side=SIDE_BUY if side.upper() == "BUY" else SIDE_SELL,
-                    type=FUTURE_ORDER_TYPE_MARKET,
-                    quantity=qty_per_order
-                )
-                logging.info("TWAP slice %d/%d placed: %s", i+1, slices, order)
-                orders.append(order)
-                if i < slices - 1:  # Don't sleep after last order
-                    time.sleep(interval_sec)
-            return orders
+            if not self.registry.contains(symbol):
+                logging.error("Unknown symbol: %s", symbol)
+                return None
+            rules = self.risk.rules(symbol)
+            schedule = self.scheduler.add(TWAPSchedule(
+                symbol,
+                SIDE_BUY if side.upper() == "BUY" else SIDE_SELL,
+                total_quantity,
+                slices,
+                interval_sec,
+                self._place_slice,
+                step=rules.market_step if rules else None
+            ))
+            logging.info("TWAP %s scheduled: %s %s %s in %d slices every %ss",
+                         schedule.id, side, total_quantity, symbol, slices, interval_sec)
+            return schedule
         except Exception as e:
             logging.error("Error placing TWAP orders: %s", e)
             return None
+
+    def _place_slice(self, schedule, quantity):
+        return self.gateway.submit_order(
+            symbol=schedule.symbol,
+            side=schedule.side,
+            type=FUTURE_ORDER_TYPE_MARKET,
+            quantity=quantity,
+            newOrderRespType='RESULT'
+        )
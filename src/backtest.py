@@ -0,0 +1,369 @@
+import heapq
+import itertools
+import json
+import math
+from concurrent.futures import Future
+
+import numpy as np
+from binance.exceptions import BinanceAPIException
+
+from risk import RiskEngine
+from symbol_registry import SymbolRegistry
+from twap_scheduler import TWAPScheduler
+
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0004
+SEARCH_CHUNK = 4096         # first window when scanning ahead for a fill
+
+
+def load_kline_csv(path):
+    """Load a Binance kline CSV (data.binance.vision layout, header optional)"""
+    with open(path) as f:
+        first = f.readline()
+    skip = 0 if first[:1].isdigit() else 1
+    data = np.loadtxt(path, delimiter=',', usecols=range(6), skiprows=skip, ndmin=2)
+    return {
+        'ts': data[:, 0].astype(np.int64),
+        'open': data[:, 1],
+        'high': data[:, 2],
+        'low': data[:, 3],
+        'close': data[:, 4],
+        'volume': data[:, 5]
+    }
+
+
+def trades_to_bars(ts, price, qty):
+    """Treat each trade as a one-print bar so trades and klines share one engine"""
+    price = np.asarray(price, dtype=np.float64)
+    return {'ts': np.asarray(ts, dtype=np.int64), 'open': price, 'high': price,
+            'low': price, 'close': price, 'volume': np.asarray(qty, dtype=np.float64)}
+
+
+def _api_error(code, msg):
+    return BinanceAPIException(None, 400, json.dumps({'code': code, 'msg': msg}))
+
+
+class Backtester:
+    """Replays one symbol's history through a local matching model.
+
+    The loop is event-driven: it jumps straight to the next bar where a
+    resting order fills, a stop triggers or a scheduled TWAP slice is due,
+    and finds that bar with vectorized scans over the price arrays instead of
+    stepping through every bar in Python. Strategies that react to prices
+    pass ``on_bar`` to ``run`` and are called at every bar instead.
+
+    Matching model: market orders fill at the current close (taker); a limit
+    order that is marketable on arrival fills at the current close (taker),
+    otherwise it fills at its limit price on the first later bar whose low
+    (buy) or high (sell) reaches it (maker). STOP and STOP_MARKET orders
+    trigger when the high (buy) or low (sell) crosses the stop; STOP_MARKET
+    then fills at the stop, or at the bar open if the market gapped through
+    it, and STOP becomes a limit order at its price. A reduce-only order
+    fills at most the open position and expires if there is none to reduce.
+    ``on_fill`` gets each order as it fills or expires.
+    """
+
+    def __init__(self, symbol, bars, balance=10000.0, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE,
+                 tick_size='0.01', step_size='0.001'):
+        self.symbol = symbol
+        self.ts = bars['ts']
+        self.open = bars['open']
+        self.high = bars['high']
+        self.low = bars['low']
+        self.close = bars['close']
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.i = 0
+        self.initial_balance = balance
+        self.balance = balance
+        self.position = 0.0
+        self.entry_price = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.fills = []
+        self.orders = {}
+        self.client_ids = {}
+        self.on_fill = None
+        self._events = []
+        self._seq = itertools.count()
+        self.scheduler = TWAPScheduler(clock=self.now, autostart=False)
+        self.client = SimulatedClient(self, tick_size, step_size)
+
+    def now(self):
+        """Simulated clock in seconds, for the TWAP scheduler"""
+        return self.ts[self.i] / 1000.0
+
+    # Order lifecycle
+
+    def submit(self, params):
+        order_type = params.get('type')
+        side = params.get('side')
+        if side not in ('BUY', 'SELL'):
+            raise _api_error(-1102, f"Invalid side: {side}")
+        if order_type not in ('MARKET', 'LIMIT', 'STOP', 'STOP_MARKET'):
+            raise _api_error(-1116, f"Unsupported order type in backtest: {order_type}")
+        quantity = float(params['quantity'])
+        if quantity <= 0:
+            raise _api_error(-4003, "Quantity less than or equal to zero.")
+
+        order = {
+            'orderId': len(self.orders) + 1,
+            'clientOrderId': params.get('newClientOrderId', f"bt{len(self.orders) + 1}"),
+            'symbol': self.symbol,
+            'side': side,
+            'type': order_type,
+            'origQty': quantity,
+            'price': float(params.get('price', 0) or 0),
+            'stopPrice': float(params.get('stopPrice', 0) or 0),
+            'reduceOnly': str(params.get('reduceOnly')).lower() == 'true',
+            'executedQty': 0.0,
+            'avgPrice': 0.0,
+            'status': 'NEW',
+            'updateTime': int(self.ts[self.i])
+        }
+        self.orders[order['orderId']] = order
+        self.client_ids[order['clientOrderId']] = order
+
+        if order_type == 'MARKET':
+            self._fill(order, self.close[self.i], maker=False)
+        elif order_type == 'LIMIT':
+            self._arm_limit(order, self.i)
+        else:
+            self._arm_stop(order, self.i + 1)
+        return dict(order)
+
+    def cancel(self, order_id):
+        order = self.orders.get(int(order_id))
+        if order is None or order['status'] in ('FILLED', 'CANCELED'):
+            raise _api_error(-2011, "Unknown order sent.")
+        # Heap entries for cancelled orders are skipped when popped
+        order['status'] = 'CANCELED'
+        order['updateTime'] = int(self.ts[self.i])
+        return dict(order)
+
+    def _arm_limit(self, order, i):
+        price = order['price']
+        buy = order['side'] == 'BUY'
+        if (buy and price >= self.close[i]) or (not buy and price <= self.close[i]):
+            self._fill(order, self.close[i], maker=False)
+            return
+        j = self._first_cross(self.low if buy else self.high, i + 1, price, below=buy)
+        if j is not None:
+            heapq.heappush(self._events, (j, next(self._seq), 'fill', order))
+
+    def _arm_stop(self, order, start):
+        buy = order['side'] == 'BUY'
+        j = self._first_cross(self.high if buy else self.low, start, order['stopPrice'], below=not buy)
+        if j is not None:
+            heapq.heappush(self._events, (j, next(self._seq), 'trigger', order))
+
+    def _first_cross(self, prices, start, level, below):
+        """First index >= start where prices reach level, scanning in growing windows"""
+        n = len(prices)
+        size = SEARCH_CHUNK
+        while start < n:
+            window = prices[start:start + size]
+            mask = window <= level if below else window >= level
+            j = int(mask.argmax())
+            if mask[j]:
+                return start + j
+            start += size
+            size = min(size * 2, 1 << 20)
+        return None
+
+    def _trigger(self, order, i):
+        buy = order['side'] == 'BUY'
+        stop = order['stopPrice']
+        if order['type'] == 'STOP_MARKET':
+            gap = self.open[i] > stop if buy else self.open[i] < stop
+            self._fill(order, self.open[i] if gap else stop, maker=False)
+        elif (buy and order['price'] >= stop) or (not buy and order['price'] <= stop):
+            self._fill(order, stop, maker=False)
+        else:
+            order['status'] = 'NEW'
+            j = self._first_cross(self.low if buy else self.high, i + 1, order['price'], below=buy)
+            if j is not None:
+                heapq.heappush(self._events, (j, next(self._seq), 'fill', order))
+
+    def _fill(self, order, price, maker):
+        qty = order['origQty']
+        if order['reduceOnly']:
+            opposite = self.position < 0 if order['side'] == 'BUY' else self.position > 0
+            qty = min(qty, abs(self.position)) if opposite else 0.0
+            if qty <= 0:
+                order.update(status='EXPIRED', updateTime=int(self.ts[self.i]))
+                if self.on_fill:
+                    self.on_fill(dict(order))
+                return
+        fee = price * qty * (self.maker_fee if maker else self.taker_fee)
+        self.fees += fee
+        self.balance -= fee
+
+        signed = qty if order['side'] == 'BUY' else -qty
+        if self.position == 0 or (self.position > 0) == (signed > 0):
+            size = abs(self.position) + qty
+            self.entry_price = (self.entry_price * abs(self.position) + price * qty) / size
+        else:
+            closing = min(abs(self.position), qty)
+            pnl = closing * (price - self.entry_price) * (1 if self.position > 0 else -1)
+            self.realized_pnl += pnl
+            self.balance += pnl
+            if qty > closing:
+                self.entry_price = price
+        self.position += signed
+        if abs(self.position) < 1e-12:
+            self.position = 0.0
+            self.entry_price = 0.0
+
+        order.update(status='FILLED', executedQty=qty, avgPrice=price, updateTime=int(self.ts[self.i]))
+        self.fills.append((int(self.ts[self.i]), order['orderId'], order['side'], qty, price, fee))
+        if self.on_fill:
+            self.on_fill(dict(order))
+
+    # Replay
+
+    def run(self, strategy=None, on_bar=None):
+        """Run ``strategy(client)`` at the first bar, then replay until no events remain.
+
+        ``on_bar(client, bar)`` is called at the close of every bar, after
+        that bar's fills, with the bar's ts/open/high/low/close; orders it
+        places fill from the close on. It makes the replay visit each bar.
+        """
+        if strategy:
+            strategy(self.client)
+        n = len(self.ts)
+        bar = 0 if on_bar else n
+        while True:
+            next_event = self._events[0][0] if self._events else n
+            due = self.scheduler.next_due()
+            next_timer = int(np.searchsorted(self.ts, math.ceil(due * 1000))) if due is not None else n
+            if bar < min(next_event, next_timer):
+                self.i = bar
+                on_bar(self.client, self.bar(bar))
+                bar += 1
+                continue
+            if min(next_event, next_timer) >= n:
+                break
+            if next_timer <= next_event:
+                self.i = max(self.i, next_timer)
+                self.scheduler.run_pending(self.now())
+                continue
+            self.i, _, kind, order = heapq.heappop(self._events)
+            if order['status'] == 'CANCELED':
+                continue
+            if kind == 'trigger':
+                self._trigger(order, self.i)
+            else:
+                self._fill(order, order['price'], maker=True)
+        self.i = n - 1
+        return self.summary()
+
+    def bar(self, i):
+        return {'ts': int(self.ts[i]), 'open': float(self.open[i]), 'high': float(self.high[i]),
+                'low': float(self.low[i]), 'close': float(self.close[i])}
+
+    def summary(self):
+        last = self.close[-1]
+        unrealized = self.position * (last - self.entry_price)
+        return {
+            'symbol': self.symbol,
+            'bars': len(self.ts),
+            'fills': len(self.fills),
+            'fees': self.fees,
+            'realized_pnl': self.realized_pnl,
+            'unrealized_pnl': unrealized,
+            'position': self.position,
+            'entry_price': self.entry_price,
+            'balance': self.balance,
+            'equity': self.balance + unrealized,
+            'return_pct': (self.balance + unrealized - self.initial_balance) / self.initial_balance * 100
+        }
+
+
+class SimulatedClient:
+    """Order-gateway stand-in backed by a Backtester.
+
+    The order classes accept it in place of a python-binance Client:
+    ``gateway_for`` returns it as-is, ``get_registry`` and ``get_risk_engine``
+    use its own registry and risk engine.
+    """
+
+    def __init__(self, engine, tick_size, step_size):
+        self.engine = engine
+        self._exchange_info = {'symbols': [{
+            'symbol': engine.symbol,
+            'status': 'TRADING',
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'tickSize': tick_size, 'minPrice': tick_size, 'maxPrice': '10000000'},
+                {'filterType': 'LOT_SIZE', 'stepSize': step_size, 'minQty': step_size, 'maxQty': '100000'},
+                {'filterType': 'MIN_NOTIONAL', 'notional': '5'}
+            ]
+        }]}
+        self.registry = SymbolRegistry(self.futures_exchange_info, ttl=None)
+        self.risk = RiskEngine(self.registry)
+
+    def _check_symbol(self, params):
+        if params.get('symbol') != self.engine.symbol:
+            raise _api_error(-1121, "Invalid symbol.")
+
+    def create_order(self, **params):
+        self._check_symbol(params)
+        return self.engine.submit(params)
+
+    def cancel_order(self, **params):
+        self._check_symbol(params)
+        if params.get('orderId') is None:
+            order = self.engine.client_ids.get(params.get('origClientOrderId'))
+            if order is None:
+                raise _api_error(-2011, "Unknown order sent.")
+            return self.engine.cancel(order['orderId'])
+        return self.engine.cancel(params['orderId'])
+
+    def submit_order(self, **params):
+        return self._completed(self.create_order, params)
+
+    def submit_cancel(self, **params):
+        return self._completed(self.cancel_order, params)
+
+    def place_orders(self, orders):
+        results = []
+        for order in orders:
+            try:
+                results.append(self.create_order(**order))
+            except BinanceAPIException as e:
+                results.append({'code': e.code, 'msg': e.message})
+        return results
+
+    @staticmethod
+    def _completed(fn, params):
+        future = Future()
+        try:
+            future.set_result(fn(**params))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def futures_exchange_info(self):
+        return self._exchange_info
+
+    def futures_symbol_ticker(self, **params):
+        return {'symbol': self.engine.symbol, 'price': str(self.engine.close[self.engine.i])}
+
+    def futures_account(self):
+        summary = self.engine.summary()
+        return {
+            'totalWalletBalance': str(summary['balance']),
+            'totalUnrealizedProfit': str(summary['unrealized_pnl']),
+            'totalMarginBalance': str(summary['equity'])
+        }
+
+    def futures_position_information(self, **params):
+        return [{
+            'symbol': self.engine.symbol,
+            'positionAmt': str(self.engine.position),
+            'entryPrice': str(self.engine.entry_price),
+            'markPrice': str(self.engine.close[self.engine.i])
+        }]
+
+    def futures_get_open_orders(self, **params):
+        return [dict(o) for o in self.engine.orders.values() if o['status'] == 'NEW']
@@ -0,0 +1,46 @@
+import os
+
+from binance import Client
+
+from rate_limiter import rate_limit_session
+
+BASE_URL_ENV = 'BINANCE_BASE_URL'
+
+
+class RateLimitedClient(Client):
+    """python-binance Client whose REST calls go through the shared rate limiters"""
+
+    def _init_session(self):
+        return rate_limit_session(super()._init_session())
+
+
+def env_base_url():
+    """Exchange root from BINANCE_BASE_URL, or None to use Binance itself"""
+    return os.getenv(BASE_URL_ENV) or None
+
+
+def make_client(api_key, api_secret, testnet=True, base_url=None):
+    """Rate-limited python-binance Client, optionally aimed at another exchange root.
+
+    With ``base_url`` (e.g. ``http://127.0.0.1:8765`` for the local mock
+    exchange) every spot and futures REST call, including the ping made at
+    construction, goes to ``{base_url}/api`` and ``{base_url}/fapi``.
+    """
+    if not base_url:
+        return RateLimitedClient(api_key, api_secret, testnet=testnet)
+    base_url = base_url.rstrip('/')
+    urls = {
+        'API_URL': f"{base_url}/api",
+        'API_TESTNET_URL': f"{base_url}/api",
+        'FUTURES_URL': f"{base_url}/fapi",
+        'FUTURES_TESTNET_URL': f"{base_url}/fapi",
+        'FUTURES_DATA_URL': f"{base_url}/futures/data",
+        'FUTURES_DATA_TESTNET_URL': f"{base_url}/futures/data",
+    }
+    return type('LocalClient', (RateLimitedClient,), urls)(api_key, api_secret, testnet=testnet)
+
+
+def stream_url(base_url, path='stream'):
+    """WebSocket URL served by the same host as a REST base URL (combined streams by default)"""
+    scheme, rest = base_url.rstrip('/').split('://', 1)
+    return f"{'wss' if scheme == 'https' else 'ws'}://{rest}/{path}"
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+ACK_TIMEOUT = 5     # seconds before an unacknowledged frame stops blocking a client
+
+
+class _Client:
+    __slots__ = ('symbols', 'pending', 'in_flight_since')
+
+    def __init__(self):
+        self.symbols = set()
+        self.pending = {}
+        self.in_flight_since = 0
+
+
+class PriceFanout:
+    """Coalesces ticks and pushes one delta frame per client at a fixed rate.
+
+    Ticks only mark a symbol dirty; a background task flushes ``rate_hz`` times
+    a second. Each client receives a single frame with just the symbols it
+    watches, sent to its own sid so acks are tracked per client. A client
+    that has not acked its last frame gets nothing new: its pending delta is
+    overwritten in place, so slow clients skip stale prices instead of
+    building a queue.
+    """
+
+    def __init__(self, socketio, event='price_update', rate_hz=10):
+        self.socketio = socketio
+        self.event = event
+        self.interval = 1.0 / rate_hz
+        self.clients = {}
+        self.watchers = {}
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def update(self, symbol, value):
+        with self._lock:
+            self._dirty[symbol] = value
+
+    def subscribe(self, sid, symbols):
+        with self._lock:
+            client = self.clients.setdefault(sid, _Client())
+            for symbol in symbols:
+                client.symbols.add(symbol)
+                self.watchers.setdefault(symbol, set()).add(sid)
+
+    def unsubscribe(self, sid, symbols):
+        with self._lock:
+            client = self.clients.get(sid)
+            for symbol in symbols:
+                if client:
+                    client.symbols.discard(symbol)
+                    client.pending.pop(symbol, None)
+                self.watchers.get(symbol, set()).discard(sid)
+
+    def remove_client(self, sid):
+        with self._lock:
+            client = self.clients.pop(sid, None)
+            if client:
+                for symbol in client.symbols:
+                    self.watchers.get(symbol, set()).discard(sid)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error("Price fan-out flush failed: %s", e)
+
+    def flush(self):
+        now = time.monotonic()
+        frames = []
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            for symbol, value in dirty.items():
+                for sid in self.watchers.get(symbol, ()):
+                    self.clients[sid].pending[symbol] = value
+            for sid, client in self.clients.items():
+                if not client.pending:
+                    continue
+                if client.in_flight_since and now - client.in_flight_since < ACK_TIMEOUT:
+                    continue
+                frames.append((sid, client.pending))
+                client.pending = {}
+                client.in_flight_since = now
+        for sid, frame in frames:
+            self.socketio.emit(self.event, frame, to=sid, callback=self._acked(sid))
+
+    def _acked(self, sid):
+        def ack(*args):
+            client = self.clients.get(sid)
+            if client:
+                client.in_flight_since = 0
+        return ack
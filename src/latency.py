@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tick-to-trade latency histograms.
+
+Stages, in nanoseconds (time.perf_counter_ns):
+  decode        stream frame received -> decoded record        (per symbol)
+  decide        record decoded -> order submitted by strategy   (last tick of the order's symbol)
+  queue         order submitted -> picked up by the gateway loop
+  sign          gateway pickup -> request signed
+  send          request signed -> HTTP request headers written
+  ack           HTTP request written -> exchange response received
+  order_to_ack  order submitted -> exchange response received
+  tick_to_trade stream frame received -> exchange response received
+  oco_cancel    OCO leg fill event received -> sibling cancel acknowledged
+
+Dump a running app's histograms with:
+
+    python src/latency.py http://localhost:5000/metrics
+"""
+import sys
+import threading
+import time
+
+SUB_BITS = 5                # 32 sub-buckets per power of two: ~3% relative error
+MAX_BITS = 40               # values are clamped at 2**40 ns (~18 minutes)
+BUCKETS = ((MAX_BITS - SUB_BITS) << SUB_BITS) + (2 << SUB_BITS)
+MAX_VALUE = (1 << MAX_BITS) - 1
+LINK_WINDOW_NS = 1_000_000_000  # an order is tied to its symbol's last tick if it is this recent
+PERCENTILES = (50, 90, 99, 99.9)
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def _bucket_floor(index):
+    if index < 2 << SUB_BITS:
+        return index
+    shift = (index >> SUB_BITS) - 1
+    return (index - (shift << SUB_BITS)) << shift
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of nanosecond values.
+
+    Values below 64ns are counted exactly; above that each power of two is
+    split into 32 buckets, so ``record`` is a bit_length, a shift and a list
+    increment. Concurrent writers can lose an occasional count, which is
+    acceptable for latency metrics and avoids a lock on the hot path.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        if ns > MAX_VALUE:
+            ns = MAX_VALUE
+        shift = ns.bit_length() - SUB_BITS - 1
+        self.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, pct):
+        """Lower bound of the bucket holding the pct-th percentile, in ns"""
+        if not self.count:
+            return 0
+        target = max(1, self.count * pct / 100)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return _bucket_floor(index)
+        return self.max
+
+    def summary(self):
+        """Count, mean, percentiles and max in microseconds"""
+        summary = {'count': self.count, 'mean_us': round(self.total / self.count / 1000, 3) if self.count else 0}
+        for pct in PERCENTILES:
+            summary[f"p{pct:g}_us"] = round(self.percentile(pct) / 1000, 3)
+        summary['max_us'] = round(self.max / 1000, 3)
+        return summary
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.count = self.total = self.max = 0
+
+
+class OrderTrace:
+    """Stage timestamps for one order request, finished by the gateway"""
+
+    __slots__ = ('symbol', 'order_type', 'received', 'decoded', 'submitted', 'started', 'signed', 'sent')
+
+    def __init__(self, symbol, order_type, tick, submitted):
+        self.symbol = symbol
+        self.order_type = order_type
+        self.received, self.decoded = tick if tick else (0, 0)
+        self.submitted = submitted
+        self.started = self.signed = self.sent = 0
+
+
+class LatencyMetrics:
+    """Histograms keyed by (stage, symbol, order type)"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.last_tick = {}
+        self.started_at = time.time()
+
+    def record(self, stage, symbol, order_type, ns):
+        histogram = self.histograms.get((stage, symbol, order_type))
+        if histogram is None:
+            histogram = self.histograms.setdefault((stage, symbol, order_type), LatencyHistogram())
+        histogram.record(ns)
+
+    def mark_tick(self, record, received):
+        """Called by the stream reader after decoding a frame received at ``received``"""
+        symbol = getattr(record, 'symbol', None)
+        if symbol is None or not self.enabled:
+            return
+        decoded = time.perf_counter_ns()
+        self.last_tick[symbol] = (received, decoded)
+        self.record('decode', symbol, '', decoded - received)
+
+    def trace_order(self, symbol, order_type):
+        """Start a trace when a strategy submits an order, or None when disabled"""
+        if not self.enabled:
+            return None
+        now = time.perf_counter_ns()
+        tick = self.last_tick.get(symbol)
+        if tick and now - tick[1] > LINK_WINDOW_NS:
+            tick = None
+        return OrderTrace(symbol, order_type, tick, now)
+
+    def finish(self, trace):
+        """Record every stage of a trace once its response has arrived"""
+        acked = time.perf_counter_ns()
+        symbol, order_type = trace.symbol, trace.order_type
+        record = self.record
+        record('queue', symbol, order_type, trace.started - trace.submitted)
+        record('sign', symbol, order_type, trace.signed - trace.started)
+        if trace.sent:
+            record('send', symbol, order_type, trace.sent - trace.signed)
+            record('ack', symbol, order_type, acked - trace.sent)
+        record('order_to_ack', symbol, order_type, acked - trace.submitted)
+        if trace.received:
+            record('decide', symbol, order_type, trace.submitted - trace.decoded)
+            record('tick_to_trade', symbol, order_type, acked - trace.received)
+
+    def snapshot(self):
+        """JSON-ready list of histogram summaries"""
+        rows = []
+        for (stage, symbol, order_type), histogram in sorted(self.histograms.items()):
+            row = {'stage': stage, 'symbol': symbol, 'order_type': order_type}
+            row.update(histogram.summary())
+            rows.append(row)
+        return {'since': self.started_at, 'histograms': rows}
+
+    def prometheus(self):
+        """Snapshot in the Prometheus text format, as summaries in seconds"""
+        lines = ['# TYPE trading_latency_seconds summary']
+        for row in self.snapshot()['histograms']:
+            labels = f'stage="{row["stage"]}",symbol="{row["symbol"]}",order_type="{row["order_type"]}"'
+            for pct in PERCENTILES:
+                value = row[f"p{pct:g}_us"] / 1e6
+                lines.append(f'trading_latency_seconds{{{labels},quantile="{pct / 100:g}"}} {value:.9f}')
+            lines.append(f"trading_latency_seconds_sum{{{labels}}} {row['mean_us'] * row['count'] / 1e6:.9f}")
+            lines.append(f"trading_latency_seconds_count{{{labels}}} {row['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def dump(self, out=None):
+        print_table(self.snapshot()['histograms'], out or sys.stdout)
+
+
+def print_table(rows, out=None):
+    out = out or sys.stdout
+    if not rows:
+        print("No latency samples recorded", file=out)
+        return
+    print(f"{'stage':<14}{'symbol':<10}{'type':<12}{'count':>9}{'mean':>10}{'p50':>10}{'p90':>10}"
+          f"{'p99':>10}{'p99.9':>10}{'max':>10}  (us)", file=out)
+    for row in rows:
+        print(f"{row['stage']:<14}{row['symbol']:<10}{row['order_type']:<12}{row['count']:>9}"
+              f"{row['mean_us']:>10.1f}{row['p50_us']:>10.1f}{row['p90_us']:>10.1f}"
+              f"{row['p99_us']:>10.1f}{row['p99.9_us']:>10.1f}{row['max_us']:>10.1f}", file=out)
+
+
+def get_latency_metrics():
+    """Return the process-wide latency metrics"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = LatencyMetrics()
+        return _metrics
+
+
+def main():
+    import requests
+
+    url = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000/metrics'
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    print_table(response.json()['histograms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,21 @@ import logging
 from binance.client import Client
 from binance.enums import *
 
+from order_gateway import gateway_for
+from symbol_registry import get_registry
+
 class LimitOrder:
     def __init__(self, client: Client):
         self.client = client
+        self.registry = get_registry(client)
+        self.gateway = gateway_for(client)
 
     def place_order(self, symbol, side, quantity, price):
         try:
-            order = self.client.futures_create_order(
+            if not self.registry.contains(symbol):
+                logging.error("Unknown symbol: %s", symbol)
+                return None
+            order = self.gateway.create_order(
                 symbol=symbol,
                 side=SIDE_BUY if side.upper() == "BUY" else SIDE_SELL,
                 type=FUTURE_ORDER_TYPE_LIMIT,
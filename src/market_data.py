@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from endpoints import env_base_url
+from price_board import DEFAULT_NAME, SEQLOCK_SAFE, PriceBoard
+from rate_limiter import http_session
+from stream_manager import get_stream_manager
+from tick_history import TickHistory
+
+SPOT_TICKER_URL = 'https://api.binance.com/api/v3/ticker/24hr'
+POLL_INTERVAL = 2
+BOARD_INTERVAL = 0.1    # seconds between checks of the price board for new writes
+
+
+class MarketDataCache(ABC):
+    """Latest 24hr quote per symbol, shared by the dashboard apps.
+
+    Quotes are small dicts (price, change_24h, volume, timestamp). Writers
+    replace a symbol's dict rather than mutating it, so ``snapshot()`` is a
+    shallow copy that readers can use without locking. Every update is also
+    appended to ``history`` for charts and passed to ``listeners`` as
+    ``listener(symbol, price)``.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = [s.upper() for s in symbols]
+        self.quotes = {}
+        self.history = TickHistory()
+        self.listeners = []
+        self.updated_at = 0
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def get(self, symbol):
+        return self.quotes.get(symbol)
+
+    def snapshot(self):
+        return dict(self.quotes)
+
+    def _set(self, symbol, price, change_24h, volume, event_time=None):
+        now = time.time()
+        self.quotes[symbol] = {
+            'price': price,
+            'change_24h': change_24h,
+            'volume': volume,
+            'timestamp': now
+        }
+        self.history.append(symbol, event_time or int(now * 1000), price)
+        self.updated_at = now
+        for listener in self.listeners:
+            listener(symbol, price)
+
+    @abstractmethod
+    def start(self):
+        """Begin filling the cache from the backend"""
+
+
+class StreamMarketData(MarketDataCache):
+    """Push backend: @ticker streams through the shared stream manager"""
+
+    def start(self):
+        streams = [f"{symbol.lower()}@ticker" for symbol in self.symbols]
+        get_stream_manager().subscribe(streams, self._on_ticker)
+
+    def _on_ticker(self, stream, ticker):
+        self._set(ticker.symbol, ticker.price, ticker.change_pct, ticker.volume, ticker.event_time)
+
+
+class PollingMarketData(MarketDataCache):
+    """Pull backend: only the requested symbols, over one keep-alive session"""
+
+    def __init__(self, symbols, interval=POLL_INTERVAL):
+        super().__init__(symbols)
+        self.interval = interval
+        self.session = http_session()
+        base_url = env_base_url()
+        self.url = f"{base_url.rstrip('/')}/api/v3/ticker/24hr" if base_url else SPOT_TICKER_URL
+        self._params = {'symbols': json.dumps(self.symbols, separators=(',', ':'))}
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def poll(self):
+        response = self.session.get(self.url, params=self._params, timeout=5)
+        response.raise_for_status()
+        for item in response.json():
+            self._set(item['symbol'], float(item['lastPrice']), float(item['priceChangePercent']),
+                      float(item['volume']), item['closeTime'])
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+                time.sleep(self.interval)
+            except Exception as e:
+                logging.error("Error polling market data: %s", e)
+                time.sleep(5)
+
+
+class BoardMarketData(MarketDataCache):
+    """Reader backend: quotes from a shared-memory PriceBoard fed by ``src/price_board.py``.
+
+    For multi-worker deployments: no upstream connection per worker.
+    ``get`` and ``snapshot`` read the board directly; a thread watches the
+    slot sequences to append history and call listeners for new writes.
+    """
+
+    def __init__(self, symbols, name=None, interval=BOARD_INTERVAL):
+        super().__init__(symbols)
+        self.name = name or os.getenv('PRICE_BOARD', DEFAULT_NAME)
+        self.interval = interval
+        self.board = None
+
+    def get(self, symbol):
+        return self.board.read(symbol) if self.board else None
+
+    def snapshot(self):
+        return self.board.snapshot(self.symbols) if self.board else {}
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        versions = None
+        while True:
+            try:
+                if self.board is None:
+                    self.board = PriceBoard.attach(self.name)
+                    versions = self.board.versions()
+                    logging.info("Reading prices from board %s", self.name)
+                else:
+                    symbols, versions = self.board.changed(versions)
+                    for symbol in symbols:
+                        self._notify(symbol)
+                time.sleep(self.interval)
+            except FileNotFoundError:
+                # The feeder has not created the board yet
+                time.sleep(1)
+            except Exception as e:
+                logging.error("Error reading price board: %s", e)
+                time.sleep(5)
+
+    def _notify(self, symbol):
+        if symbol not in self.symbols:
+            return
+        quote = self.board.read(symbol)
+        if quote is None:
+            # Cleared after a feeder died mid-write
+            return
+        self.history.append(symbol, int(quote['timestamp'] * 1000), quote['price'])
+        self.updated_at = quote['timestamp']
+        for listener in self.listeners:
+            listener(symbol, quote['price'])
+
+
+def create_market_data(symbols, backend=None):
+    """Build and start a cache; backend is 'stream', 'poll' or 'board' (MARKET_DATA_BACKEND)"""
+    backend = backend or os.getenv('MARKET_DATA_BACKEND', 'stream')
+    if backend == 'stream':
+        cache = StreamMarketData(symbols)
+    elif backend == 'poll':
+        cache = PollingMarketData(symbols)
+    elif backend == 'board' and not SEQLOCK_SAFE:
+        logging.warning("Price board reads are not safe on %s, using the stream backend", platform.machine())
+        cache = StreamMarketData(symbols)
+    elif backend == 'board':
+        cache = BoardMarketData(symbols)
+    else:
+        raise ValueError(f"Unknown market data backend: {backend}")
+    cache.start()
+    return cache
@@ -0,0 +1,960 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Binance USDT-M Futures API, for offline load testing.
+
+    python src/mock_exchange.py --port 8765 --latency-ms 5 --weight-limit 2400
+
+Serves the REST endpoints the bots use (orders, batch orders, cancels,
+account, exchange info, depth, tickers, listen keys) plus combined market
+streams on ``/stream`` and user-data streams on ``/ws/<listenKey>``. Point a
+bot at it with ``BINANCE_BASE_URL=http://127.0.0.1:8765``.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import math
+import random
+import secrets
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from aiohttp import WSMsgType, web
+
+# symbol: (start price, tick size, step size)
+DEFAULT_SYMBOLS = {
+    'BTCUSDT': (60000.0, '0.10', '0.001'),
+    'ETHUSDT': (3000.0, '0.01', '0.001'),
+    'ADAUSDT': (0.45, '0.0001', '1'),
+    'SOLUSDT': (150.0, '0.01', '1'),
+}
+DEFAULT_PORT = 8765
+BOOK_LEVELS = 20
+TICK_MS = 100               # price steps (and depth diffs) every 100ms
+TICKER_MS = 1000            # 24hr ticker events once a second
+VOLATILITY = 0.0003         # per-step standard deviation of log returns
+MIN_NOTIONAL = 5
+WEIGHT_LIMIT = 2400         # request weight per minute
+ORDER_LIMIT = 1200          # new orders per minute
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0004
+
+ORDER_TYPES = ('MARKET', 'LIMIT', 'STOP', 'STOP_MARKET', 'TAKE_PROFIT', 'TAKE_PROFIT_MARKET')
+ORDER_PATHS = ('/fapi/v1/order', '/fapi/v1/batchOrders')
+
+# Request weights per (method, path); unlisted routes cost 1 and depth is priced by limit
+WEIGHTS = {
+    ('POST', '/fapi/v1/batchOrders'): 5,
+    ('GET', '/fapi/v1/account'): 5,
+    ('GET', '/fapi/v2/account'): 5,
+    ('GET', '/fapi/v2/balance'): 5,
+    ('GET', '/fapi/v2/positionRisk'): 5,
+    ('GET', '/api/v3/ticker/24hr'): 2,
+}
+
+
+class ExchangeError(Exception):
+    """An API error, rendered as Binance's ``{"code", "msg"}`` body"""
+
+    def __init__(self, code, msg, status=400):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+        self.status = status
+
+
+def _decimals(step):
+    return len(step.rstrip('0').split('.')[1]) if '.' in step.rstrip('0') else 0
+
+
+def _on_grid(value, step):
+    units = value / step
+    return abs(units - round(units)) < 1e-6
+
+
+def _depth_weight(limit):
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    return 10 if limit <= 500 else 20
+
+
+class _Market:
+    """Price process, synthetic L2 book and resting orders for one symbol"""
+
+    def __init__(self, symbol, price, tick_size, step_size):
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.tick = float(tick_size)
+        self.step = float(step_size)
+        self.price_decimals = _decimals(tick_size)
+        self.qty_decimals = _decimals(step_size)
+        self.mid = price
+        self.bid = math.floor(price / self.tick) * self.tick
+        self.ask = self.bid + self.tick
+        self.last = round(self.bid, self.price_decimals)
+        self.open = self.high = self.low = self.last
+        self.open_time = int(time.time() * 1000)
+        self.volume = 0.0
+        self.quote_volume = 0.0
+        self.trade_id = 0
+        self.update_id = 1
+        self.bids = {}
+        self.asks = {}
+        self.orders = []
+
+    def price(self, value):
+        return f"{value:.{self.price_decimals}f}"
+
+    def qty(self, value):
+        return f"{value:.{self.qty_decimals}f}"
+
+
+class MockExchange:
+    """Single-account futures exchange with an in-process matching engine.
+
+    Prices follow a random walk stepped by ``step()``; each step also rebuilds
+    a synthetic book around the new price and matches resting orders against
+    the step's trade. Market orders fill at the touch (taker), marketable
+    limits at the touch (taker) and resting limits at their price once a
+    trade reaches it (maker). Stop and take-profit orders trigger on the last
+    trade and then behave as market or limit orders. Orders always fill in
+    full. Not thread-safe: the server drives it from its event loop.
+    """
+
+    def __init__(self, symbols=None, balance=10000.0, volatility=VOLATILITY,
+                 maker_fee=MAKER_FEE, taker_fee=TAKER_FEE, seed=None):
+        self.random = random.Random(seed)
+        self.volatility = volatility
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.balance = balance
+        self.markets = {s: _Market(s, *spec) for s, spec in (symbols or DEFAULT_SYMBOLS).items()}
+        self.positions = {}
+        self.orders = {}
+        self.client_ids = {}
+        self.on_user_event = None
+        self._order_ids = itertools.count(1)
+        for market in self.markets.values():
+            self._rebuild_book(market)
+
+    @staticmethod
+    def now():
+        return int(time.time() * 1000)
+
+    def market(self, symbol):
+        market = self.markets.get(symbol)
+        if market is None:
+            raise ExchangeError(-1121, "Invalid symbol.")
+        return market
+
+    # Market simulation
+
+    def step(self, ticker=False):
+        """Advance every market one step; returns the (stream, event) pairs produced"""
+        events = []
+        now = self.now()
+        for market in self.markets.values():
+            symbol = market.symbol.lower()
+            market.mid *= math.exp(self.random.gauss(0, self.volatility))
+            market.bid = math.floor(market.mid / market.tick) * market.tick
+            market.ask = market.bid + market.tick
+            buyer_maker = self.random.random() < 0.5
+            market.last = round(market.bid if buyer_maker else market.ask, market.price_decimals)
+            qty = max(market.step, round(self.random.uniform(100, 5000) / market.last, market.qty_decimals))
+            market.trade_id += 1
+            market.high = max(market.high, market.last)
+            market.low = min(market.low, market.last)
+            market.volume += qty
+            market.quote_volume += qty * market.last
+            events.append((f"{symbol}@trade", {
+                'e': 'trade', 'E': now, 's': market.symbol, 't': market.trade_id,
+                'p': market.price(market.last), 'q': market.qty(qty), 'T': now, 'm': buyer_maker, 'M': True
+            }))
+            events.append((f"{symbol}@aggTrade", {
+                'e': 'aggTrade', 'E': now, 's': market.symbol, 'a': market.trade_id, 'p': market.price(market.last),
+                'q': market.qty(qty), 'f': market.trade_id, 'l': market.trade_id, 'T': now, 'm': buyer_maker
+            }))
+
+            bids, asks = self._rebuild_book(market)
+            first_id = market.update_id + 1
+            market.update_id += max(1, len(bids) + len(asks))
+            depth = {'e': 'depthUpdate', 'E': now, 's': market.symbol,
+                     'U': first_id, 'u': market.update_id, 'b': bids, 'a': asks}
+            events.append((f"{symbol}@depth", depth))
+            events.append((f"{symbol}@depth@100ms", depth))
+            if ticker:
+                events.append((f"{symbol}@ticker", self.ticker_event(market, now)))
+            self._match(market)
+        return events
+
+    def _rebuild_book(self, market):
+        """Re-centre the book on the current touch; returns the changed levels"""
+        def side(old, best, direction):
+            new = {}
+            for i in range(BOOK_LEVELS):
+                price = round(best + direction * i * market.tick, market.price_decimals)
+                qty = old.get(price)
+                if qty is None or self.random.random() < 0.2:
+                    qty = max(market.step, round(self.random.uniform(1000, 50000) / market.mid, market.qty_decimals))
+                new[price] = qty
+            changes = [[market.price(p), market.qty(q)] for p, q in new.items() if old.get(p) != q]
+            changes += [[market.price(p), '0'] for p in old if p not in new]
+            return new, changes
+
+        market.bids, bid_changes = side(market.bids, market.bid, -1)
+        market.asks, ask_changes = side(market.asks, market.ask, 1)
+        return bid_changes, ask_changes
+
+    def _match(self, market):
+        last = market.last
+        for order in market.orders:
+            if order['status'] != 'NEW':
+                continue
+            buy = order['side'] == 'BUY'
+            if not order['triggered']:
+                stop = order['stopPrice']
+                if order['type'].startswith('STOP'):
+                    hit = last >= stop if buy else last <= stop
+                else:
+                    hit = last <= stop if buy else last >= stop
+                if not hit:
+                    continue
+                order['triggered'] = True
+                if order['type'].endswith('MARKET'):
+                    self._fill(market, order, last, maker=False)
+                    continue
+                if (buy and order['price'] >= market.ask) or (not buy and order['price'] <= market.bid):
+                    self._fill(market, order, market.ask if buy else market.bid, maker=False)
+                    continue
+            if (buy and last <= order['price']) or (not buy and last >= order['price']):
+                self._fill(market, order, order['price'], maker=True)
+        market.orders = [o for o in market.orders if o['status'] == 'NEW']
+
+    # Orders
+
+    def place(self, params):
+        market = self.market(params.get('symbol'))
+        side = params.get('side')
+        order_type = params.get('type')
+        if side not in ('BUY', 'SELL'):
+            raise ExchangeError(-1117, "Invalid side.")
+        if order_type not in ORDER_TYPES:
+            raise ExchangeError(-1116, "Invalid orderType.")
+        quantity = self._number(params, 'quantity')
+        if quantity <= 0 or not _on_grid(quantity, market.step):
+            raise ExchangeError(-1111, "Precision is over the maximum defined for this asset.")
+
+        needs_price = order_type in ('LIMIT', 'STOP', 'TAKE_PROFIT')
+        price = self._number(params, 'price') if needs_price else 0.0
+        stop_price = self._number(params, 'stopPrice') if order_type not in ('MARKET', 'LIMIT') else 0.0
+        for value in (price, stop_price):
+            if value and not _on_grid(value, market.tick):
+                raise ExchangeError(-4014, "Price not increased by tick size.")
+        reduce_only = str(params.get('reduceOnly', 'false')).lower() == 'true'
+        if quantity * (price or market.last) < MIN_NOTIONAL and not reduce_only:
+            raise ExchangeError(-4164, f"Order's notional must be no smaller than {MIN_NOTIONAL} (unless you choose reduce only).")
+        if stop_price:
+            buy = side == 'BUY'
+            up = order_type.startswith('STOP') == buy
+            if (up and market.last >= stop_price) or (not up and market.last <= stop_price):
+                raise ExchangeError(-2021, "Order would immediately trigger.")
+
+        order_id = next(self._order_ids)
+        client_id = params.get('newClientOrderId') or f"mock{order_id}"
+        existing = self.client_ids.get(client_id)
+        if existing is not None and existing['status'] == 'NEW':
+            raise ExchangeError(-4116, "ClientOrderId is duplicated.")
+        now = self.now()
+        order = {
+            'orderId': order_id,
+            'symbol': market.symbol,
+            'clientOrderId': client_id,
+            'side': side,
+            'type': order_type,
+            'timeInForce': params.get('timeInForce', 'GTC'),
+            'origQty': quantity,
+            'price': price,
+            'stopPrice': stop_price,
+            'executedQty': 0.0,
+            'avgPrice': 0.0,
+            'reduceOnly': reduce_only,
+            'status': 'NEW',
+            'triggered': not stop_price,
+            'time': now,
+            'updateTime': now
+        }
+        self.orders[order_id] = order
+        self.client_ids[client_id] = order
+        self._emit_order(market, order, 'NEW')
+        ack = self.render(order)
+
+        buy = side == 'BUY'
+        if order_type == 'MARKET':
+            self._fill(market, order, market.ask if buy else market.bid, maker=False)
+        elif order_type == 'LIMIT':
+            if (buy and price >= market.ask) or (not buy and price <= market.bid):
+                self._fill(market, order, market.ask if buy else market.bid, maker=False)
+            elif order['timeInForce'] in ('IOC', 'FOK'):
+                self._finish(market, order, 'EXPIRED')
+            else:
+                market.orders.append(order)
+        else:
+            market.orders.append(order)
+        return self.render(order) if params.get('newOrderRespType') == 'RESULT' else ack
+
+    def cancel(self, params):
+        order = self.find(params)
+        if order is None or order['status'] != 'NEW':
+            raise ExchangeError(-2011, "Unknown order sent.")
+        self._finish(self.markets[order['symbol']], order, 'CANCELED')
+        return self.render(order)
+
+    def cancel_all(self, symbol):
+        market = self.market(symbol)
+        for order in market.orders:
+            if order['status'] == 'NEW':
+                self._finish(market, order, 'CANCELED')
+        market.orders = []
+
+    def find(self, params):
+        if params.get('orderId'):
+            order = self.orders.get(int(params['orderId']))
+        else:
+            order = self.client_ids.get(params.get('origClientOrderId'))
+        if order is not None and order['symbol'] != params.get('symbol'):
+            return None
+        return order
+
+    def open_orders(self, symbol=None):
+        markets = [self.market(symbol)] if symbol else self.markets.values()
+        return [self.render(o) for market in markets for o in market.orders if o['status'] == 'NEW']
+
+    @staticmethod
+    def _number(params, name):
+        try:
+            return float(params[name])
+        except (KeyError, TypeError, ValueError):
+            raise ExchangeError(-1102, f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.")
+
+    def _finish(self, market, order, status):
+        order['status'] = status
+        order['updateTime'] = self.now()
+        self._emit_order(market, order, status)
+
+    def _fill(self, market, order, price, maker):
+        qty = order['origQty']
+        fee = price * qty * (self.maker_fee if maker else self.taker_fee)
+        position = self.positions.setdefault(market.symbol, [0.0, 0.0])
+        amount, entry = position
+        signed = qty if order['side'] == 'BUY' else -qty
+        pnl = 0.0
+        if amount == 0 or (amount > 0) == (signed > 0):
+            entry = (entry * abs(amount) + price * qty) / (abs(amount) + qty)
+        else:
+            closing = min(abs(amount), qty)
+            pnl = closing * (price - entry) * (1 if amount > 0 else -1)
+            if qty > closing:
+                entry = price
+        amount += signed
+        if abs(amount) < 1e-12:
+            amount, entry = 0.0, 0.0
+        position[:] = [amount, entry]
+        self.balance += pnl - fee
+
+        order.update(status='FILLED', executedQty=qty, avgPrice=price, updateTime=self.now())
+        self._emit_order(market, order, 'TRADE', qty, price, fee, maker, pnl)
+        self._emit_account(market)
+
+    # Views
+
+    def render(self, order):
+        market = self.markets[order['symbol']]
+        return {
+            'orderId': order['orderId'],
+            'symbol': order['symbol'],
+            'status': order['status'],
+            'clientOrderId': order['clientOrderId'],
+            'price': market.price(order['price']),
+            'avgPrice': market.price(order['avgPrice']),
+            'origQty': market.qty(order['origQty']),
+            'executedQty': market.qty(order['executedQty']),
+            'cumQuote': f"{order['executedQty'] * order['avgPrice']:.8f}",
+            'timeInForce': order['timeInForce'],
+            'type': order['type'],
+            'origType': order['type'],
+            'reduceOnly': order['reduceOnly'],
+            'closePosition': False,
+            'side': order['side'],
+            'positionSide': 'BOTH',
+            'stopPrice': market.price(order['stopPrice']),
+            'workingType': 'CONTRACT_PRICE',
+            'priceProtect': False,
+            'time': order['time'],
+            'updateTime': order['updateTime']
+        }
+
+    def unrealized(self):
+        return sum(amount * (self.markets[s].last - entry) for s, (amount, entry) in self.positions.items())
+
+    def account(self):
+        unrealized = self.unrealized()
+        balance = f"{self.balance:.8f}"
+        return {
+            'totalWalletBalance': balance,
+            'totalUnrealizedProfit': f"{unrealized:.8f}",
+            'totalMarginBalance': f"{self.balance + unrealized:.8f}",
+            'availableBalance': balance,
+            'maxWithdrawAmount': balance,
+            'assets': self.balances(),
+            'positions': self.position_risk()
+        }
+
+    def balances(self):
+        balance = f"{self.balance:.8f}"
+        return [{'asset': 'USDT', 'walletBalance': balance, 'balance': balance,
+                 'availableBalance': balance, 'crossUnPnl': f"{self.unrealized():.8f}"}]
+
+    def position_risk(self):
+        risk = []
+        for symbol, market in self.markets.items():
+            amount, entry = self.positions.get(symbol, (0.0, 0.0))
+            risk.append({
+                'symbol': symbol,
+                'positionAmt': market.qty(amount),
+                'entryPrice': f"{entry:.8f}",
+                'markPrice': market.price(market.last),
+                'unRealizedProfit': f"{amount * (market.last - entry):.8f}",
+                'leverage': '20',
+                'marginType': 'cross',
+                'positionSide': 'BOTH',
+                'updateTime': self.now()
+            })
+        return risk
+
+    def exchange_info(self):
+        symbols = []
+        for symbol, market in self.markets.items():
+            symbols.append({
+                'symbol': symbol,
+                'pair': symbol,
+                'contractType': 'PERPETUAL',
+                'status': 'TRADING',
+                'baseAsset': symbol[:-4],
+                'quoteAsset': 'USDT',
+                'marginAsset': 'USDT',
+                'pricePrecision': market.price_decimals,
+                'quantityPrecision': market.qty_decimals,
+                'orderTypes': list(ORDER_TYPES),
+                'timeInForce': ['GTC', 'IOC', 'FOK', 'GTX'],
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'tickSize': market.tick_size,
+                     'minPrice': market.tick_size, 'maxPrice': '10000000'},
+                    {'filterType': 'LOT_SIZE', 'stepSize': market.step_size,
+                     'minQty': market.step_size, 'maxQty': '100000'},
+                    {'filterType': 'MARKET_LOT_SIZE', 'stepSize': market.step_size,
+                     'minQty': market.step_size, 'maxQty': '10000'},
+                    {'filterType': 'MIN_NOTIONAL', 'notional': str(MIN_NOTIONAL)},
+                    {'filterType': 'PERCENT_PRICE', 'multiplierUp': '1.0500',
+                     'multiplierDown': '0.9500', 'multiplierDecimal': '4'}
+                ]
+            })
+        return {'timezone': 'UTC', 'serverTime': self.now(), 'rateLimits': [
+            {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': WEIGHT_LIMIT},
+            {'rateLimitType': 'ORDERS', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': ORDER_LIMIT}
+        ], 'symbols': symbols}
+
+    def depth(self, symbol, limit=100):
+        market = self.market(symbol)
+        bids = sorted(market.bids.items(), reverse=True)[:limit]
+        asks = sorted(market.asks.items())[:limit]
+        return {
+            'lastUpdateId': market.update_id,
+            'E': self.now(),
+            'T': self.now(),
+            'bids': [[market.price(p), market.qty(q)] for p, q in bids],
+            'asks': [[market.price(p), market.qty(q)] for p, q in asks]
+        }
+
+    def ticker_event(self, market, now):
+        change = market.last - market.open
+        return {
+            'e': '24hrTicker', 'E': now, 's': market.symbol,
+            'p': market.price(change), 'P': f"{change / market.open * 100:.3f}",
+            'c': market.price(market.last), 'o': market.price(market.open),
+            'h': market.price(market.high), 'l': market.price(market.low),
+            'v': market.qty(market.volume), 'q': f"{market.quote_volume:.2f}",
+            'O': market.open_time, 'C': now, 'n': market.trade_id
+        }
+
+    def ticker_24hr(self, market):
+        event = self.ticker_event(market, self.now())
+        return {
+            'symbol': market.symbol, 'priceChange': event['p'], 'priceChangePercent': event['P'],
+            'lastPrice': event['c'], 'openPrice': event['o'], 'highPrice': event['h'],
+            'lowPrice': event['l'], 'volume': event['v'], 'quoteVolume': event['q'],
+            'openTime': event['O'], 'closeTime': event['C'], 'count': event['n']
+        }
+
+    # User data events
+
+    def _emit_order(self, market, order, execution, last_qty=0.0, last_price=0.0, fee=0.0, maker=False, pnl=0.0):
+        if self.on_user_event is None:
+            return
+        now = self.now()
+        self.on_user_event({'e': 'ORDER_TRADE_UPDATE', 'E': now, 'T': now, 'o': {
+            's': order['symbol'], 'c': order['clientOrderId'], 'S': order['side'], 'o': order['type'],
+            'f': order['timeInForce'], 'q': market.qty(order['origQty']), 'p': market.price(order['price']),
+            'ap': market.price(order['avgPrice']), 'sp': market.price(order['stopPrice']),
+            'x': execution, 'X': order['status'], 'i': order['orderId'],
+            'l': market.qty(last_qty), 'z': market.qty(order['executedQty']), 'L': market.price(last_price),
+            'N': 'USDT', 'n': f"{fee:.8f}", 'T': now, 't': market.trade_id if last_qty else 0,
+            'm': maker, 'R': order['reduceOnly'], 'wt': 'CONTRACT_PRICE', 'ot': order['type'],
+            'ps': 'BOTH', 'cp': False, 'rp': f"{pnl:.8f}"
+        }})
+
+    def _emit_account(self, market):
+        if self.on_user_event is None:
+            return
+        now = self.now()
+        amount, entry = self.positions.get(market.symbol, (0.0, 0.0))
+        balance = f"{self.balance:.8f}"
+        self.on_user_event({'e': 'ACCOUNT_UPDATE', 'E': now, 'T': now, 'a': {
+            'm': 'ORDER',
+            'B': [{'a': 'USDT', 'wb': balance, 'cw': balance, 'bc': '0'}],
+            'P': [{'s': market.symbol, 'pa': market.qty(amount), 'ep': f"{entry:.8f}", 'cr': '0',
+                   'up': f"{amount * (market.last - entry):.8f}", 'mt': 'cross', 'iw': '0', 'ps': 'BOTH'}]
+        }})
+
+
+class MockExchangeServer:
+    """HTTP and WebSocket front end for a MockExchange.
+
+    Every REST call waits ``latency_ms`` plus up to ``jitter_ms`` of uniform
+    jitter, costs request weight against a per-minute budget and reports it
+    in ``X-MBX-USED-WEIGHT-1M`` (order routes also report
+    ``X-MBX-ORDER-COUNT-1M``). Going over either budget returns 429 with a
+    ``Retry-After`` header until the minute rolls over. API keys are not
+    checked; signatures are verified only when ``api_secret`` is set.
+
+    ``run()`` serves in the foreground; ``start()`` serves from a background
+    thread (for benchmarks) and ``base_url`` then reports the bound port.
+    """
+
+    def __init__(self, exchange=None, host='127.0.0.1', port=DEFAULT_PORT, latency_ms=0, jitter_ms=0,
+                 weight_limit=WEIGHT_LIMIT, order_limit=ORDER_LIMIT, tick_ms=TICK_MS, ticker_ms=TICKER_MS,
+                 api_secret=None):
+        self.exchange = exchange or MockExchange()
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.weight_limit = weight_limit
+        self.order_limit = order_limit
+        self.tick_ms = tick_ms
+        self.ticker_ms = ticker_ms
+        self.api_secret = api_secret.encode() if api_secret else None
+        self.listen_key = None
+        self.stream_clients = {}
+        self.user_clients = set()
+        self.loop = None
+        self._window = 0
+        self._used_weight = 0
+        self._order_count = 0
+        self._runner = None
+        self._ticker_task = None
+        self.exchange.on_user_event = self._push_user_event
+        self.app = self._build_app()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _build_app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get('/api/v3/ping', self._ping)
+        app.router.add_get('/fapi/v1/ping', self._ping)
+        app.router.add_get('/api/v3/time', self._time)
+        app.router.add_get('/fapi/v1/time', self._time)
+        app.router.add_get('/fapi/v1/exchangeInfo', self._exchange_info)
+        app.router.add_get('/fapi/v1/depth', self._depth)
+        app.router.add_get('/api/v3/depth', self._depth)
+        app.router.add_get('/fapi/v1/ticker/24hr', self._ticker)
+        app.router.add_get('/api/v3/ticker/24hr', self._ticker)
+        app.router.add_get('/fapi/v1/ticker/price', self._ticker_price)
+        app.router.add_post('/fapi/v1/order', self._create_order)
+        app.router.add_delete('/fapi/v1/order', self._cancel_order)
+        app.router.add_get('/fapi/v1/order', self._get_order)
+        app.router.add_post('/fapi/v1/batchOrders', self._batch_orders)
+        app.router.add_delete('/fapi/v1/allOpenOrders', self._cancel_all)
+        app.router.add_get('/fapi/v1/openOrders', self._open_orders)
+        app.router.add_get('/fapi/v1/account', self._account)
+        app.router.add_get('/fapi/v2/account', self._account)
+        app.router.add_get('/fapi/v2/balance', self._balance)
+        app.router.add_get('/fapi/v2/positionRisk', self._position_risk)
+        app.router.add_post('/fapi/v1/listenKey', self._listen_key)
+        app.router.add_put('/fapi/v1/listenKey', self._listen_key)
+        app.router.add_delete('/fapi/v1/listenKey', self._listen_key)
+        app.router.add_get('/stream', self._stream)
+        app.router.add_get('/ws/{path:.*}', self._raw_stream)
+        return app
+
+    # Middleware: latency, weight budget, errors
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path == '/stream' or request.path.startswith('/ws/'):
+            return await handler(request)
+        if self.latency_ms or self.jitter_ms:
+            await asyncio.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+
+        now = time.time()
+        window = int(now // 60)
+        if window != self._window:
+            self._window = window
+            self._used_weight = 0
+            self._order_count = 0
+        self._used_weight += self._weight(request)
+        headers = {'X-MBX-USED-WEIGHT-1M': str(self._used_weight)}
+        if self._used_weight > self.weight_limit:
+            headers['Retry-After'] = str(math.ceil(60 - now % 60))
+            response = self._error(ExchangeError(
+                -1003, f"Too many requests; current limit of IP is {self.weight_limit} requests per minute.", 429))
+        else:
+            try:
+                response = await handler(request)
+            except ExchangeError as e:
+                if e.status == 429:
+                    headers['Retry-After'] = str(math.ceil(60 - now % 60))
+                response = self._error(e)
+        response.headers.update(headers)
+        if request.path in ORDER_PATHS and request.method == 'POST':
+            response.headers['X-MBX-ORDER-COUNT-1M'] = str(self._order_count)
+        return response
+
+    @staticmethod
+    def _weight(request):
+        if request.path.endswith('/depth'):
+            try:
+                limit = int(request.query.get('limit', 100))
+            except ValueError:
+                limit = 100
+            return _depth_weight(limit)
+        if request.path.endswith('/ticker/24hr') and 'symbol' not in request.query:
+            return 40
+        if request.path.endswith('/openOrders') and 'symbol' not in request.query:
+            return 40
+        return WEIGHTS.get((request.method, request.path), 1)
+
+    @staticmethod
+    def _error(error):
+        return web.json_response({'code': error.code, 'msg': error.msg}, status=error.status)
+
+    def _count_orders(self, n):
+        if self._order_count + n > self.order_limit:
+            raise ExchangeError(-1015, f"Too many new orders; current limit is {self.order_limit} orders per MINUTE.", 429)
+        self._order_count += n
+
+    async def _params(self, request, signed=False):
+        """Query string and form body merged; signed calls need a key and a valid signature"""
+        body = await request.text() if request.can_read_body else ''
+        params = dict(request.query)
+        params.update(parse_qsl(body))
+        if not signed:
+            return params
+        if not request.headers.get('X-MBX-APIKEY'):
+            raise ExchangeError(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+        if 'signature' not in params or 'timestamp' not in params:
+            raise ExchangeError(-1102, "Mandatory parameter 'signature' was not sent, was empty/null, or malformed.")
+        if self.api_secret:
+            raw = request.query_string if 'signature' in request.query else body
+            payload = raw.rsplit('&signature=', 1)[0]
+            expected = hmac.new(self.api_secret, payload.encode(), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, params['signature']):
+                raise ExchangeError(-1022, "Signature for this request is not valid.")
+        return params
+
+    # Public REST
+
+    async def _ping(self, request):
+        return web.json_response({})
+
+    async def _time(self, request):
+        return web.json_response({'serverTime': self.exchange.now()})
+
+    async def _exchange_info(self, request):
+        info = self.exchange.exchange_info()
+        info['rateLimits'][0]['limit'] = self.weight_limit
+        info['rateLimits'][1]['limit'] = self.order_limit
+        return web.json_response(info)
+
+    async def _depth(self, request):
+        params = await self._params(request)
+        return web.json_response(self.exchange.depth(params.get('symbol'), int(params.get('limit', 100))))
+
+    async def _ticker(self, request):
+        params = await self._params(request)
+        if 'symbol' in params:
+            return web.json_response(self.exchange.ticker_24hr(self.exchange.market(params['symbol'])))
+        symbols = json.loads(params['symbols']) if 'symbols' in params else list(self.exchange.markets)
+        return web.json_response([self.exchange.ticker_24hr(self.exchange.market(s)) for s in symbols])
+
+    async def _ticker_price(self, request):
+        params = await self._params(request)
+        markets = [self.exchange.market(params['symbol'])] if 'symbol' in params else self.exchange.markets.values()
+        prices = [{'symbol': m.symbol, 'price': m.price(m.last), 'time': self.exchange.now()} for m in markets]
+        return web.json_response(prices[0] if 'symbol' in params else prices)
+
+    # Signed REST
+
+    async def _create_order(self, request):
+        params = await self._params(request, signed=True)
+        self._count_orders(1)
+        return web.json_response(self.exchange.place(params))
+
+    async def _cancel_order(self, request):
+        params = await self._params(request, signed=True)
+        return web.json_response(self.exchange.cancel(params))
+
+    async def _get_order(self, request):
+        params = await self._params(request, signed=True)
+        order = self.exchange.find(params)
+        if order is None:
+            raise ExchangeError(-2013, "Order does not exist.")
+        return web.json_response(self.exchange.render(order))
+
+    async def _batch_orders(self, request):
+        params = await self._params(request, signed=True)
+        try:
+            orders = json.loads(params['batchOrders'])
+        except (KeyError, ValueError):
+            raise ExchangeError(-1102, "Mandatory parameter 'batchOrders' was not sent, was empty/null, or malformed.")
+        if not 0 < len(orders) <= 5:
+            raise ExchangeError(-1102, "Param 'batchOrders' must contain between 1 and 5 orders.")
+        self._count_orders(len(orders))
+        results = []
+        for order in orders:
+            try:
+                results.append(self.exchange.place(order))
+            except ExchangeError as e:
+                results.append({'code': e.code, 'msg': e.msg})
+        return web.json_response(results)
+
+    async def _cancel_all(self, request):
+        params = await self._params(request, signed=True)
+        self.exchange.cancel_all(params.get('symbol'))
+        return web.json_response({'code': 200, 'msg': 'The operation of cancel all open order is done.'})
+
+    async def _open_orders(self, request):
+        params = await self._params(request, signed=True)
+        return web.json_response(self.exchange.open_orders(params.get('symbol')))
+
+    async def _account(self, request):
+        await self._params(request, signed=True)
+        return web.json_response(self.exchange.account())
+
+    async def _balance(self, request):
+        await self._params(request, signed=True)
+        return web.json_response(self.exchange.balances())
+
+    async def _position_risk(self, request):
+        params = await self._params(request, signed=True)
+        risk = self.exchange.position_risk()
+        if 'symbol' in params:
+            risk = [p for p in risk if p['symbol'] == params['symbol']]
+        return web.json_response(risk)
+
+    async def _listen_key(self, request):
+        await self._params(request)
+        if not request.headers.get('X-MBX-APIKEY'):
+            raise ExchangeError(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+        if request.method == 'POST':
+            # One account, so one key, reused until it is closed
+            self.listen_key = self.listen_key or secrets.token_hex(32)
+            return web.json_response({'listenKey': self.listen_key})
+        if self.listen_key is None:
+            raise ExchangeError(-1125, "This listenKey does not exist.")
+        if request.method == 'DELETE':
+            self.listen_key = None
+            for ws in list(self.user_clients):
+                await ws.close()
+        return web.json_response({})
+
+    # WebSockets
+
+    async def _stream(self, request):
+        """Combined streams: ``/stream?streams=a/b`` plus SUBSCRIBE/UNSUBSCRIBE frames"""
+        streams = set(filter(None, request.query.get('streams', '').lower().split('/')))
+        return await self._serve_market(request, streams, combined=True)
+
+    async def _raw_stream(self, request):
+        path = request.match_info['path']
+        if self.listen_key and path == self.listen_key:
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            self.user_clients.add(ws)
+            try:
+                async for _ in ws:
+                    pass
+            finally:
+                self.user_clients.discard(ws)
+            return ws
+        return await self._serve_market(request, set(filter(None, path.lower().split('/'))), combined=False)
+
+    async def _serve_market(self, request, streams, combined):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.stream_clients[ws] = (streams, combined)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await self._control(ws, streams, msg.data)
+        finally:
+            self.stream_clients.pop(ws, None)
+        return ws
+
+    @staticmethod
+    async def _control(ws, streams, data):
+        try:
+            request = json.loads(data)
+            method, request_id = request['method'], request.get('id')
+            params = request.get('params', [])
+        except (ValueError, KeyError, TypeError):
+            await ws.send_str(json.dumps({'error': {'code': 2, 'msg': 'Invalid request'}, 'id': None}))
+            return
+        # Stream names match case-insensitively, as on Binance
+        if method == 'SUBSCRIBE':
+            streams.update(p.lower() for p in params)
+            result = None
+        elif method == 'UNSUBSCRIBE':
+            streams.difference_update(p.lower() for p in params)
+            result = None
+        elif method == 'LIST_SUBSCRIPTIONS':
+            result = sorted(streams)
+        else:
+            await ws.send_str(json.dumps({'error': {'code': 2, 'msg': f"Invalid method: {method}"}, 'id': request_id}))
+            return
+        await ws.send_str(json.dumps({'result': result, 'id': request_id}))
+
+    def _push_user_event(self, event):
+        if self.user_clients:
+            payload = json.dumps(event)
+            for ws in list(self.user_clients):
+                asyncio.ensure_future(ws.send_str(payload))
+
+    async def _tick_loop(self):
+        ticker_every = max(1, round(self.ticker_ms / self.tick_ms))
+        for step in itertools.count():
+            await asyncio.sleep(self.tick_ms / 1000)
+            try:
+                events = self.exchange.step(ticker=step % ticker_every == 0)
+            except Exception as e:
+                logging.error("Mock exchange step failed: %s", e)
+                continue
+            if not self.stream_clients:
+                continue
+            # Serialize each event at most twice, however many clients watch it
+            frames = {}
+            sends = []
+            names = [stream.lower() for stream, _ in events]
+            for ws, (streams, combined) in list(self.stream_clients.items()):
+                for name, (stream, data) in zip(names, events):
+                    if name not in streams:
+                        continue
+                    key = (stream, combined)
+                    if key not in frames:
+                        frames[key] = json.dumps({'stream': stream, 'data': data} if combined else data)
+                    sends.append(ws.send_str(frames[key]))
+            await asyncio.gather(*sends, return_exceptions=True)
+
+    # Lifecycle
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self._ticker_task = asyncio.ensure_future(self._tick_loop())
+
+    async def _stop(self):
+        self._ticker_task.cancel()
+        for ws in list(self.stream_clients) + list(self.user_clients):
+            await ws.close()
+        await self._runner.cleanup()
+
+    def start(self):
+        """Serve from a daemon thread; returns once the port is bound"""
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._start())
+            ready.set()
+            self.loop.run_forever()
+
+        thread = threading.Thread(target=run, name='mock-exchange')
+        thread.daemon = True
+        thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        print(f"Mock exchange listening on {self.base_url}")
+        print(f"  REST:    {self.base_url}/fapi/v1/...")
+        print(f"  Streams: ws://{self.host}:{self.port}/stream")
+        try:
+            self.loop.run_forever()
+        except KeyboardInterrupt:
+            print("\nStopping mock exchange...")
+        finally:
+            self.loop.run_until_complete(self._stop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock Binance Futures exchange')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added delay per REST request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra uniform random delay per REST request')
+    parser.add_argument('--weight-limit', type=int, default=WEIGHT_LIMIT, help='Request weight budget per minute')
+    parser.add_argument('--order-limit', type=int, default=ORDER_LIMIT, help='New orders per minute')
+    parser.add_argument('--tick-ms', type=int, default=TICK_MS, help='Milliseconds between price steps')
+    parser.add_argument('--ticker-ms', type=int, default=TICKER_MS, help='Milliseconds between 24hr ticker events')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Starting USDT balance')
+    parser.add_argument('--api-secret', help='Verify request signatures against this secret')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible prices')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    exchange = MockExchange(balance=args.balance, seed=args.seed)
+    MockExchangeServer(
+        exchange,
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        weight_limit=args.weight_limit,
+        order_limit=args.order_limit,
+        tick_ms=args.tick_ms,
+        ticker_ms=args.ticker_ms,
+        api_secret=args.api_secret
+    ).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from rate_limiter import http_session
+
+SPOT_DEPTH_URL = 'https://api.binance.com/api/v3/depth'
+SNAPSHOT_LIMIT = 1000
+MAX_BUFFERED = 10000    # diffs held while no snapshot arrives before they are dropped
+
+_session = http_session()
+
+
+def fetch_spot_snapshot(symbol, limit=SNAPSHOT_LIMIT, url=SPOT_DEPTH_URL):
+    """REST depth snapshot matching the spot diff streams"""
+    response = _session.get(url, params={'symbol': symbol, 'limit': limit}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+class OrderBook:
+    """L2 order book for one symbol held in sorted float arrays.
+
+    Each side keeps parallel key/quantity arrays in ascending key order with the
+    best level last: bids are keyed by price, asks by negated price. Best
+    bid/ask are index lookups and a quantity change is a bisect, O(log n).
+    Adding or removing a level also shifts every level better than it, O(n)
+    at worst (8 KB per array for a 1000-level side); with the best level last,
+    the churn near the top of the book only moves a few entries.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.last_update_id = 0
+        self._bid_keys = array('d')
+        self._bid_qtys = array('d')
+        self._ask_keys = array('d')
+        self._ask_qtys = array('d')
+
+    def __len__(self):
+        return len(self._bid_keys) + len(self._ask_keys)
+
+    def load_snapshot(self, snapshot):
+        bids = sorted((float(p), float(q)) for p, q in snapshot['bids'] if float(q))
+        asks = sorted((-float(p), float(q)) for p, q in snapshot['asks'] if float(q))
+        self._bid_keys = array('d', (p for p, _ in bids))
+        self._bid_qtys = array('d', (q for _, q in bids))
+        self._ask_keys = array('d', (k for k, _ in asks))
+        self._ask_qtys = array('d', (q for _, q in asks))
+        self.last_update_id = snapshot['lastUpdateId']
+
+    def clear(self):
+        del self._bid_keys[:], self._bid_qtys[:], self._ask_keys[:], self._ask_qtys[:]
+        self.last_update_id = 0
+
+    @staticmethod
+    def _set_level(keys, qtys, key, qty):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if qty:
+                qtys[i] = qty
+            else:
+                del keys[i]
+                del qtys[i]
+        elif qty:
+            keys.insert(i, key)
+            qtys.insert(i, qty)
+
+    def apply(self, bids, asks, update_id):
+        """Apply one diff; a zero quantity removes the level"""
+        for price, qty in bids:
+            self._set_level(self._bid_keys, self._bid_qtys, float(price), float(qty))
+        for price, qty in asks:
+            self._set_level(self._ask_keys, self._ask_qtys, -float(price), float(qty))
+        self.last_update_id = update_id
+
+    def best_bid(self):
+        try:
+            return self._bid_keys[-1], self._bid_qtys[-1]
+        except IndexError:
+            return None
+
+    def best_ask(self):
+        try:
+            return -self._ask_keys[-1], self._ask_qtys[-1]
+        except IndexError:
+            return None
+
+    def mid(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def top(self, n=10):
+        """Best ``n`` levels per side as (price, qty) pairs, best first"""
+        bids = list(zip(self._bid_keys[-n:], self._bid_qtys[-n:]))
+        asks = [(-k, q) for k, q in zip(self._ask_keys[-n:], self._ask_qtys[-n:])]
+        bids.reverse()
+        asks.reverse()
+        return {'bids': bids, 'asks': asks}
+
+
+class OrderBookSync:
+    """Keeps an OrderBook in step with a stream of DepthUpdate records.
+
+    Follows Binance's snapshot + diff procedure: events are buffered until a
+    REST snapshot arrives, stale events are dropped, the first applied event
+    must straddle the snapshot's lastUpdateId, and every later event must
+    continue the previous one (``U == prev_u + 1`` on spot, ``pu == prev_u`` on
+    futures). Any gap clears the book and triggers a fresh snapshot. While
+    snapshots keep failing the buffer is dropped every ``max_buffered``
+    events: the next snapshot will be newer than all of them anyway.
+    """
+
+    def __init__(self, symbol, fetch_snapshot=fetch_spot_snapshot, max_buffered=MAX_BUFFERED):
+        self.book = OrderBook(symbol)
+        self.symbol = symbol
+        self.fetch_snapshot = fetch_snapshot
+        self.max_buffered = max_buffered
+        self.synced = False
+        self.resyncs = 0
+        self._prev_u = None
+        self._buffer = []
+        self._fetching = False
+        self._lock = threading.Lock()
+
+    def on_event(self, event):
+        with self._lock:
+            if not self.synced:
+                if len(self._buffer) >= self.max_buffered:
+                    logging.warning("Order book %s buffered %d diffs without a snapshot, dropping them",
+                                    self.symbol, len(self._buffer))
+                    self._buffer = []
+                self._buffer.append(event)
+                self._request_snapshot()
+            elif not self._process(event):
+                self._resync(event)
+
+    def _process(self, event):
+        """Apply an event if it is in sequence; returns False on a gap"""
+        futures = event.prev_final_id is not None
+        if self._prev_u is None:
+            boundary = self.book.last_update_id + (0 if futures else 1)
+            if event.final_id < boundary:
+                return True  # older than the snapshot
+            if event.first_id > boundary:
+                return False
+        elif futures and event.prev_final_id != self._prev_u:
+            return False
+        elif not futures and event.first_id != self._prev_u + 1:
+            return False
+        self.book.apply(event.bids, event.asks, event.final_id)
+        self._prev_u = event.final_id
+        return True
+
+    def _resync(self, event):
+        logging.warning("Order book %s out of sequence at %s, resyncing", self.symbol, event.first_id)
+        self.resyncs += 1
+        self.synced = False
+        self._prev_u = None
+        self.book.clear()
+        self._buffer = [event]
+        self._request_snapshot()
+
+    def _request_snapshot(self):
+        if self._fetching:
+            return
+        self._fetching = True
+        thread = threading.Thread(target=self._load_snapshot)
+        thread.daemon = True
+        thread.start()
+
+    def _load_snapshot(self):
+        try:
+            snapshot = self.fetch_snapshot(self.symbol)
+        except Exception as e:
+            logging.error("Error fetching %s depth snapshot: %s", self.symbol, e)
+            time.sleep(1)  # the next buffered event retries
+            with self._lock:
+                self._fetching = False
+            return
+
+        with self._lock:
+            self._fetching = False
+            self.book.load_snapshot(snapshot)
+            self._prev_u = None
+            buffered, self._buffer = self._buffer, []
+            for i, event in enumerate(buffered):
+                if not self._process(event):
+                    # Snapshot is older than the buffered stream; keep buffering and refetch
+                    self.book.clear()
+                    self._prev_u = None
+                    self._buffer = buffered[i:]
+                    self._request_snapshot()
+                    return
+            self.synced = True
+            logging.info("Order book %s synced at update %s", self.symbol, self.book.last_update_id)
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlencode, urlparse
+
+import aiohttp
+from binance.exceptions import BinanceAPIException
+
+from latency import OrderTrace, get_latency_metrics
+from rate_limiter import get_rate_limiter, request_cost, request_priority
+from risk import RiskRejected, get_risk_engine
+from symbol_registry import futures_base_url
+
+DEFAULT_POOL_SIZE = 50      # keep-alive connections per gateway
+REQUEST_TIMEOUT = 10
+RECV_WINDOW = 5000
+BATCH_LIMIT = 5             # orders per batchOrders request
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+class GatewayAPIError(BinanceAPIException):
+    """Error response to a gateway request.
+
+    Carries BinanceAPIException's ``code``, ``message`` and ``status_code``
+    so callers handle both alike, but is built from the status and body text
+    rather than a ``requests`` response.
+    """
+
+    def __init__(self, status_code, text):
+        Exception.__init__(self, status_code, text)
+        self.status_code = status_code
+        self.response = None
+        self.request = None
+        try:
+            body = json.loads(text)
+        except ValueError:
+            body = None
+        if isinstance(body, dict) and 'code' in body:
+            self.code = body['code']
+            self.message = body.get('msg')
+        else:
+            # Proxy pages, bare 429/5xx bodies
+            self.code = 0
+            self.message = f"HTTP {status_code}: {text.strip()[:200]}"
+
+
+class OrderGateway:
+    """Futures order API running on one event loop with a pooled keep-alive session.
+
+    Coroutines (``*_async``) run on the gateway loop; ``submit_*`` methods return a
+    ``concurrent.futures.Future`` so any thread can keep many orders in flight, and
+    the plain methods block for the result like ``Client.futures_create_order``.
+    """
+
+    def __init__(self, api_key, api_secret, base_url, pool_size=DEFAULT_POOL_SIZE, timestamp_offset=0, risk=None):
+        self.api_key = api_key
+        self.api_secret = api_secret.encode() if api_secret else b''
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timestamp_offset = timestamp_offset
+        self._session = None
+        self.metrics = get_latency_metrics()
+        self.limiter = get_rate_limiter(self.base_url)
+        self.risk = risk
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='order-gateway')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _get_session(self):
+        # Created lazily so the session binds to the gateway loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_headers_sent.append(_mark_sent)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'X-MBX-APIKEY': self.api_key} if self.api_key else {},
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                trace_configs=[trace_config]
+            )
+        return self._session
+
+    def _sign(self, params):
+        params['recvWindow'] = RECV_WINDOW
+        params['timestamp'] = int(time.time() * 1000 + self.timestamp_offset)
+        query = urlencode(params)
+        signature = hmac.new(self.api_secret, query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def request(self, method, path, params=None, signed=True, trace=None, priority=None):
+        """Send one REST call and return the decoded JSON body.
+
+        The call first waits for room in the host's rate limits, queued by
+        ``priority`` (default: cancels, then reduce-only orders, new orders,
+        reads). With an OrderTrace, stage timestamps are filled in and
+        recorded; time spent throttled counts as queueing.
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        url_path = urlparse(f"{self.base_url}/{path}").path
+        weight, orders = request_cost(method, url_path, params)
+        if priority is None:
+            priority = request_priority(method, url_path, params)
+        await self.limiter.acquire_async(priority, weight, orders)
+        if trace is not None:
+            trace.started = time.perf_counter_ns()
+        query = self._sign(params) if signed else urlencode(params)
+        if trace is not None:
+            trace.signed = time.perf_counter_ns()
+        url = f"{self.base_url}/{path}"
+        kwargs = {}
+        if method in ('GET', 'DELETE'):
+            url = f"{url}?{query}" if query else url
+        else:
+            kwargs['data'] = query
+            kwargs['headers'] = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+        async with self._get_session().request(method, url, trace_request_ctx=trace, **kwargs) as response:
+            text = await response.text()
+            if trace is not None:
+                self.metrics.finish(trace)
+            self.limiter.update(response.status, response.headers)
+            if not 200 <= response.status < 300:
+                raise GatewayAPIError(response.status, text)
+            return json.loads(text)
+
+    def _check(self, params):
+        # Pre-trade risk: raises RiskRejected, or returns quantized params
+        return self.risk.check(params) if self.risk is not None else params
+
+    def _record_fill(self, params, order):
+        executed = float(order.get('executedQty', 0) or 0)
+        if self.risk is not None and executed:
+            self.risk.record_fill(params.get('symbol'), params.get('side'), executed)
+
+    async def create_order_async(self, **params):
+        params = self._check(params)
+        return await self._create_order(params, self.metrics.trace_order(params.get('symbol'), params.get('type')))
+
+    async def cancel_order_async(self, **params):
+        return await self._cancel_order(params, self.metrics.trace_order(params.get('symbol'), 'CANCEL'))
+
+    async def _create_order(self, params, trace):
+        order = await self.request('POST', 'v1/order', params, trace=trace)
+        self._record_fill(params, order)
+        return order
+
+    async def _cancel_order(self, params, trace):
+        return await self.request('DELETE', 'v1/order', params, trace=trace)
+
+    async def batch_orders_async(self, orders):
+        """Place up to BATCH_LIMIT orders in one request; returns one entry per order"""
+        trace = self.metrics.trace_order(orders[0].get('symbol'), 'BATCH')
+        batch = json.dumps([{k: str(v) for k, v in order.items()} for order in orders], separators=(',', ':'))
+        return await self.request('POST', 'v1/batchOrders', {'batchOrders': batch}, trace=trace)
+
+    async def place_orders_async(self, orders):
+        """Place any number of orders as concurrent batches.
+
+        Returns one entry per order, in order: the exchange ack, or an error dict
+        with ``code`` and ``msg`` for orders that were rejected or never sent.
+        Orders failing the risk checks are not sent at all.
+        """
+        results = [None] * len(orders)
+        accepted = []
+        for i, order in enumerate(orders):
+            try:
+                accepted.append((i, self._check(order)))
+            except RiskRejected as e:
+                results[i] = {'code': e.code, 'msg': e.msg}
+
+        chunks = [accepted[i:i + BATCH_LIMIT] for i in range(0, len(accepted), BATCH_LIMIT)]
+        responses = await asyncio.gather(*(self.batch_orders_async([order for _, order in chunk]) for chunk in chunks),
+                                         return_exceptions=True)
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                error = {'code': getattr(response, 'code', None), 'msg': getattr(response, 'message', str(response))}
+                response = [dict(error) for _ in chunk]
+            for (i, order), result in zip(chunk, response):
+                results[i] = result
+                self._record_fill(order, result)
+        return results
+
+    def submit(self, coro):
+        """Schedule a coroutine on the gateway loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit_order(self, **params):
+        try:
+            params = self._check(params)
+        except RiskRejected as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        # Traced from the caller's thread so the hop onto the loop counts as the queue stage
+        trace = self.metrics.trace_order(params.get('symbol'), params.get('type'))
+        return self.submit(self._create_order(params, trace))
+
+    def submit_cancel(self, **params):
+        trace = self.metrics.trace_order(params.get('symbol'), 'CANCEL')
+        return self.submit(self._cancel_order(params, trace))
+
+    def create_order(self, **params):
+        return self.submit_order(**params).result()
+
+    def cancel_order(self, **params):
+        return self.submit_cancel(**params).result()
+
+    def place_orders(self, orders):
+        return self.submit(self.place_orders_async(orders)).result()
+
+    def close(self):
+        async def _close():
+            if self._session is not None:
+                await self._session.close()
+        self.submit(_close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+async def _mark_sent(session, context, params):
+    trace = getattr(context, 'trace_request_ctx', None)
+    if trace.__class__ is OrderTrace:
+        trace.sent = time.perf_counter_ns()
+
+
+def gateway_for(client, base_url=None):
+    """Return the shared gateway for a python-binance client.
+
+    Objects that already speak the gateway interface are returned unchanged.
+    """
+    if hasattr(client, 'submit_order'):
+        return client
+    base_url = base_url or futures_base_url(client)
+    key = (client.API_KEY, base_url)
+    with _gateways_lock:
+        gateway = _gateways.get(key)
+        if gateway is None:
+            gateway = OrderGateway(
+                client.API_KEY,
+                client.API_SECRET,
+                base_url,
+                timestamp_offset=getattr(client, 'timestamp_offset', 0),
+                risk=get_risk_engine(client)
+            )
+            _gateways[key] = gateway
+            logging.info("Order gateway started for %s", base_url)
+        return gateway
@@ -0,0 +1,169 @@
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+DEFAULT_WINDOW = 1000       # recent orders kept in memory
+BATCH_SIZE = 1000           # rows per write transaction
+MAX_PAGE = 500
+
+_STOP = object()
+
+
+class OrderJournal:
+    """Append-only order log in SQLite (WAL mode) with a bounded in-memory window.
+
+    ``append`` only assigns a sequence number, pushes the order onto a
+    fixed-size deque and hands it to a writer thread, which inserts whatever
+    has queued up in one transaction. Memory stays at ``window`` orders however
+    long the session runs, and the window is reloaded from disk on restart.
+    Orders are plain dicts and must not be mutated after they are appended.
+    """
+
+    def __init__(self, path, window=DEFAULT_WINDOW):
+        self.path = path
+        self.recent = deque(maxlen=window)
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("""CREATE TABLE IF NOT EXISTS orders (
+            seq INTEGER PRIMARY KEY,
+            time REAL NOT NULL,
+            symbol TEXT,
+            side TEXT,
+            data TEXT NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS orders_symbol ON orders (symbol, seq)")
+        conn.execute("CREATE INDEX IF NOT EXISTS orders_time ON orders (time)")
+        conn.commit()
+        rows = conn.execute("SELECT data FROM orders ORDER BY seq DESC LIMIT ?", (window,)).fetchall()
+        self.recent.extend(json.loads(data) for data, in reversed(rows))
+        last = conn.execute("SELECT MAX(seq) FROM orders").fetchone()[0] or 0
+        self._seq = itertools.count(last + 1)
+
+        self._writer = threading.Thread(target=self._run, name='order-journal')
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _connection(self):
+        # One connection per thread; WAL lets readers run alongside the writer
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, order):
+        """Journal an order dict; adds ``seq`` and ``time`` (epoch seconds) to it"""
+        order['seq'] = next(self._seq)
+        order.setdefault('time', time.time())
+        self.recent.append(order)
+        self._queue.put(order)
+        return order
+
+    def _run(self):
+        conn = self._connection()
+        while True:
+            items = [self._queue.get()]
+            while len(items) < BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = []
+            for o in items:
+                if isinstance(o, dict):
+                    try:
+                        # Decimals, datetimes and the like are stored as strings
+                        rows.append((o['seq'], o['time'], o.get('symbol'), o.get('side'), json.dumps(o, default=str)))
+                    except (TypeError, ValueError) as e:
+                        logging.error("Order journal cannot serialize order %s, not persisted: %s", o.get('seq'), e)
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?)", rows)
+                except sqlite3.Error as e:
+                    logging.error("Order journal write failed, %d orders not persisted: %s", len(rows), e)
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if _STOP in items:
+                return
+
+    def flush(self, timeout=5):
+        """Block until every order appended so far is on disk"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join(5)
+
+    def page(self, symbol=None, since=None, until=None, cursor=None, limit=50):
+        """Newest-first page of orders with ``seq`` below ``cursor``.
+
+        ``since``/``until`` bound the order time (epoch seconds). Returns
+        ``(orders, next_cursor)``; ``next_cursor`` is None on the last page.
+        Pages are served from memory while the window covers them.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        recent = list(self.recent)
+        results = []
+        for order in reversed(recent):
+            if len(results) > limit:
+                break
+            if cursor is not None and order['seq'] >= cursor:
+                continue
+            if symbol and order.get('symbol') != symbol:
+                continue
+            if since is not None and order['time'] < since:
+                continue
+            if until is not None and order['time'] >= until:
+                continue
+            results.append(order)
+
+        # Anything older than the window comes from disk
+        if len(results) <= limit and recent and recent[0]['seq'] > 1:
+            bound = recent[0]['seq'] if cursor is None else min(cursor, recent[0]['seq'])
+            results += self._query(symbol, since, until, bound, limit + 1 - len(results))
+
+        if len(results) > limit:
+            results = results[:limit]
+            return results, results[-1]['seq']
+        return results, None
+
+    def _query(self, symbol, since, until, before, limit):
+        self.flush()
+        sql = "SELECT data FROM orders WHERE seq < ?"
+        args = [before]
+        if symbol:
+            sql += " AND symbol = ?"
+            args.append(symbol)
+        if since is not None:
+            sql += " AND time >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND time < ?"
+            args.append(until)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        args.append(limit)
+        return [json.loads(data) for data, in self._connection().execute(sql, args)]
+
+
+def page_params(args):
+    """Parse ``symbol``, ``since``, ``until``, ``cursor`` and ``limit`` query args for ``page``"""
+    params = {'limit': args.get('limit', 50, type=int)}
+    if args.get('symbol'):
+        params['symbol'] = args['symbol'].upper()
+    for name, convert in (('since', float), ('until', float), ('cursor', int)):
+        value = args.get(name, type=convert)
+        if value is not None:
+            params[name] = value
+    return params
@@ -0,0 +1,142 @@
+import threading
+
+
+class PortfolioSnapshot:
+    """Immutable view of a portfolio at one instant; readers never lock"""
+
+    __slots__ = ('version', 'balance', 'market_value', 'portfolio_value', 'realized_pnl',
+                 'unrealized_pnl', 'pnl', 'pnl_percent', 'positions')
+
+    def __init__(self, version, balance, market_value, cost, realized, initial_balance, positions):
+        self.version = version
+        self.balance = balance
+        self.market_value = market_value
+        self.portfolio_value = balance + market_value
+        self.realized_pnl = realized
+        self.unrealized_pnl = market_value - cost
+        self.pnl = self.portfolio_value - initial_balance
+        self.pnl_percent = self.pnl / initial_balance * 100 if initial_balance else 0.0
+        # symbol -> {'quantity', 'avg_price', 'cost'}; never mutated once published
+        self.positions = positions
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Position:
+    __slots__ = ('quantity', 'cost', 'price')
+
+    def __init__(self):
+        self.quantity = 0.0
+        self.cost = 0.0
+        self.price = 0.0
+
+
+class Portfolio:
+    """Long-only paper-trading portfolio with incremental P&L.
+
+    Cash, market value, cost basis and realized P&L are running totals, so a
+    price tick only adjusts them by the affected position's delta: O(1) per
+    tick whatever the number of positions. Writers (ticks and fills) take one
+    lock and publish a fresh PortfolioSnapshot; readers just take
+    ``portfolio.snapshot``. Ticks reuse the published positions map, fills
+    replace it with a shallow copy carrying the one changed entry.
+    """
+
+    def __init__(self, initial_balance=10000.0):
+        self.initial_balance = initial_balance
+        self._balance = initial_balance
+        self._market_value = 0.0
+        self._cost = 0.0
+        self._realized = 0.0
+        self._positions = {}
+        self._prices = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self.snapshot = PortfolioSnapshot(0, initial_balance, 0.0, 0.0, 0.0, initial_balance, {})
+
+    def price(self, symbol):
+        return self._prices.get(symbol)
+
+    def update_price(self, symbol, price):
+        """Apply a tick; only the symbol's own position is touched"""
+        with self._lock:
+            self._prices[symbol] = price
+            position = self._positions.get(symbol)
+            if position is None:
+                return
+            self._market_value += position.quantity * (price - position.price)
+            position.price = price
+            self._publish(self.snapshot.positions)
+
+    def execute(self, symbol, side, quantity, price=None):
+        """Fill a paper order at ``price`` (default: last tick); returns the fill price.
+
+        Raises ValueError for unknown prices, insufficient cash or position.
+        """
+        if quantity <= 0:
+            raise ValueError('Quantity must be positive')
+        with self._lock:
+            price = self._prices.get(symbol) if price is None else price
+            if not price:
+                raise ValueError('Symbol price not available')
+            value = quantity * price
+            position = self._positions.get(symbol)
+
+            if side == 'BUY':
+                if value > self._balance:
+                    raise ValueError('Insufficient balance')
+                if position is None:
+                    position = self._positions[symbol] = _Position()
+                    position.price = price
+                # Mark the existing holding to the fill price before adding to it
+                self._market_value += position.quantity * (price - position.price) + value
+                position.price = price
+                position.quantity += quantity
+                position.cost += value
+                self._cost += value
+                self._balance -= value
+            else:
+                if position is None or position.quantity < quantity:
+                    raise ValueError('Insufficient position')
+                released = position.cost * quantity / position.quantity
+                self._market_value += position.quantity * (price - position.price) - value
+                position.price = price
+                position.quantity -= quantity
+                position.cost -= released
+                self._cost -= released
+                self._realized += value - released
+                self._balance += value
+                if position.quantity <= 1e-12:
+                    self._market_value -= position.quantity * price
+                    self._cost -= position.cost
+                    del self._positions[symbol]
+                    position = None
+
+            positions = dict(self.snapshot.positions)
+            if position is None:
+                positions.pop(symbol, None)
+            else:
+                positions[symbol] = {
+                    'quantity': position.quantity,
+                    'avg_price': position.cost / position.quantity,
+                    'cost': position.cost
+                }
+            self._publish(positions)
+            return price
+
+    def _publish(self, positions):
+        self._version += 1
+        self.snapshot = PortfolioSnapshot(self._version, self._balance, self._market_value, self._cost,
+                                          self._realized, self.initial_balance, positions)
+
+    def reconcile(self):
+        """Recompute the running totals from the positions (drift check); returns the drift"""
+        with self._lock:
+            market_value = sum(p.quantity * p.price for p in self._positions.values())
+            cost = sum(p.cost for p in self._positions.values())
+            drift = market_value - self._market_value
+            self._market_value = market_value
+            self._cost = cost
+            self._publish(self.snapshot.positions)
+            return drift
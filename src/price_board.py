@@ -0,0 +1,273 @@
+import argparse
+import logging
+import os
+import platform
+import signal
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+DEFAULT_NAME = 'trading_bot_prices'
+DEFAULT_CAPACITY = 256
+MAGIC = 0x50524943455f4231     # "PRICE_B1"
+NAME_BYTES = 16
+READ_SPINS = 1000               # retries on a slot being written before yielding
+READ_TIMEOUT = 0.05             # a slot still being written after this is left unread
+# The seqlock needs stores to become visible in program order, which only x86 guarantees
+SEQLOCK_SAFE = platform.machine().lower() in ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+
+HEADER = np.dtype([('magic', '<u8'), ('capacity', '<u8'), ('count', '<u8')])
+# One quote per 64-byte line, so the feeder writing one symbol never touches another's line
+SLOT = np.dtype({'names': ['seq', 'price', 'change_24h', 'volume', 'timestamp'],
+                 'formats': ['<u8', '<f8', '<f8', '<f8', '<f8'],
+                 'itemsize': 64})
+
+
+def _layout(capacity):
+    names_at = 64
+    slots_at = names_at + -(-capacity * NAME_BYTES // 64) * 64
+    return names_at, slots_at, slots_at + capacity * SLOT.itemsize
+
+
+def _open(name, create=False, size=0):
+    # Untracked: the board outlives any process that maps it, feeder restarts included
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class PriceBoard:
+    """Latest quote per symbol in shared memory: one feeder writes, any process reads.
+
+    The segment holds a header, a symbol-id table of fixed-width names and
+    an array of 64-byte slots (price, change_24h, volume, timestamp) that
+    readers map as NumPy views, so nothing is copied or sent per request.
+    Each slot is guarded by a seqlock: the writer makes the slot's sequence
+    odd, writes the fields, then makes it even again; a reader retries until
+    it sees the same even sequence before and after copying the fields.
+    This relies on the sequence and field stores becoming visible in program
+    order, which x86 guarantees. Python has no memory fences, so on weakly
+    ordered CPUs (ARM) a reader could see a torn quote: ``SEQLOCK_SAFE`` is
+    False there and the board backend is refused.
+
+    There is one writer per board. New symbols are appended to the table
+    and published by bumping the header count, so readers pick them up on
+    their next miss. The segment stays in place when the feeder exits, so
+    a restarted feeder carries on writing to the one the workers mapped.
+    """
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), HEADER, buffer=shm.buf)
+        if int(self.header['magic']) != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a price board")
+        self.capacity = int(self.header['capacity'])
+        names_at, slots_at, _ = _layout(self.capacity)
+        self.names = np.ndarray(self.capacity, f'S{NAME_BYTES}', buffer=shm.buf, offset=names_at)
+        self.slots = np.ndarray(self.capacity, SLOT, buffer=shm.buf, offset=slots_at)
+        self._seq = self.slots['seq']
+        self._price = self.slots['price']
+        self._change = self.slots['change_24h']
+        self._volume = self.slots['volume']
+        self._timestamp = self.slots['timestamp']
+        self.ids = {}
+        self._load_ids()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def create(cls, symbols=(), name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY):
+        """Create the board, or take over the one a previous feeder left behind"""
+        try:
+            shm = _open(name, create=True, size=_layout(capacity)[2])
+        except FileExistsError:
+            board = cls(_open(name))
+            # A feeder killed mid-write leaves its slot odd and half written: readers
+            # would wait on it forever. Cleared, so it reads as unset until the next write
+            torn = board._seq & 1 == 1
+            board._seq[torn] = 0
+            logging.info("Reusing price board %s (%d symbols)", name, len(board.ids))
+        else:
+            header = np.ndarray((), HEADER, buffer=shm.buf)
+            header['capacity'] = capacity
+            header['count'] = 0
+            header['magic'] = MAGIC
+            del header
+            board = cls(shm)
+        for symbol in symbols:
+            board.symbol_id(symbol)
+        return board
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        """Map an existing board for reading; raises FileNotFoundError until the feeder has created it"""
+        return cls(_open(name))
+
+    def _load_ids(self):
+        count = int(self.header['count'])
+        for i in range(len(self.ids), count):
+            self.ids[self.names[i].decode()] = i
+
+    def symbol_id(self, symbol):
+        """Slot of ``symbol``, appended to the table if new (writer only)"""
+        i = self.ids.get(symbol)
+        if i is None:
+            i = len(self.ids)
+            if i >= self.capacity:
+                raise ValueError(f"Price board {self.name} is full ({self.capacity} symbols)")
+            encoded = symbol.encode()
+            if len(encoded) > NAME_BYTES:
+                raise ValueError(f"Symbol name too long for the price board: {symbol}")
+            self.names[i] = encoded
+            # Published after the name is in place
+            self.header['count'] = i + 1
+            self.ids[symbol] = i
+        return i
+
+    def _lookup(self, symbol):
+        i = self.ids.get(symbol)
+        if i is None and int(self.header['count']) > len(self.ids):
+            self._load_ids()
+            i = self.ids.get(symbol)
+        return i
+
+    def write(self, symbol, price, change_24h=0.0, volume=0.0, timestamp=None):
+        i = self.symbol_id(symbol)
+        seq = int(self._seq[i])
+        self._seq[i] = seq + 1
+        self._price[i] = price
+        self._change[i] = change_24h
+        self._volume[i] = volume
+        self._timestamp[i] = timestamp or time.time()
+        self._seq[i] = seq + 2
+
+    def read(self, symbol):
+        """Consistent quote dict for ``symbol``, or None if it has never been written"""
+        i = self._lookup(symbol)
+        if i is None:
+            return None
+        return self._read(i)
+
+    def _read(self, i):
+        seq, price, spins, deadline = self._seq, self._price, 0, None
+        while True:
+            before = seq[i]
+            if not before & 1:
+                quote = {
+                    'price': float(price[i]),
+                    'change_24h': float(self._change[i]),
+                    'volume': float(self._volume[i]),
+                    'timestamp': float(self._timestamp[i])
+                }
+                if seq[i] == before:
+                    return quote if before else None
+            spins += 1
+            if spins % READ_SPINS == 0:
+                # A feeder that died mid-write leaves the slot odd until it restarts
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + READ_TIMEOUT
+                elif now > deadline:
+                    logging.warning("Price board %s: %s is still being written, skipping it",
+                                    self.name, self.names[i].decode())
+                    return None
+                time.sleep(0)
+
+    def snapshot(self, symbols=None):
+        """Quotes for ``symbols`` (default: every symbol on the board)"""
+        if symbols is None:
+            self._load_ids()
+            symbols = list(self.ids)
+        quotes = {}
+        for symbol in symbols:
+            quote = self.read(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def versions(self):
+        """Copy of the slot sequences; compare two to find the symbols written in between"""
+        self._load_ids()
+        return self._seq[:len(self.ids)].copy()
+
+    def changed(self, versions):
+        """Symbols written since ``versions`` and the new versions to pass next time"""
+        current = self.versions()
+        seen = np.zeros(len(current), dtype=current.dtype)
+        seen[:len(versions)] = versions[:len(current)]
+        ids = np.flatnonzero(current != seen)
+        symbols = [self.names[i].decode() for i in ids]
+        return symbols, current
+
+    def close(self):
+        # The NumPy views pin the mapping, so drop them first
+        self.header = self.names = self.slots = None
+        self._seq = self._price = self._change = self._volume = self._timestamp = None
+        self.shm.close()
+
+    def unlink(self):
+        if not hasattr(self.shm, '_track'):
+            # Before 3.13 unlink also unregisters, and the tracker complains about names it never saw
+            resource_tracker.register(self.shm._name, 'shared_memory')
+        self.shm.unlink()
+
+
+def run_feeder(symbols, name=DEFAULT_NAME, backend=None, capacity=DEFAULT_CAPACITY, unlink=False):
+    """Feed the board from one market data cache until SIGINT/SIGTERM; the only upstream connection"""
+    from market_data import create_market_data
+
+    if not SEQLOCK_SAFE:
+        raise RuntimeError(f"The price board needs an x86 host, not {platform.machine()}")
+    backend = backend or os.getenv('MARKET_DATA_BACKEND', 'stream')
+    if backend == 'board':
+        # The workers' setting, inherited from an environment shared with them
+        backend = 'stream'
+    board = PriceBoard.create(symbols, name=name, capacity=capacity)
+    market_data = create_market_data(symbols, backend)
+
+    def on_price(symbol, price):
+        quote = market_data.get(symbol)
+        board.write(symbol, price, quote['change_24h'], quote['volume'], quote['timestamp'])
+
+    market_data.add_listener(on_price)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logging.info("Feeding price board %s with %d symbols", name, len(symbols))
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        board.close()
+        if unlink:
+            board.unlink()
+            logging.info("Price board %s removed", name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed a shared-memory price board for the dashboard workers '
+                                                 '(x86 hosts only: reads rely on its store ordering)')
+    parser.add_argument('--symbols', default='BTCUSDT,ETHUSDT,ADAUSDT,SOLUSDT', help='Comma-separated symbols')
+    parser.add_argument('--name', default=os.getenv('PRICE_BOARD', DEFAULT_NAME), help='Shared memory name')
+    parser.add_argument('--backend', choices=['stream', 'poll'], help='Upstream feed (default: MARKET_DATA_BACKEND)')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='Maximum number of symbols')
+    parser.add_argument('--unlink', action='store_true', help='Remove the board on exit instead of keeping it for a restart')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not SEQLOCK_SAFE:
+        parser.error(f"the price board needs an x86 host, not {platform.machine()}")
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    run_feeder(symbols, args.name, args.backend, args.capacity, args.unlink)
+
+
+if __name__ == '__main__':
+    main()
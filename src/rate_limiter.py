@@ -0,0 +1,278 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Priorities, most urgent first
+CANCEL, REDUCE, ORDER, READ = range(4)
+
+# Share of each limit a priority may use, so cancels and risk reductions
+# still get through when new orders and reads have used up their part
+SHARES = {CANCEL: 1.0, REDUCE: 1.0, ORDER: 0.9, READ: 0.75}
+
+# Binance USD-M futures defaults until exchangeInfo reports the real limits
+DEFAULT_LIMITS = [
+    {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': 2400},
+    {'rateLimitType': 'ORDERS', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': 1200},
+    {'rateLimitType': 'ORDERS', 'interval': 'SECOND', 'intervalNum': 10, 'limit': 300},
+]
+INTERVAL_MS = {'SECOND': 1000, 'MINUTE': 60000, 'HOUR': 3600000, 'DAY': 86400000}
+HEADER_UNITS = {'S': 1000, 'M': 60000, 'H': 3600000, 'D': 86400000}
+HEADER_KINDS = {'X-MBX-USED-WEIGHT-': 'REQUEST_WEIGHT', 'X-MBX-ORDER-COUNT-': 'ORDERS'}
+
+# Request weights per (method, path); unlisted routes cost 1 and depth is priced by limit
+WEIGHTS = {
+    ('POST', '/fapi/v1/batchOrders'): 5,
+    ('GET', '/fapi/v1/account'): 5,
+    ('GET', '/fapi/v2/account'): 5,
+    ('GET', '/fapi/v2/balance'): 5,
+    ('GET', '/fapi/v2/positionRisk'): 5,
+    ('GET', '/api/v3/account'): 20,
+    ('GET', '/api/v3/exchangeInfo'): 20,
+    ('GET', '/api/v3/ticker/24hr'): 2,
+}
+ORDER_PATHS = ('/fapi/v1/order', '/api/v3/order')
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def request_cost(method, path, params):
+    """(request weight, orders counted) of one REST call"""
+    if method == 'POST' and path.endswith('/batchOrders'):
+        return WEIGHTS[('POST', '/fapi/v1/batchOrders')], len(json.loads(params.get('batchOrders', '[]')))
+    if method == 'POST' and path in ORDER_PATHS:
+        return 1, 1
+    if path.endswith('/depth'):
+        limit = int(params.get('limit', 100))
+        if path.startswith('/api/'):
+            return (5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250), 0
+        return (2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20), 0
+    if (path.endswith('/ticker/24hr') or path.endswith('/openOrders')) and 'symbol' not in params:
+        return 40, 0
+    return WEIGHTS.get((method, path), 1), 0
+
+
+def request_priority(method, path, params):
+    """Cancels first, then orders that only reduce a position, new orders, reads"""
+    if method == 'DELETE':
+        return CANCEL
+    if method == 'POST' and (path in ORDER_PATHS or path.endswith('/batchOrders')):
+        orders = json.loads(params['batchOrders']) if 'batchOrders' in params else [params]
+        if all(str(o.get('reduceOnly')).lower() == 'true' or str(o.get('closePosition')).lower() == 'true'
+               for o in orders):
+            return REDUCE
+        return ORDER
+    return READ
+
+
+class _Window:
+    """Fixed window counter aligned to the epoch, as Binance counts"""
+
+    __slots__ = ('kind', 'interval_ms', 'limit', 'window', 'used')
+
+    def __init__(self, kind, interval_ms, limit):
+        self.kind = kind
+        self.interval_ms = interval_ms
+        self.limit = limit
+        self.window = 0
+        self.used = 0
+
+    def roll(self, now_ms):
+        window = now_ms // self.interval_ms
+        if window != self.window:
+            self.window = window
+            self.used = 0
+
+    def reset_at(self):
+        return (self.window + 1) * self.interval_ms / 1000
+
+
+class RateLimiter:
+    """Client-side request weight and order count budget for one exchange host.
+
+    Every REST call reserves its weight (and order count) against fixed
+    windows before it is sent; ``update`` then raises the local counts to
+    whatever the ``X-MBX-USED-WEIGHT-*``/``X-MBX-ORDER-COUNT-*`` headers
+    report. Calls that do not fit wait in a priority queue drained by a
+    background thread as windows roll over, cancels first. A 429 or 418
+    stops all traffic until its ``Retry-After`` has passed.
+    """
+
+    def __init__(self, rate_limits=None):
+        self.windows = []
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self.configure(rate_limits or DEFAULT_LIMITS)
+
+    def configure(self, rate_limits):
+        """Set the windows from exchangeInfo ``rateLimits`` entries"""
+        windows = [
+            _Window(limit['rateLimitType'], INTERVAL_MS[limit['interval']] * limit['intervalNum'], limit['limit'])
+            for limit in rate_limits if limit['rateLimitType'] in ('REQUEST_WEIGHT', 'ORDERS')
+        ]
+        with self._lock:
+            for window in windows:
+                old = next((w for w in self.windows if (w.kind, w.interval_ms) == (window.kind, window.interval_ms)), None)
+                if old is not None:
+                    window.window, window.used = old.window, old.used
+            self.windows = windows
+            self._wakeup.notify()
+
+    def _fits(self, priority, weight, orders, now):
+        if now < self.blocked_until:
+            return False
+        now_ms = int(now * 1000)
+        share = SHARES[priority]
+        for window in self.windows:
+            window.roll(now_ms)
+            cost = weight if window.kind == 'REQUEST_WEIGHT' else orders
+            # A call bigger than its share still goes out once the window is empty
+            if cost and window.used and window.used + cost > window.limit * share:
+                return False
+        return True
+
+    def _take(self, weight, orders):
+        for window in self.windows:
+            window.used += weight if window.kind == 'REQUEST_WEIGHT' else orders
+
+    def _try_acquire(self, priority, weight, orders, wake):
+        """Reserve now and return True, or queue ``wake`` to be called once reserved"""
+        with self._lock:
+            # Never overtake a queued call of the same or higher priority
+            if (not self._waiters or self._waiters[0][0] > priority) and self._fits(priority, weight, orders, time.time()):
+                self._take(weight, orders)
+                return True
+            self.throttled += 1
+            heapq.heappush(self._waiters, (priority, next(self._seq), weight, orders, wake))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='rate-limiter')
+                self._thread.daemon = True
+                self._thread.start()
+            self._wakeup.notify()
+            return False
+
+    def acquire(self, priority=READ, weight=1, orders=0):
+        """Block the calling thread until the call fits the budget"""
+        ready = threading.Event()
+        if not self._try_acquire(priority, weight, orders, ready.set):
+            ready.wait()
+
+    async def acquire_async(self, priority=READ, weight=1, orders=0):
+        """Wait on the running event loop until the call fits the budget"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(_resolve, future)
+
+        if not self._try_acquire(priority, weight, orders, wake):
+            await future
+
+    def _dispatch(self):
+        with self._lock:
+            while True:
+                now = time.time()
+                while self._waiters and self._fits(self._waiters[0][0], self._waiters[0][2], self._waiters[0][3], now):
+                    _, _, weight, orders, wake = heapq.heappop(self._waiters)
+                    self._take(weight, orders)
+                    wake()
+                if not self._waiters:
+                    self._wakeup.wait()
+                    continue
+                # Nothing fits until a window rolls over or a ban expires
+                retry_at = max(self.blocked_until, min((w.reset_at() for w in self.windows), default=now))
+                self._wakeup.wait(max(0.001, retry_at - now))
+
+    def update(self, status, headers):
+        """Sync the counts with a response's headers; 429/418 block until Retry-After"""
+        now = time.time()
+        now_ms = int(now * 1000)
+        with self._lock:
+            for name, value in headers.items():
+                name = name.upper()
+                for prefix, kind in HEADER_KINDS.items():
+                    if not name.startswith(prefix):
+                        continue
+                    interval = name[len(prefix):]
+                    interval_ms = int(interval[:-1]) * HEADER_UNITS.get(interval[-1:], 0)
+                    for window in self.windows:
+                        if window.kind == kind and window.interval_ms == interval_ms:
+                            window.roll(now_ms)
+                            window.used = max(window.used, int(value))
+            if status in (418, 429):
+                retry_after = float(headers.get('Retry-After') or 0)
+                if not retry_after:
+                    retry_after = min((w.reset_at() for w in self.windows), default=now + 60) - now
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                logging.warning("Rate limited (HTTP %d), holding requests for %.0fs", status, retry_after)
+            self._wakeup.notify()
+
+    def status(self):
+        """Used and limit per window, plus queued calls and any ban"""
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            windows = []
+            for window in self.windows:
+                window.roll(now_ms)
+                windows.append({'type': window.kind, 'interval_ms': window.interval_ms,
+                                'used': window.used, 'limit': window.limit})
+            return {'windows': windows, 'queued': len(self._waiters), 'throttled': self.throttled,
+                    'blocked_until': self.blocked_until}
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """requests transport adapter that routes every call through the host's RateLimiter"""
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        params = dict(parse_qsl(url.query))
+        body = request.body
+        if body:
+            params.update(parse_qsl(body.decode() if isinstance(body, bytes) else body))
+        limiter = get_rate_limiter(request.url)
+        weight, orders = request_cost(request.method, url.path, params)
+        limiter.acquire(request_priority(request.method, url.path, params), weight, orders)
+        response = super().send(request, **kwargs)
+        limiter.update(response.status_code, response.headers)
+        return response
+
+
+def rate_limit_session(session):
+    """Mount the rate-limited adapter on a requests session and return it"""
+    adapter = RateLimitedAdapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def http_session():
+    """New requests session whose calls count against the shared limiters"""
+    return rate_limit_session(requests.Session())
+
+
+def get_rate_limiter(url):
+    """Return the process-wide limiter for the host of a URL"""
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = RateLimiter()
+        return limiter
@@ -0,0 +1,224 @@
+import math
+import threading
+import time
+
+from symbol_registry import futures_base_url, get_registry
+
+PRICE_BAND = 0.05           # limit prices within 5% of the last trade
+ORDER_BURST = 100           # orders allowed back to back when a rate cap is set
+PRICE_FIELDS = ('price', 'stopPrice')
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class RiskRejected(Exception):
+    """An order refused before it left the process"""
+
+    def __init__(self, code, msg):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+def _decimals(step):
+    step = step.rstrip('0')
+    return len(step.split('.')[1]) if '.' in step else 0
+
+
+class _Rules:
+    """One symbol's exchange filters as floats, built once per exchange info load"""
+
+    __slots__ = ('tick', 'tick_decimals', 'min_price', 'max_price', 'step', 'step_decimals',
+                 'min_qty', 'max_qty', 'market_step', 'market_min_qty', 'market_max_qty',
+                 'min_notional', 'band_up', 'band_down')
+
+    def __init__(self, info, price_band):
+        filters = {f['filterType']: f for f in info.get('filters', [])}
+        price = filters.get('PRICE_FILTER', {})
+        lot = filters.get('LOT_SIZE', {})
+        market_lot = filters.get('MARKET_LOT_SIZE', lot)
+        notional = filters.get('MIN_NOTIONAL') or filters.get('NOTIONAL') or {}
+        percent = filters.get('PERCENT_PRICE', {})
+
+        self.tick = float(price.get('tickSize', 0))
+        self.tick_decimals = _decimals(price.get('tickSize', '0'))
+        self.min_price = float(price.get('minPrice', 0))
+        self.max_price = float(price.get('maxPrice', 0)) or math.inf
+        self.step = float(lot.get('stepSize', 0))
+        self.step_decimals = _decimals(lot.get('stepSize', '0'))
+        self.min_qty = float(lot.get('minQty', 0))
+        self.max_qty = float(lot.get('maxQty', 0)) or math.inf
+        self.market_step = float(market_lot.get('stepSize', 0)) or self.step
+        self.market_min_qty = float(market_lot.get('minQty', 0))
+        self.market_max_qty = float(market_lot.get('maxQty', 0)) or math.inf
+        self.min_notional = float(notional.get('notional') or notional.get('minNotional') or 0)
+        # The tighter of our own band and the exchange's PERCENT_PRICE filter
+        self.band_up = min(1 + price_band, float(percent.get('multiplierUp', math.inf)))
+        self.band_down = max(1 - price_band, float(percent.get('multiplierDown', 0)))
+
+
+class RiskLimits:
+    """Pre-trade limits; ``max_position`` and ``max_notional`` take a number or a per-symbol dict.
+
+    ``max_order_rate`` (orders per second) is off by default: exchange limits
+    are already paced by the rate limiter, this only guards against a runaway
+    strategy.
+    """
+
+    def __init__(self, max_position=None, max_notional=None, price_band=PRICE_BAND,
+                 max_order_rate=None, burst=ORDER_BURST):
+        self.max_position = max_position
+        self.max_notional = max_notional
+        self.price_band = price_band
+        self.max_order_rate = max_order_rate
+        self.burst = burst
+
+    @staticmethod
+    def for_symbol(limit, symbol):
+        if isinstance(limit, dict):
+            return limit.get(symbol)
+        return limit
+
+
+class RiskEngine:
+    """In-process pre-trade checks against precomputed per-symbol limit tables.
+
+    ``check`` quantizes quantity down to the lot step and prices to the tick
+    (buys down, sells up), then enforces lot size, price filter, min/max
+    notional, a price band around the last trade, max position and an order
+    rate token bucket. It is plain float arithmetic over a cached ``_Rules``
+    entry, a few microseconds per order; rejected orders raise RiskRejected
+    and never reach the network or the rate limiter.
+
+    Last trades come from ``update_price`` (a market data listener); orders
+    for a symbol without one skip the band and market-order notional checks.
+    Positions come from ``position_source(symbol)`` when given, otherwise
+    from the fills reported to ``record_fill``.
+    """
+
+    def __init__(self, registry, limits=None, position_source=None):
+        self.registry = registry
+        self.limits = limits or RiskLimits()
+        self.position_source = position_source or self.position
+        self.prices = {}
+        self.positions = {}
+        self.rejected = 0
+        self._rules = {}
+        self._rules_loaded_at = None
+        self._tokens = float(self.limits.burst)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def rules(self, symbol):
+        if self._rules_loaded_at != self.registry.loaded_at:
+            # Exchange info was refreshed: rebuild tables as symbols are used
+            self._rules = {}
+            self._rules_loaded_at = self.registry.loaded_at
+        rules = self._rules.get(symbol)
+        if rules is None:
+            info = self.registry.get(symbol)
+            if info is None:
+                return None
+            rules = self._rules[symbol] = _Rules(info, self.limits.price_band)
+        return rules
+
+    def update_price(self, symbol, price):
+        self.prices[symbol] = price
+
+    def position(self, symbol):
+        return self.positions.get(symbol, 0.0)
+
+    def record_fill(self, symbol, side, quantity):
+        with self._lock:
+            signed = quantity if side == 'BUY' else -quantity
+            self.positions[symbol] = self.positions.get(symbol, 0.0) + signed
+
+    def _reject(self, code, msg):
+        self.rejected += 1
+        raise RiskRejected(code, msg)
+
+    def check(self, params, last_price=None):
+        """Return a quantized copy of order params, or raise RiskRejected"""
+        symbol = params.get('symbol')
+        side = params.get('side')
+        order_type = params.get('type', 'LIMIT')
+        rules = self.rules(symbol) if symbol else None
+        if rules is None:
+            self._reject('UNKNOWN_SYMBOL', f"Unknown symbol: {symbol}")
+        params = dict(params)
+        market = order_type in ('MARKET', 'STOP_MARKET', 'TAKE_PROFIT_MARKET')
+        reduce_only = str(params.get('reduceOnly')).lower() == 'true' or str(params.get('closePosition')).lower() == 'true'
+
+        quantity = float(params['quantity']) if params.get('quantity') is not None else None
+        if quantity is not None:
+            step = rules.market_step if market else rules.step
+            if step:
+                quantity = round(math.floor(quantity / step + 1e-9) * step, rules.step_decimals)
+            min_qty, max_qty = (rules.market_min_qty, rules.market_max_qty) if market else (rules.min_qty, rules.max_qty)
+            if quantity <= 0 or quantity < min_qty:
+                self._reject('LOT_SIZE', f"Quantity {params['quantity']} is below the minimum {min_qty} for {symbol}")
+            if quantity > max_qty:
+                self._reject('LOT_SIZE', f"Quantity {quantity} is above the maximum {max_qty} for {symbol}")
+            params['quantity'] = quantity
+
+        for field in PRICE_FIELDS:
+            if params.get(field) is None:
+                continue
+            price = float(params[field])
+            if rules.tick:
+                units = price / rules.tick
+                units = math.floor(units + 1e-9) if side == 'BUY' else math.ceil(units - 1e-9)
+                price = round(units * rules.tick, rules.tick_decimals)
+            if not rules.min_price <= price <= rules.max_price:
+                self._reject('PRICE_FILTER', f"{field} {price} is outside [{rules.min_price}, {rules.max_price}] for {symbol}")
+            params[field] = price
+
+        last = last_price or self.prices.get(symbol)
+        price = params.get('price')
+        if last and order_type == 'LIMIT' and price is not None:
+            if not last * rules.band_down <= price <= last * rules.band_up:
+                self._reject('PRICE_BAND', f"Price {price} is more than {self.limits.price_band:.0%} from last trade {last} for {symbol}")
+
+        if quantity is not None:
+            notional = quantity * (price or params.get('stopPrice') or last or 0)
+            if notional:
+                if notional < rules.min_notional and not reduce_only:
+                    self._reject('MIN_NOTIONAL', f"Order notional {notional:.2f} is below the minimum {rules.min_notional} for {symbol}")
+                max_notional = RiskLimits.for_symbol(self.limits.max_notional, symbol)
+                if max_notional is not None and notional > max_notional:
+                    self._reject('MAX_NOTIONAL', f"Order notional {notional:.2f} is above the limit {max_notional} for {symbol}")
+
+            max_position = RiskLimits.for_symbol(self.limits.max_position, symbol)
+            if max_position is not None:
+                position = self.position_source(symbol)
+                after = position + quantity if side == 'BUY' else position - quantity
+                # Orders that shrink the position are always allowed
+                if abs(after) > max_position and abs(after) > abs(position):
+                    self._reject('MAX_POSITION', f"Position {after} would exceed the limit {max_position} for {symbol}")
+
+        if not self.limits.max_order_rate:
+            return params
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.limits.burst, self._tokens + (now - self._refilled) * self.limits.max_order_rate)
+            self._refilled = now
+            if self._tokens < 1:
+                self._reject('ORDER_RATE', f"More than {self.limits.max_order_rate} orders per second")
+            self._tokens -= 1
+        return params
+
+
+def get_risk_engine(client=None):
+    """Return the process-wide risk engine for the exchange a client talks to.
+
+    Clients that carry their own ``risk`` engine (e.g. the backtest client) use it.
+    """
+    if getattr(client, 'risk', None) is not None:
+        return client.risk
+    base_url = futures_base_url(client)
+    with _engines_lock:
+        engine = _engines.get(base_url)
+        if engine is None:
+            engine = _engines[base_url] = RiskEngine(get_registry(client))
+        return engine
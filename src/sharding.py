@@ -0,0 +1,248 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import wait
+
+from latency import get_latency_metrics
+from risk import get_risk_engine
+
+REPORT_INTERVAL = 1.0       # seconds between worker reports
+RESTART_BACKOFF_CAP = 30
+STABLE_AFTER = 60           # seconds up before a worker's restart backoff resets
+REPORT_STAGES = ('decode', 'decide', 'tick_to_trade')
+
+
+def shard_symbols(symbols, shards):
+    """Deal symbols round-robin into ``shards`` lists; put the busiest first to spread them"""
+    shards = max(1, min(shards, len(symbols)))
+    return [list(symbols[i::shards]) for i in range(shards)]
+
+
+def _report(index, bot, symbols):
+    metrics = get_latency_metrics().snapshot()['histograms']
+    return {
+        'shard': index,
+        'pid': os.getpid(),
+        'time': time.time(),
+        'symbols': symbols,
+        'records': bot.records,
+        'prices': dict(bot.prices),
+        # Fills recorded by this worker's order gateway
+        'positions': dict(get_risk_engine(bot.client).positions),
+        'latency': [row for row in metrics if row['stage'] in REPORT_STAGES]
+    }
+
+
+def run_worker(index, symbols, bot_factory, stream_options, strategy, conn, interval):
+    """Worker process body: own bot, stream connection, decoder and order client"""
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - shard {index} - %(levelname)s - %(message)s')
+    bot = bot_factory()
+    bot.strategy = strategy
+    bot.start_price_stream(symbols, **stream_options)
+    try:
+        # Anything from the coordinator means stop; EOF means it is gone
+        while not conn.poll(interval):
+            conn.send(_report(index, bot, symbols))
+        conn.recv()
+    except (BrokenPipeError, EOFError, OSError, KeyboardInterrupt):
+        pass
+    finally:
+        bot.stop_price_stream()
+    try:
+        conn.send(_report(index, bot, symbols))
+    except (BrokenPipeError, OSError):
+        pass
+    conn.close()
+
+
+class Shard:
+    """Coordinator-side state for one worker process"""
+
+    def __init__(self, index, symbols):
+        self.index = index
+        self.symbols = symbols
+        self.process = None
+        self.conn = None
+        self.report = None
+        self.reported_at = 0
+        self.restarts = 0
+        self.failures = 0
+        self.started_at = 0
+        self.restart_at = None
+        self.exitcode = None
+
+    def status(self):
+        alive = self.process is not None and self.process.is_alive()
+        report = self.report or {}
+        return {
+            'shard': self.index,
+            'pid': self.process.pid if self.process else None,
+            'alive': alive,
+            'symbols': self.symbols,
+            'restarts': self.restarts,
+            'exitcode': self.exitcode,
+            'records': report.get('records', 0),
+            'report_age': time.time() - self.reported_at if self.reported_at else None
+        }
+
+
+class ShardCoordinator:
+    """Runs a symbol universe across worker processes, one GIL each.
+
+    ``bot_factory`` builds a RealTimeBot-like object in each worker (it must
+    be picklable, e.g. ``functools.partial(RealTimeBot, key, secret)``), so
+    every worker has its own stream connection, decoder and order client.
+    ``strategy(bot, stream, record)``, if given, runs in the worker on every
+    record. Workers send one report per ``report_interval`` over a pipe:
+    prices, positions, record counts and latency summaries; the coordinator
+    merges them. A worker that dies is restarted with exponential backoff
+    while the others keep running.
+    """
+
+    def __init__(self, symbols, bot_factory, workers=None, strategy=None, report_interval=REPORT_INTERVAL,
+                 **stream_options):
+        self.bot_factory = bot_factory
+        self.strategy = strategy
+        self.stream_options = stream_options
+        self.report_interval = report_interval
+        # Spawned, not forked: the parent's gateway loop and stream threads must not be copied
+        self.context = multiprocessing.get_context('spawn')
+        self.shards = [Shard(i, s) for i, s in enumerate(shard_symbols(symbols, workers or os.cpu_count() or 1))]
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        for shard in self.shards:
+            self._spawn(shard)
+        self._thread = threading.Thread(target=self._run, name='shard-coordinator')
+        self._thread.daemon = True
+        self._thread.start()
+        logging.info("Started %d shard workers for %d symbols", len(self.shards),
+                     sum(len(s.symbols) for s in self.shards))
+        return self
+
+    def _spawn(self, shard):
+        if shard.conn is not None:
+            shard.conn.close()
+        # A pipe rather than shared locks: a worker killed mid-call cannot wedge the others
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=run_worker,
+            args=(shard.index, shard.symbols, self.bot_factory, self.stream_options, self.strategy,
+                  child_conn, self.report_interval),
+            name=f"shard-{shard.index}"
+        )
+        process.daemon = True
+        process.start()
+        # The child holds its own copy of its end
+        child_conn.close()
+        shard.process, shard.conn, shard.restart_at = process, conn, None
+        shard.started_at = time.monotonic()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                waitables = {}
+                for shard in self.shards:
+                    if shard.conn is not None:
+                        waitables[shard.conn] = shard
+                    if shard.process is not None:
+                        waitables[shard.process.sentinel] = shard
+                pending = [s.restart_at for s in self.shards if s.restart_at is not None]
+            timeout = max(0, min(pending) - time.monotonic()) if pending else self.report_interval
+            try:
+                ready_list = wait(list(waitables), timeout)
+            except OSError:
+                # A connection closed by a restart in the meantime
+                continue
+            for ready in ready_list:
+                shard = waitables[ready]
+                if ready is shard.conn:
+                    self._receive(shard)
+                elif shard.process is not None and not shard.process.is_alive():
+                    self._exited(shard)
+            now = time.monotonic()
+            with self._lock:
+                for shard in self.shards:
+                    if shard.restart_at is not None and now >= shard.restart_at and not self._stopping:
+                        logging.warning("Restarting shard %d (restart %d)", shard.index, shard.restarts)
+                        self._spawn(shard)
+
+    def _receive(self, shard):
+        try:
+            while shard.conn.poll():
+                shard.report = shard.conn.recv()
+                shard.reported_at = time.time()
+        except (EOFError, OSError):
+            shard.conn.close()
+            shard.conn = None
+
+    def _exited(self, shard):
+        if shard.conn is not None:
+            self._receive(shard)
+        shard.process.join()
+        shard.exitcode = shard.process.exitcode
+        shard.process = None
+        with self._lock:
+            if self._stopping:
+                return
+            if time.monotonic() - shard.started_at > STABLE_AFTER:
+                shard.failures = 0
+            delay = min(RESTART_BACKOFF_CAP, 2 ** shard.failures)
+            shard.failures += 1
+            shard.restarts += 1
+            shard.restart_at = time.monotonic() + delay
+        logging.error("Shard %d (%s) exited with code %s, restarting in %ds",
+                      shard.index, ', '.join(shard.symbols), shard.exitcode, delay)
+
+    def prices(self):
+        merged = {}
+        for shard in self.shards:
+            if shard.report:
+                merged.update(shard.report['prices'])
+        return merged
+
+    def positions(self):
+        merged = {}
+        for shard in self.shards:
+            if shard.report:
+                for symbol, amount in shard.report['positions'].items():
+                    merged[symbol] = merged.get(symbol, 0.0) + amount
+        return merged
+
+    def status(self):
+        shards = [shard.status() for shard in self.shards]
+        return {'workers': len(shards), 'alive': sum(1 for s in shards if s['alive']),
+                'records': sum(s['records'] for s in shards), 'shards': shards}
+
+    def latency(self):
+        """Per-shard latency summaries from the last reports"""
+        return {shard.index: shard.report['latency'] for shard in self.shards if shard.report}
+
+    def stop(self, timeout=5):
+        with self._lock:
+            self._stopping = True
+            conns = [shard.conn for shard in self.shards if shard.conn is not None]
+        for conn in conns:
+            try:
+                conn.send('stop')
+            except OSError:
+                pass
+        for shard in self.shards:
+            process = shard.process
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Final reports sent on the way out
+        for shard in self.shards:
+            if shard.conn is not None:
+                self._receive(shard)
+        logging.info("Shard workers stopped")
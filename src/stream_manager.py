@@ -0,0 +1,249 @@
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+
+import websocket
+from binance.client import Client
+
+from endpoints import env_base_url, stream_url
+from latency import get_latency_metrics
+from tick_decoder import TickDecoder
+
+SPOT_STREAM_URL = 'wss://stream.binance.com:9443/stream'
+FUTURES_STREAM_URL = 'wss://fstream.binance.com/stream'
+FUTURES_TESTNET_STREAM_URL = 'wss://stream.binancefuture.com/stream'
+MAX_STREAMS_PER_CONNECTION = 200    # futures cap; spot allows 1024
+CONTROL_INTERVAL = 0.25             # spot accepts 5 control messages/sec per connection
+BACKOFF_BASE = 1
+BACKOFF_CAP = 60
+STABLE_AFTER = 60                   # seconds connected before backoff resets
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+class StreamConnection:
+    """One combined-stream WebSocket carrying a shard of the subscriptions"""
+
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.streams = set()
+        self.ws = None
+        self.connected = False
+        self.reconnects = 0
+        self._open_streams = set()
+        self._ids = itertools.count(1)
+        self._last_control = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{index}")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.ws:
+            self.ws.close()
+
+    def add(self, streams):
+        with self._lock:
+            self.streams.update(streams)
+            if self.connected:
+                self._send_control('SUBSCRIBE', streams)
+
+    def remove(self, streams):
+        with self._lock:
+            self.streams.difference_update(streams)
+            if self.connected:
+                self._send_control('UNSUBSCRIBE', streams)
+
+    def _send_control(self, method, streams):
+        # Space control frames out to stay under the per-connection message limit
+        wait = self._last_control + CONTROL_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            self.ws.send(json.dumps({'method': method, 'params': sorted(streams), 'id': next(self._ids)}))
+        except (websocket.WebSocketConnectionClosedException, OSError) as e:
+            # The reconnect sends the full stream list, so nothing is lost
+            logging.warning("Stream connection %d dropped a %s: %s", self.index, method, e)
+            return
+        self._last_control = time.monotonic()
+        if method == 'SUBSCRIBE':
+            self._open_streams.update(streams)
+        else:
+            self._open_streams.difference_update(streams)
+
+    def _url(self):
+        with self._lock:
+            self._open_streams = set(self.streams)
+        if not self._open_streams:
+            return self.manager.base_url
+        return f"{self.manager.base_url}?streams={'/'.join(sorted(self._open_streams))}"
+
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            self.ws = websocket.WebSocketApp(
+                self._url(),
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.monotonic()
+            self.ws.run_forever()
+            self.connected = False
+            if self._stop.is_set():
+                break
+            if time.monotonic() - started > STABLE_AFTER:
+                attempt = 0
+            # Full jitter keeps a fleet of connections from reconnecting in lockstep
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            self.reconnects += 1
+            logging.warning("Stream connection %d closed, reconnecting in %.1fs", self.index, delay)
+            self._stop.wait(delay)
+
+    def _on_open(self, ws):
+        with self._lock:
+            self.connected = True
+            # Catch up on changes made while the connection was being opened
+            added = self.streams - self._open_streams
+            removed = self._open_streams - self.streams
+            if added:
+                self._send_control('SUBSCRIBE', added)
+            if removed:
+                self._send_control('UNSUBSCRIBE', removed)
+        logging.info("Stream connection %d open with %d streams", self.index, len(self.streams))
+
+    def _on_message(self, ws, message):
+        received = time.perf_counter_ns()
+        stream, record = self.manager.decoder.decode(message)
+        if stream is not None:
+            self.manager.metrics.mark_tick(record, received)
+            self.manager.dispatch(stream, record)
+        elif isinstance(record, dict) and record.get('error'):
+            logging.error("Stream control error on connection %d: %s", self.index, record['error'])
+
+    def _on_error(self, ws, error):
+        logging.error("Stream connection %d error: %s", self.index, error)
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+
+
+class StreamManager:
+    """Shared market-data streams over the combined ``/stream`` endpoint.
+
+    Subscriptions are sharded across connections below ``max_streams`` each,
+    added and removed with SUBSCRIBE/UNSUBSCRIBE frames on the live socket, and
+    every connection reconnects on its own thread with jittered exponential
+    backoff. Frames are decoded once into typed records (see tick_decoder) and
+    handlers are called as ``callback(stream, record)`` on the socket thread, so
+    they should return quickly and keep I/O elsewhere.
+    """
+
+    def __init__(self, base_url=SPOT_STREAM_URL, max_streams=MAX_STREAMS_PER_CONNECTION, decoder=None):
+        self.base_url = base_url
+        self.max_streams = max_streams
+        self.decoder = decoder or TickDecoder()
+        self.metrics = get_latency_metrics()
+        self.handlers = {}
+        self.connections = []
+        self._owner = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, streams, callback):
+        shards = {}
+        new_connections = []
+        with self._lock:
+            for stream in streams:
+                stream = stream.lower()
+                callbacks = self.handlers.get(stream, [])
+                if callback not in callbacks:
+                    # Copy on write so dispatch can iterate without the lock
+                    self.handlers[stream] = callbacks + [callback]
+                if stream in self._owner:
+                    continue
+                connection = self._connection_with_room()
+                if connection is None:
+                    connection = StreamConnection(self, len(self.connections))
+                    self.connections.append(connection)
+                    new_connections.append(connection)
+                self._owner[stream] = connection
+                connection.streams.add(stream)
+                shards.setdefault(connection, []).append(stream)
+        for connection in new_connections:
+            connection.start()
+        for connection, added in shards.items():
+            if connection not in new_connections:
+                connection.add(added)
+
+    def unsubscribe(self, streams, callback=None):
+        shards = {}
+        with self._lock:
+            for stream in streams:
+                stream = stream.lower()
+                callbacks = [c for c in self.handlers.get(stream, []) if callback is not None and c != callback]
+                if callbacks:
+                    self.handlers[stream] = callbacks
+                    continue
+                self.handlers.pop(stream, None)
+                connection = self._owner.pop(stream, None)
+                if connection:
+                    shards.setdefault(connection, []).append(stream)
+        for connection, removed in shards.items():
+            connection.remove(removed)
+
+    def _connection_with_room(self):
+        for connection in self.connections:
+            if len(connection.streams) < self.max_streams:
+                return connection
+        return None
+
+    def dispatch(self, stream, data):
+        callbacks = self.handlers.get(stream)
+        if callbacks is None:
+            # Handlers are keyed lowercase; frames name camelCase streams as subscribed upstream (@aggTrade)
+            callbacks = self.handlers.get(stream.lower(), ())
+        for callback in callbacks:
+            try:
+                callback(stream, data)
+            except Exception as e:
+                logging.error("Stream handler error for %s: %s", stream, e)
+
+    def close(self):
+        for connection in self.connections:
+            connection.stop()
+
+
+def get_stream_manager(base_url=None):
+    """Return the process-wide stream manager for an endpoint.
+
+    Defaults to the streams of BINANCE_BASE_URL when it is set, else spot.
+    """
+    if base_url is None:
+        base_url = stream_url(env_base_url()) if env_base_url() else SPOT_STREAM_URL
+    with _managers_lock:
+        manager = _managers.get(base_url)
+        if manager is None:
+            manager = _managers[base_url] = StreamManager(base_url)
+        return manager
+
+
+def futures_stream_manager(client):
+    """Stream manager for the futures market data of the exchange a client talks to"""
+    rest_url = client.FUTURES_TESTNET_URL if client.testnet else client.FUTURES_URL
+    if rest_url == Client.FUTURES_TESTNET_URL:
+        return get_stream_manager(FUTURES_TESTNET_STREAM_URL)
+    if rest_url == Client.FUTURES_URL.format(client.tld):
+        return get_stream_manager(FUTURES_STREAM_URL)
+    # Another exchange root, e.g. the mock exchange: streams come from the same host
+    return get_stream_manager(stream_url(rest_url.rsplit('/fapi', 1)[0]))
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from endpoints import env_base_url
+from rate_limiter import get_rate_limiter, http_session
+
+PUBLIC_FUTURES_URL = 'https://fapi.binance.com/fapi'
+DEFAULT_TTL = 3600          # seconds between background refreshes
+RETRY_DELAY = 60            # seconds before retrying a failed refresh
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def futures_base_url(client):
+    """Return the futures REST base URL a python-binance client talks to"""
+    if client is None:
+        base_url = env_base_url()
+        return f"{base_url.rstrip('/')}/fapi" if base_url else PUBLIC_FUTURES_URL
+    return client.FUTURES_TESTNET_URL if client.testnet else client.FUTURES_URL
+
+
+class SymbolRegistry:
+    """Exchange info loaded once, indexed by symbol and refreshed in the background"""
+
+    def __init__(self, fetch, snapshot_path=None, ttl=DEFAULT_TTL, base_url=None):
+        self.fetch = fetch
+        self.base_url = base_url
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.symbols = {}
+        self.loaded_at = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresh_thread = None
+
+    @property
+    def loaded(self):
+        return bool(self.symbols)
+
+    def load(self):
+        """Populate the index from the disk snapshot, falling back to the network"""
+        if self.symbols:
+            return
+        with self._lock:
+            if not self.symbols:
+                if not self._load_snapshot():
+                    self.refresh()
+        if self.ttl:
+            self.start_refresh()
+
+    def load_async(self):
+        """Load without blocking the caller (used by the web apps at import time)"""
+        thread = threading.Thread(target=self._safe_load)
+        thread.daemon = True
+        thread.start()
+
+    def _safe_load(self):
+        try:
+            self.load()
+        except Exception as e:
+            logging.error("Error loading exchange info: %s", e)
+
+    def refresh(self):
+        """Fetch exchange info, swap in a fresh index and persist it"""
+        info = self.fetch()
+        self._index(info['symbols'], time.time(), info.get('rateLimits'))
+        self._save_snapshot(info['symbols'], info.get('rateLimits'))
+        logging.info("Exchange info refreshed: %d symbols", len(self.symbols))
+
+    def _index(self, symbols, loaded_at, rate_limits=None):
+        # Build a new dict and swap it in so readers never see a partial index
+        self.symbols = {s['symbol']: s for s in symbols}
+        self.loaded_at = loaded_at
+        if self.base_url and rate_limits:
+            get_rate_limiter(self.base_url).configure(rate_limits)
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self._index(snapshot['symbols'], snapshot['fetched_at'], snapshot.get('rate_limits'))
+            logging.info("Exchange info loaded from %s", self.snapshot_path)
+            return bool(self.symbols)
+        except (OSError, ValueError, KeyError) as e:
+            logging.error("Ignoring unreadable exchange info snapshot: %s", e)
+            return False
+
+    def _save_snapshot(self, symbols, rate_limits=None):
+        if not self.snapshot_path:
+            return
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': self.loaded_at, 'symbols': symbols, 'rate_limits': rate_limits}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logging.error("Error saving exchange info snapshot: %s", e)
+
+    def start_refresh(self):
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_loop)
+        self._refresh_thread.daemon = True
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        # A snapshot older than the TTL is refreshed right away
+        delay = max(0, self.loaded_at + self.ttl - time.time())
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+                delay = self.ttl
+            except Exception as e:
+                logging.error("Error refreshing exchange info: %s", e)
+                delay = RETRY_DELAY
+
+    def get(self, symbol):
+        """Return the exchange info entry for a symbol, or None"""
+        self.load()
+        return self.symbols.get(symbol.upper())
+
+    def contains(self, symbol):
+        self.load()
+        return symbol.upper() in self.symbols
+
+    def __contains__(self, symbol):
+        return self.contains(symbol)
+
+
+def _public_fetch(base_url):
+    session = http_session()
+
+    def fetch():
+        response = session.get(f"{base_url}/v1/exchangeInfo", timeout=10)
+        response.raise_for_status()
+        return response.json()
+    return fetch
+
+
+def get_registry(client=None):
+    """Return the process-wide registry for the exchange a client talks to.
+
+    Clients that carry their own ``registry`` (e.g. the backtest client) use it.
+    """
+    if getattr(client, 'registry', None) is not None:
+        return client.registry
+    base_url = futures_base_url(client)
+    with _registries_lock:
+        registry = _registries.get(base_url)
+        if registry is None:
+            fetch = client.futures_exchange_info if client is not None else _public_fetch(base_url)
+            host = urlparse(base_url).netloc.replace(':', '_')
+            registry = SymbolRegistry(fetch, snapshot_path=f"exchange_info_{host}.json", base_url=base_url)
+            _registries[base_url] = registry
+        return registry
@@ -0,0 +1,112 @@
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class Ticker:
+    """24hr ticker event reduced to the fields the bots use"""
+    __slots__ = ('symbol', 'price', 'change_pct', 'volume', 'event_time')
+
+    def __init__(self, symbol, price, change_pct, volume, event_time):
+        self.symbol = symbol
+        self.price = price
+        self.change_pct = change_pct
+        self.volume = volume
+        self.event_time = event_time
+
+
+class Trade:
+    """Trade or aggTrade event"""
+    __slots__ = ('symbol', 'price', 'qty', 'trade_time', 'buyer_maker')
+
+    def __init__(self, symbol, price, qty, trade_time, buyer_maker):
+        self.symbol = symbol
+        self.price = price
+        self.qty = qty
+        self.trade_time = trade_time
+        self.buyer_maker = buyer_maker
+
+
+class DepthUpdate:
+    """Depth diff; ``prev_final_id`` is only set on futures streams.
+
+    Levels stay as the exchange's [price, qty] string pairs and are converted
+    by the order book as they are applied.
+    """
+    __slots__ = ('symbol', 'first_id', 'final_id', 'prev_final_id', 'bids', 'asks', 'event_time')
+
+    def __init__(self, symbol, first_id, final_id, prev_final_id, bids, asks, event_time):
+        self.symbol = symbol
+        self.first_id = first_id
+        self.final_id = final_id
+        self.prev_final_id = prev_final_id
+        self.bids = bids
+        self.asks = asks
+        self.event_time = event_time
+
+
+def _ticker(d):
+    return Ticker(d['s'], float(d['c']), float(d['P']), float(d['v']), d['E'])
+
+
+def _trade(d):
+    return Trade(d['s'], float(d['p']), float(d['q']), d['T'], d['m'])
+
+
+def _depth(d):
+    return DepthUpdate(d['s'], d['U'], d['u'], d.get('pu'), d['b'], d['a'], d['E'])
+
+
+# Events without a builder (user data, control replies) pass through as dicts
+BUILDERS = {
+    '24hrTicker': _ticker,
+    'trade': _trade,
+    'aggTrade': _trade,
+    'depthUpdate': _depth,
+}
+
+
+def _loads_backend(name):
+    if name == 'msgspec' and msgspec is not None:
+        return msgspec.json.Decoder().decode
+    if name == 'orjson' and orjson is not None:
+        return orjson.loads
+    if name == 'json':
+        return json.loads
+    raise ValueError(f"Decoder backend not available: {name}")
+
+
+def available_backends():
+    return [name for name, module in (('msgspec', msgspec), ('orjson', orjson), ('json', json)) if module is not None]
+
+
+class TickDecoder:
+    """Parses stream frames into typed records with a pluggable JSON backend.
+
+    ``backend`` is 'msgspec', 'orjson', 'json' or 'auto' (fastest installed).
+    """
+
+    def __init__(self, backend='auto'):
+        if backend == 'auto':
+            backend = available_backends()[0]
+        self.backend = backend
+        self.loads = _loads_backend(backend)
+        logging.info("Tick decoder using %s", backend)
+
+    def decode(self, message):
+        """Return ``(stream, record)``; stream is None for raw /ws frames"""
+        msg = self.loads(message)
+        stream = msg.get('stream') if isinstance(msg, dict) else None
+        if stream is not None:
+            msg = msg['data']
+        builder = BUILDERS.get(msg.get('e')) if isinstance(msg, dict) else None
+        return stream, builder(msg) if builder else msg
@@ -0,0 +1,105 @@
+import numpy as np
+
+DEFAULT_CAPACITY = 100_000
+
+
+class TickBuffer:
+    """Fixed-capacity ring of (timestamp ms, price, qty) for one symbol.
+
+    Appends write into preallocated NumPy arrays, so memory is bounded and
+    there is no per-tick allocation. Queries return arrays in time order;
+    they are views when the requested window does not wrap, copies otherwise.
+    Timestamps are assumed non-decreasing.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.qty = np.zeros(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, ts, price, qty=0.0):
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.price[i] = price
+        self.qty[i] = qty
+        self.count += 1
+
+    def last(self, n=None):
+        """Most recent ``n`` ticks (all held ticks by default) as (ts, price, qty)"""
+        count = self.count
+        size = min(count, self.capacity)
+        n = size if n is None else min(n, size)
+        end = count % self.capacity if count > self.capacity else count
+        if n <= end:
+            return self.ts[end - n:end], self.price[end - n:end], self.qty[end - n:end]
+        # Window wraps around the end of the ring
+        head = n - end
+        return tuple(np.concatenate((a[self.capacity - head:], a[:end])) for a in (self.ts, self.price, self.qty))
+
+    def between(self, start_ms, end_ms):
+        """Ticks with start_ms <= ts < end_ms"""
+        ts, price, qty = self.last()
+        lo, hi = np.searchsorted(ts, (start_ms, end_ms))
+        return ts[lo:hi], price[lo:hi], qty[lo:hi]
+
+    def ohlcv(self, bar_ms, start_ms=None, end_ms=None):
+        """Resample to bars of ``bar_ms``; returns a dict of equal-length arrays"""
+        if bar_ms <= 0:
+            raise ValueError(f"Bar size must be positive: {bar_ms}")
+        if start_ms is None and end_ms is None:
+            ts, price, qty = self.last()
+        else:
+            ts, price, qty = self.between(start_ms or 0, end_ms or np.iinfo(np.int64).max)
+        if not len(ts):
+            empty = np.array([])
+            return {'time': empty, 'open': empty, 'high': empty, 'low': empty, 'close': empty, 'volume': empty}
+        bars = ts // bar_ms
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bars)) + 1))
+        ends = np.append(starts[1:], len(ts)) - 1
+        return {
+            'time': bars[starts] * bar_ms,
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends],
+            'volume': np.add.reduceat(qty, starts)
+        }
+
+    def returns(self, n=None, log=False):
+        """Tick-to-tick returns over the last ``n`` prices"""
+        price = self.last(n)[1]
+        if log:
+            return np.diff(np.log(price))
+        return np.diff(price) / price[:-1]
+
+
+class TickHistory:
+    """Per-symbol tick buffers"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def append(self, symbol, ts, price, qty=0.0):
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            buffer = self.buffers[symbol] = TickBuffer(self.capacity)
+        buffer.append(ts, price, qty)
+
+    def get(self, symbol):
+        return self.buffers.get(symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self.buffers
+
+    def ohlcv(self, symbol, bar_ms, start_ms=None, end_ms=None):
+        """OHLCV bars as plain lists (JSON-ready), empty for unknown symbols"""
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            return {}
+        return {k: v.tolist() for k, v in buffer.ohlcv(bar_ms, start_ms, end_ms).items()}
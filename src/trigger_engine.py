@@ -0,0 +1,346 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+KINDS = ('STOP', 'TAKE_PROFIT', 'TRAILING_STOP')
+_INF = float('inf')
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class Trigger:
+    """An order parked in-process until its trigger price trades"""
+
+    def __init__(self, symbol, side, kind, order, trigger_price=None, callback_rate=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown trigger kind: {kind}")
+        self.id = None
+        self.symbol = symbol.upper()
+        self.side = side.upper()
+        self.kind = kind
+        # Params sent to the order gateway when the trigger fires
+        self.order = order
+        self.trigger_price = float(trigger_price) if trigger_price is not None else None
+        # Trailing stops: percent retrace from the best price since placement
+        self.callback_rate = callback_rate
+        self.ratio = None
+        self.status = 'PENDING'
+        self.created_at = time.time()
+        self.triggered_at = None
+        self.triggered_price = None
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def fires_above(self):
+        """True for triggers crossed by a rising price (buy stops, sell take-profits)"""
+        return (self.side == 'BUY') == (self.kind == 'STOP')
+
+    def progress(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'kind': self.kind,
+            'status': self.status,
+            'trigger_price': self.trigger_price,
+            'callback_rate': self.callback_rate,
+            'triggered_price': self.triggered_price,
+            'order_id': self.result.get('orderId') if self.result else None,
+            'error': self.error
+        }
+
+    def wait(self, timeout=None):
+        """Block until the triggered order is acknowledged or the trigger is cancelled"""
+        self._done.wait(timeout)
+        return self.result
+
+    def _record(self, future):
+        try:
+            self.result = future.result()
+            self.status = 'FILLED' if self.result.get('status') == 'FILLED' else 'SENT'
+            logging.info("Trigger %s %s %s sent at %s: %s", self.id, self.kind, self.symbol,
+                         self.triggered_price, self.result.get('orderId'))
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'FAILED'
+            logging.error("Trigger %s %s %s failed: %s", self.id, self.kind, self.symbol, e)
+        self._done.set()
+
+
+class _TrailingBook:
+    """Trailing stops on one side of a symbol.
+
+    Each stop fires when x, the price for sells and 1/price for buys, falls
+    to ``peak * ratio``, with peak the highest x since it was placed. Stops
+    tracking the same peak share a group kept sorted by ratio, so the
+    crossed ones are a bisect away. Groups form a stack with peaks falling
+    toward the top; a new high merges every group below it into one, so a
+    trending market keeps a single group and a tick costs one bisect per
+    group plus the stops that fire.
+    """
+
+    def __init__(self):
+        self.groups = []    # [peak, [(ratio, trigger id), ...]]
+        self.unarmed = []   # placed before the symbol's first tick
+
+    def add(self, ratio, trigger_id, x):
+        entry = (ratio, trigger_id)
+        if x is None:
+            self.unarmed.append(entry)
+        elif self.groups and self.groups[-1][0] == x:
+            bisect.insort(self.groups[-1][1], entry)
+        else:
+            # Every group's peak is at or above the last price, so this one goes on top
+            self.groups.append([x, [entry]])
+
+    def remove(self, ratio, trigger_id):
+        entry = (ratio, trigger_id)
+        for i, (_, members) in enumerate(self.groups):
+            j = bisect.bisect_left(members, entry)
+            if j < len(members) and members[j] == entry:
+                del members[j]
+                if not members:
+                    del self.groups[i]
+                return True
+        if entry in self.unarmed:
+            self.unarmed.remove(entry)
+            return True
+        return False
+
+    def update(self, x):
+        """Move peaks to ``x`` and return the ids of the stops it crossed"""
+        groups = self.groups
+        if groups and groups[-1][0] < x:
+            top = groups.pop()
+            while groups and groups[-1][0] < x:
+                # Both runs are sorted, which sorted() merges in linear time
+                top[1] = sorted(groups.pop()[1] + top[1])
+            top[0] = x
+            groups.append(top)
+        if self.unarmed:
+            if groups and groups[-1][0] == x:
+                groups[-1][1] = sorted(groups[-1][1] + sorted(self.unarmed))
+            else:
+                groups.append([x, sorted(self.unarmed)])
+            self.unarmed = []
+
+        fired = []
+        emptied = False
+        for group in groups:
+            members = group[1]
+            i = bisect.bisect_left(members, (x / group[0],))
+            if i < len(members):
+                fired.extend(entry[1] for entry in members[i:])
+                del members[i:]
+                emptied = emptied or not members
+        if emptied:
+            self.groups = [group for group in groups if group[1]]
+        return fired
+
+    def __len__(self):
+        return sum(len(members) for _, members in self.groups) + len(self.unarmed)
+
+
+class _SymbolBook:
+    """One symbol's pending triggers in price-sorted ``(price, id)`` lists"""
+
+    __slots__ = ('last_price', 'above', 'below', 'trailing_sell', 'trailing_buy')
+
+    def __init__(self):
+        self.last_price = None
+        self.above = []     # fire when the price rises to the level
+        self.below = []     # fire when the price falls to the level
+        self.trailing_sell = _TrailingBook()
+        self.trailing_buy = _TrailingBook()
+
+    def add(self, trigger):
+        if trigger.kind == 'TRAILING_STOP':
+            last = self.last_price
+            if trigger.side == 'SELL':
+                self.trailing_sell.add(trigger.ratio, trigger.id, last)
+            else:
+                self.trailing_buy.add(trigger.ratio, trigger.id, 1 / last if last else None)
+        else:
+            bisect.insort(self.above if trigger.fires_above else self.below, (trigger.trigger_price, trigger.id))
+
+    def remove(self, trigger):
+        if trigger.kind == 'TRAILING_STOP':
+            book = self.trailing_sell if trigger.side == 'SELL' else self.trailing_buy
+            return book.remove(trigger.ratio, trigger.id)
+        levels = self.above if trigger.fires_above else self.below
+        entry = (trigger.trigger_price, trigger.id)
+        i = bisect.bisect_left(levels, entry)
+        if i < len(levels) and levels[i] == entry:
+            del levels[i]
+            return True
+        return False
+
+    def crossed(self, price):
+        """Ids of every trigger crossed by a trade at ``price``, removed from the book"""
+        self.last_price = price
+        fired = []
+        above, below = self.above, self.below
+        if above and above[0][0] <= price:
+            i = bisect.bisect_right(above, (price, _INF))
+            fired.extend(entry[1] for entry in above[:i])
+            del above[:i]
+        if below and below[-1][0] >= price:
+            i = bisect.bisect_left(below, (price,))
+            fired.extend(entry[1] for entry in below[i:])
+            del below[i:]
+        if self.trailing_sell.groups or self.trailing_sell.unarmed:
+            fired.extend(self.trailing_sell.update(price))
+        if self.trailing_buy.groups or self.trailing_buy.unarmed:
+            fired.extend(self.trailing_buy.update(1 / price))
+        return fired
+
+
+class TriggerEngine:
+    """Stop, take-profit and trailing-stop orders held client-side until they trigger.
+
+    Pending triggers live in per-symbol books sorted by price, one list for
+    each crossing direction, so a trade finds the crossed triggers with a
+    bisect, O(log n + k), rather than a scan. Fired triggers are sent as
+    plain MARKET or LIMIT orders through ``submit_order`` (the order
+    gateway's), which returns a future and never blocks the tick. Nothing
+    rests on the exchange until it fires, so triggers do not count against
+    open-order limits.
+
+    Prices arrive through ``on_price``; with a ``stream_manager`` the
+    engine subscribes to each symbol's trade stream as its first trigger is
+    added.
+    """
+
+    def __init__(self, submit_order, stream_manager=None, stream='aggTrade'):
+        self.submit_order = submit_order
+        self.stream_manager = stream_manager
+        self.stream = stream
+        self.triggers = {}
+        self.fired = 0
+        self._books = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, trigger):
+        with self._lock:
+            book = self._books.get(trigger.symbol)
+            new_symbol = book is None
+            if new_symbol:
+                book = self._books[trigger.symbol] = _SymbolBook()
+            last = book.last_price
+            # Same rule as the exchange: a stop already through the market is refused
+            if last is not None and trigger.trigger_price is not None:
+                if (last >= trigger.trigger_price) if trigger.fires_above else (last <= trigger.trigger_price):
+                    raise ValueError(f"{trigger.kind} at {trigger.trigger_price} would immediately trigger "
+                                     f"({trigger.symbol} last {last})")
+            trigger.id = next(self._ids)
+            self.triggers[trigger.id] = trigger
+            book.add(trigger)
+        if new_symbol and self.stream_manager is not None:
+            self.stream_manager.subscribe([f"{trigger.symbol.lower()}@{self.stream}"], self._on_trade)
+        logging.info("Trigger %s added: %s %s %s @ %s", trigger.id, trigger.kind, trigger.side, trigger.symbol,
+                     trigger.trigger_price if trigger.trigger_price is not None else f"{trigger.callback_rate}%")
+        return trigger
+
+    @staticmethod
+    def _order(symbol, side, quantity, limit_price, params):
+        order = dict(symbol=symbol.upper(), side=side.upper(), quantity=quantity, **params)
+        if limit_price is None:
+            order['type'] = 'MARKET'
+        else:
+            order.update(type='LIMIT', price=limit_price, timeInForce=params.get('timeInForce', 'GTC'))
+        return order
+
+    def stop(self, symbol, side, quantity, stop_price, limit_price=None, **params):
+        """Buy when the price rises to ``stop_price``, sell when it falls to it; market unless ``limit_price``"""
+        order = self._order(symbol, side, quantity, limit_price, params)
+        return self.add(Trigger(symbol, side, 'STOP', order, trigger_price=stop_price))
+
+    def take_profit(self, symbol, side, quantity, price, limit_price=None, **params):
+        """Sell when the price rises to ``price``, buy when it falls to it"""
+        order = self._order(symbol, side, quantity, limit_price, params)
+        return self.add(Trigger(symbol, side, 'TAKE_PROFIT', order, trigger_price=price))
+
+    def trailing_stop(self, symbol, side, quantity, callback_rate, **params):
+        """Market order once the price retraces ``callback_rate`` percent from its best since placement"""
+        if not 0 < callback_rate < 100:
+            raise ValueError(f"Callback rate must be between 0 and 100 percent: {callback_rate}")
+        order = self._order(symbol, side, quantity, None, params)
+        trigger = Trigger(symbol, side, 'TRAILING_STOP', order, callback_rate=callback_rate)
+        rate = callback_rate / 100
+        trigger.ratio = 1 - rate if trigger.side == 'SELL' else 1 / (1 + rate)
+        return self.add(trigger)
+
+    def cancel(self, trigger_id):
+        """Drop a pending trigger; returns False if it already fired"""
+        with self._lock:
+            trigger = self.triggers.pop(trigger_id, None)
+            if trigger is None:
+                return False
+            self._books[trigger.symbol].remove(trigger)
+        trigger.status = 'CANCELED'
+        trigger._done.set()
+        return True
+
+    def get(self, trigger_id):
+        return self.triggers.get(trigger_id)
+
+    def pending(self, symbol=None):
+        with self._lock:
+            triggers = list(self.triggers.values())
+        return [t for t in triggers if t.symbol == symbol] if symbol else triggers
+
+    def on_price(self, symbol, price):
+        """Fire every trigger a trade at ``price`` crossed; returns how many fired"""
+        book = self._books.get(symbol)
+        if book is None:
+            return 0
+        with self._lock:
+            ids = book.crossed(price)
+            if not ids:
+                return 0
+            triggers = [self.triggers.pop(i) for i in ids]
+        for trigger in triggers:
+            self._fire(trigger, price)
+        self.fired += len(triggers)
+        return len(triggers)
+
+    def _on_trade(self, stream, record):
+        self.on_price(record.symbol, record.price)
+
+    def _fire(self, trigger, price):
+        trigger.status = 'TRIGGERED'
+        trigger.triggered_at = time.time()
+        trigger.triggered_price = price
+        try:
+            future = self.submit_order(**trigger.order)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(trigger._record)
+
+    def status(self):
+        with self._lock:
+            return {
+                'pending': len(self.triggers),
+                'fired': self.fired,
+                'symbols': {symbol: {'above': len(book.above), 'below': len(book.below),
+                                     'trailing': len(book.trailing_sell) + len(book.trailing_buy),
+                                     'last_price': book.last_price}
+                            for symbol, book in self._books.items()}
+            }
+
+
+def get_trigger_engine(gateway, stream_manager=None):
+    """Return the process-wide trigger engine sending through an order gateway"""
+    with _engines_lock:
+        engine = _engines.get(gateway)
+        if engine is None:
+            engine = _engines[gateway] = TriggerEngine(gateway.submit_order, stream_manager)
+        return engine
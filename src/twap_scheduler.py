@@ -0,0 +1,246 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class TWAPSchedule:
+    """State, progress and controls for one TWAP execution.
+
+    With the symbol's lot ``step`` every slice is a whole number of lots and
+    the last one takes the remainder, so the slices add up to the total; a
+    total of fewer lots than slices is refused.
+    """
+
+    def __init__(self, symbol, side, total_quantity, slices, interval_sec, place_slice, step=None):
+        self.id = None
+        self.symbol = symbol
+        self.side = side
+        self.total_quantity = total_quantity
+        self.slices = slices
+        self.interval_sec = interval_sec
+        self.step = step
+        self.slice_quantity = total_quantity / slices
+        if step:
+            self._lots = round(total_quantity / step)
+            if self._lots < slices:
+                raise ValueError(f"{total_quantity} is {self._lots} lots of {step}, fewer than {slices} slices")
+            self.slice_quantity = self._lot_quantity(self._lots // slices)
+        # place_slice(schedule, quantity) must return a concurrent.futures.Future
+        self.place_slice = place_slice
+        self.scheduler = None
+        self.status = 'PENDING'
+        self.paused = False
+        self.slices_sent = 0
+        self.slices_done = 0
+        self.last_due = None
+        self.filled_qty = 0.0
+        self.notional = 0.0
+        self.orders = []
+        self.errors = []
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _lot_quantity(self, lots):
+        return round(lots * self.step, len(f"{self.step:.12f}".rstrip('0').split('.')[1]))
+
+    def quantity(self, index):
+        """Quantity of slice ``index`` (1-based)"""
+        if index < self.slices:
+            return self.slice_quantity
+        if self.step:
+            return self._lot_quantity(self._lots - (self._lots // self.slices) * (self.slices - 1))
+        return self.total_quantity - self.slice_quantity * (self.slices - 1)
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled_qty if self.filled_qty else 0.0
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def progress(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'symbol': self.symbol,
+                'side': self.side,
+                'status': 'PAUSED' if self.paused and not self.finished else self.status,
+                'total_quantity': self.total_quantity,
+                'slices': self.slices,
+                'slices_sent': self.slices_sent,
+                'filled_qty': self.filled_qty,
+                'avg_price': self.avg_price,
+                'remaining_qty': self.total_quantity - self.filled_qty,
+                'errors': len(self.errors)
+            }
+
+    def cancel(self):
+        self.scheduler.cancel(self.id)
+
+    def pause(self):
+        self.scheduler.pause(self.id)
+
+    def resume(self):
+        self.scheduler.resume(self.id)
+
+    def wait(self, timeout=None):
+        """Block until every slice has been acknowledged or the schedule is cancelled"""
+        self._done.wait(timeout)
+        return self.orders
+
+    def _record(self, future):
+        with self._lock:
+            self.slices_done += 1
+            try:
+                order = future.result()
+                self.orders.append(order)
+                executed = float(order.get('executedQty', 0) or 0)
+                self.filled_qty += executed
+                self.notional += executed * float(order.get('avgPrice', 0) or 0)
+                logging.info("TWAP %s slice %d/%d executed: %s", self.id, self.slices_done, self.slices, order.get('orderId'))
+            except Exception as e:
+                self.errors.append(str(e))
+                logging.error("TWAP %s slice %d/%d failed: %s", self.id, self.slices_done, self.slices, e)
+            if self.slices_done == self.slices:
+                self.status = 'COMPLETED'
+                self._done.set()
+
+
+class TWAPScheduler:
+    """Runs any number of TWAP schedules from a single timer-heap thread.
+
+    Slices are handed to ``place_slice`` which must not block (it returns a
+    future from the order gateway), so the timer thread only ever sleeps
+    until the next due slice. Pass ``autostart=False`` and drive
+    ``run_pending`` yourself to run schedules on a simulated clock.
+    """
+
+    def __init__(self, clock=time.monotonic, autostart=True):
+        self.clock = clock
+        self.schedules = {}
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        if autostart:
+            self._thread = threading.Thread(target=self._run, name='twap-scheduler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def add(self, schedule, start_delay=0):
+        with self._cond:
+            schedule.id = next(self._ids)
+            schedule.scheduler = self
+            schedule.status = 'EXECUTING'
+            self.schedules[schedule.id] = schedule
+            self._push(self.clock() + start_delay, schedule)
+        return schedule
+
+    def _push(self, due, schedule):
+        heapq.heappush(self._heap, (due, next(self._seq), schedule._generation, schedule))
+        self._cond.notify()
+
+    def get(self, schedule_id):
+        return self.schedules.get(schedule_id)
+
+    def active(self):
+        return [s for s in self.schedules.values() if not s.finished]
+
+    def cancel(self, schedule_id):
+        with self._cond:
+            schedule = self.schedules[schedule_id]
+            if schedule.finished:
+                return
+            # Stale heap entries are skipped when popped
+            schedule._generation += 1
+            schedule.status = 'CANCELLED'
+            schedule._done.set()
+        logging.info("TWAP %s cancelled after %d/%d slices", schedule_id, schedule.slices_sent, schedule.slices)
+
+    def pause(self, schedule_id):
+        with self._cond:
+            schedule = self.schedules[schedule_id]
+            schedule.paused = True
+            schedule._generation += 1
+
+    def resume(self, schedule_id):
+        with self._cond:
+            schedule = self.schedules[schedule_id]
+            if not schedule.paused or schedule.finished:
+                return
+            schedule.paused = False
+            schedule._generation += 1
+            if schedule.slices_sent < schedule.slices:
+                # Keeps the spacing: a short pause does not bring the next slice forward
+                due = self.clock()
+                if schedule.last_due is not None:
+                    due = max(due, schedule.last_due + schedule.interval_sec)
+                self._push(due, schedule)
+
+    def next_due(self):
+        """Clock time of the earliest pending slice, or None"""
+        with self._cond:
+            while self._heap and self._heap[0][2] != self._heap[0][3]._generation:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now):
+        due_slices = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                due, _, generation, schedule = heapq.heappop(self._heap)
+                if generation != schedule._generation:
+                    continue
+                schedule.slices_sent += 1
+                schedule.last_due = due
+                due_slices.append((schedule, schedule.slices_sent))
+                if schedule.slices_sent < schedule.slices:
+                    # Next slice is anchored to this one's due time so intervals don't drift
+                    self._push(due + schedule.interval_sec, schedule)
+        return due_slices
+
+    def _fire(self, schedule, index):
+        try:
+            future = schedule.place_slice(schedule, schedule.quantity(index))
+            future.add_done_callback(schedule._record)
+        except Exception as e:
+            # Count the slice as failed so the schedule still completes
+            failed = Future()
+            failed.set_exception(e)
+            schedule._record(failed)
+
+    def run_pending(self, now=None):
+        """Fire every slice due at ``now``; returns how many were fired"""
+        due_slices = self._pop_due(self.clock() if now is None else now)
+        for schedule, index in due_slices:
+            self._fire(schedule, index)
+        return len(due_slices)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                delay = self._heap[0][0] - self.clock()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            self.run_pending()
+
+
+def get_twap_scheduler():
+    """Return the process-wide TWAP scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TWAPScheduler()
+        return _scheduler
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from binance.exceptions import BinanceAPIException
+
+from backtest import MAKER_FEE, TAKER_FEE, Backtester
+
+
+def _bars(*ohlc):
+    ohlc = np.array(ohlc, dtype=np.float64)
+    return {'ts': np.arange(len(ohlc), dtype=np.int64) * 60000, 'open': ohlc[:, 0], 'high': ohlc[:, 1],
+            'low': ohlc[:, 2], 'close': ohlc[:, 3], 'volume': np.ones(len(ohlc))}
+
+
+BARS = _bars(
+    (100, 101, 99, 100),
+    (100, 102, 98, 101),
+    (101, 103, 97, 96),
+    (96, 97, 94, 95),
+    (90, 92, 89, 91),       # gaps down through 93
+    (91, 112, 90, 110),
+)
+
+
+def _run(*orders, bars=BARS):
+    bt = Backtester('BTCUSDT', bars)
+    placed = []
+    bt.run(lambda client: placed.extend(client.create_order(symbol='BTCUSDT', **o) for o in orders))
+    return bt, [bt.orders[o['orderId']] for o in placed]
+
+
+def test_market_order_fills_at_close_as_taker():
+    bt, (order,) = _run(dict(side='BUY', type='MARKET', quantity=2))
+    assert order['status'] == 'FILLED' and order['avgPrice'] == 100
+    assert bt.position == 2 and bt.entry_price == 100
+    assert bt.fees == pytest.approx(200 * TAKER_FEE)
+
+
+def test_resting_limit_fills_at_its_price_on_the_first_cross():
+    bt, (buy, sell) = _run(dict(side='BUY', type='LIMIT', quantity=1, price=97.5),
+                           dict(side='SELL', type='LIMIT', quantity=1, price=111))
+    assert bt.fills[0][:5] == (2 * 60000, buy['orderId'], 'BUY', 1, 97.5)
+    assert bt.fills[1][:5] == (5 * 60000, sell['orderId'], 'SELL', 1, 111)
+    assert bt.fees == pytest.approx((97.5 + 111) * MAKER_FEE)
+    assert bt.position == 0
+    assert bt.realized_pnl == pytest.approx(13.5)
+    assert bt.balance == pytest.approx(10000 + 13.5 - bt.fees)
+
+
+def test_marketable_limit_fills_at_close_as_taker():
+    bt, (order,) = _run(dict(side='BUY', type='LIMIT', quantity=1, price=105))
+    assert order['avgPrice'] == 100
+    assert bt.fees == pytest.approx(100 * TAKER_FEE)
+
+
+def test_stop_market_fills_at_stop_or_at_a_gapped_open():
+    bt, (_, stop) = _run(dict(side='BUY', type='MARKET', quantity=1),
+                         dict(side='SELL', type='STOP_MARKET', quantity=1, stopPrice=97.5))
+    assert stop['avgPrice'] == 97.5 and stop['updateTime'] == 2 * 60000
+    bt, (_, stop) = _run(dict(side='BUY', type='MARKET', quantity=1),
+                         dict(side='SELL', type='STOP_MARKET', quantity=1, stopPrice=93))
+    assert stop['avgPrice'] == 90 and stop['updateTime'] == 4 * 60000
+    assert bt.realized_pnl == pytest.approx(-10)
+
+
+def test_stop_limit_rests_after_triggering():
+    bt, (order,) = _run(dict(side='SELL', type='STOP', quantity=1, stopPrice=98, price=100))
+    # Triggered on bar 1 (low 98), then filled as a limit once the high reaches 100
+    assert order['status'] == 'FILLED'
+    assert bt.fills[0][0] == 2 * 60000 and bt.fills[0][4] == 100
+
+
+def test_cancelled_order_never_fills():
+    bt = Backtester('BTCUSDT', BARS)
+
+    def strategy(client):
+        order = client.create_order(symbol='BTCUSDT', side='BUY', type='LIMIT', quantity=1, price=95,
+                                    newClientOrderId='dip')
+        assert client.futures_get_open_orders()[0]['orderId'] == order['orderId']
+        client.cancel_order(symbol='BTCUSDT', origClientOrderId='dip')
+
+    summary = bt.run(strategy)
+    assert summary['fills'] == 0 and summary['position'] == 0
+    with pytest.raises(BinanceAPIException):
+        bt.client.cancel_order(symbol='BTCUSDT', origClientOrderId='dip')
+
+
+def test_invalid_orders_are_rejected():
+    bt = Backtester('BTCUSDT', BARS)
+    with pytest.raises(BinanceAPIException):
+        bt.client.create_order(symbol='ETHUSDT', side='BUY', type='MARKET', quantity=1)
+    with pytest.raises(BinanceAPIException):
+        bt.client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity=0)
+    assert bt.client.submit_order(symbol='BTCUSDT', side='BUY', type='TRAILING_STOP_MARKET',
+                                  quantity=1).exception() is not None
+
+
+def test_reduce_only_fills_at_most_the_position():
+    bt, (_, close) = _run(dict(side='BUY', type='MARKET', quantity=1),
+                          dict(side='SELL', type='MARKET', quantity=3, reduceOnly='true'))
+    assert close['executedQty'] == 1 and bt.position == 0
+    bt, (order,) = _run(dict(side='BUY', type='MARKET', quantity=1, reduceOnly='true'))
+    assert order['status'] == 'EXPIRED' and bt.fills == []
+
+
+def test_on_bar_strategy_reacts_to_prices():
+    bt = Backtester('BTCUSDT', BARS)
+    seen = []
+
+    def on_bar(client, bar):
+        seen.append(bar['ts'])
+        if bar['close'] < 97 and bt.position == 0:
+            client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity=1)
+            # Rests from the close on: filled by the last bar's high
+            client.create_order(symbol='BTCUSDT', side='SELL', type='LIMIT', quantity=1, price=105,
+                                reduceOnly='true')
+
+    summary = bt.run(on_bar=on_bar)
+    assert seen == list(BARS['ts'])
+    assert [fill[0] for fill in bt.fills] == [2 * 60000, 5 * 60000]
+    assert [fill[4] for fill in bt.fills] == [96, 105]
+    assert summary['position'] == 0 and summary['realized_pnl'] == pytest.approx(9)
+
+
+def test_on_bar_sees_fills_of_its_own_bar():
+    bt = Backtester('BTCUSDT', BARS)
+    positions = []
+    bt.run(lambda client: client.create_order(symbol='BTCUSDT', side='BUY', type='LIMIT', quantity=1, price=94.5),
+           on_bar=lambda client, bar: positions.append(bt.position))
+    assert positions == [0, 0, 0, 1, 1, 1]
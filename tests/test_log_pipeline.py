@@ -0,0 +1,24 @@
+import json
+import logging
+import queue
+
+from log_pipeline import JsonFormatter, _EnqueueHandler
+
+
+def test_message_is_rendered_when_logged():
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger('test_log_pipeline')
+    logger.propagate = False
+    logger.addHandler(_EnqueueHandler(log_queue))
+    position = {'BTCUSDT': 1.0}
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        logger.error("Position %s", position, exc_info=True, extra={'symbol': 'BTCUSDT'})
+    position['BTCUSDT'] = 0.0
+    logger.handlers.clear()
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry['message'] == "Position {'BTCUSDT': 1.0}"
+    assert entry['symbol'] == 'BTCUSDT'
+    assert 'ValueError: boom' in entry['exception']
@@ -0,0 +1,95 @@
+from advanced.oco import OCOManager
+from backtest import Backtester
+from rate_limiter import REDUCE, request_priority
+from test_backtest import BARS
+
+
+def _setup(bars=BARS):
+    bt = Backtester('BTCUSDT', bars)
+    return bt, OCOManager(bt.client)
+
+
+def _open_position(client):
+    client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity=1)
+
+
+def test_fill_cancels_sibling():
+    bt, manager = _setup()
+    bt.on_fill = manager.on_order_update
+    pairs = []
+
+    def strategy(client):
+        _open_position(client)
+        pairs.append(manager.place('BTCUSDT', 'BUY', 1, 111, 93))
+
+    summary = bt.run(strategy)
+    pair = pairs[0]
+    # The stop gaps through on bar 4, before the take-profit level trades on bar 5
+    assert pair.triggered == 'sl' and pair.status == 'DONE'
+    assert bt.client_ids[pair.client_ids['tp']]['status'] == 'CANCELED'
+    assert summary['position'] == 0 and summary['fills'] == 2
+    assert manager.pairs == {} and manager._by_client == {} and manager._by_order == {}
+
+
+def test_partial_fill_cancels_sibling():
+    bt, manager = _setup()
+    pair = manager.place('BTCUSDT', 'BUY', 1, 111, 93)
+    manager.on_order_update({'orderId': pair.order_ids['tp'], 'status': 'PARTIALLY_FILLED', 'executedQty': '0.4'})
+    assert pair.status == 'TRIGGERED' and pair.triggered == 'tp'
+    assert bt.client_ids[pair.client_ids['sl']]['status'] == 'CANCELED'
+    assert manager.status()[0]['triggered'] == 'tp'
+    # A repeated update does not cancel again
+    manager.on_order_update({'orderId': pair.order_ids['tp'], 'status': 'FILLED', 'executedQty': '1'})
+    assert manager.pairs == {}
+
+
+def test_recover_rebuilds_pairs_and_cancels_orphans():
+    bt, _ = _setup()
+    client = bt.client
+    for pair_id in ('abcd_1', 'abcd_2'):
+        client.create_order(symbol='BTCUSDT', side='SELL', type='LIMIT', quantity=1, price=111,
+                            newClientOrderId=f"oco_{pair_id}_tp")
+    client.create_order(symbol='BTCUSDT', side='SELL', type='STOP_MARKET', quantity=1, stopPrice=93,
+                        newClientOrderId='oco_abcd_1_sl')
+    client.create_order(symbol='BTCUSDT', side='SELL', type='LIMIT', quantity=1, price=120,
+                        newClientOrderId='manual')
+
+    manager = OCOManager(client)
+    assert manager.recover() == 2
+    whole = manager.pairs['abcd_1']
+    assert whole.status == 'ACTIVE' and whole.take_profit_price == 111 and whole.stop_loss_price == 93
+    # abcd_2 lost its stop while we were away: its take-profit is cancelled
+    assert 'abcd_2' not in manager.pairs
+    assert bt.client_ids['oco_abcd_2_tp']['status'] == 'CANCELED'
+    assert bt.client_ids['manual']['status'] == 'NEW'
+    assert manager.recover() == 0
+
+
+def test_recover_settles_a_leg_that_filled_unseen():
+    # Ends before the take-profit level trades
+    bt, manager = _setup({key: values[:5] for key, values in BARS.items()})
+    pairs = []
+    bt.run(lambda client: (_open_position(client), pairs.append(manager.place('BTCUSDT', 'BUY', 1, 111, 93))))
+    pair = pairs[0]
+    # No on_fill hook: the manager missed the stop filling
+    assert pair.status == 'ACTIVE'
+    assert bt.client_ids[pair.client_ids['sl']]['status'] == 'FILLED'
+
+    bt.client.futures_get_order = lambda **params: dict(bt.client_ids[params['origClientOrderId']])
+    manager.recover()
+    assert pair.triggered == 'sl' and pair.status == 'DONE'
+    assert bt.client_ids[pair.client_ids['tp']]['status'] == 'CANCELED'
+    assert manager.pairs == {}
+
+
+def test_legs_are_reduce_only():
+    bt, manager = _setup()
+    pairs = []
+    # No on_fill hook, so the take-profit is never cancelled after the stop fills
+    summary = bt.run(lambda client: (_open_position(client),
+                                     pairs.append(manager.place('BTCUSDT', 'BUY', 1, 111, 93))))
+    tp = bt.client_ids[pairs[0].client_ids['tp']]
+    assert tp['reduceOnly'] and tp['status'] == 'EXPIRED'
+    assert summary['position'] == 0 and summary['fills'] == 2
+    order = dict(symbol='BTCUSDT', side='SELL', type='LIMIT', quantity=1, price=111, reduceOnly='true')
+    assert request_priority('POST', '/fapi/v1/order', order) == REDUCE
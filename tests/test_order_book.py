@@ -0,0 +1,113 @@
+import threading
+import time
+
+from order_book import OrderBook, OrderBookSync
+from tick_decoder import DepthUpdate
+
+
+def _snapshot(last_update_id, bids=(('100', '1'),), asks=(('101', '1'),)):
+    return {'lastUpdateId': last_update_id, 'bids': [list(l) for l in bids], 'asks': [list(l) for l in asks]}
+
+
+def _spot(first_id, final_id, bids=(), asks=()):
+    return DepthUpdate('BTCUSDT', first_id, final_id, None, list(bids), list(asks), 0)
+
+
+def _futures(first_id, final_id, prev_final_id, bids=(), asks=()):
+    return DepthUpdate('BTCUSDT', first_id, final_id, prev_final_id, list(bids), list(asks), 0)
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class _Snapshots:
+    """fetch_snapshot stand-in serving a queue of snapshots"""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def __call__(self, symbol):
+        self.calls += 1
+        return self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+
+
+def test_book_levels():
+    book = OrderBook('BTCUSDT')
+    book.load_snapshot(_snapshot(1, bids=[('100', '1'), ('99', '2')], asks=[('101', '1'), ('102', '3')]))
+    book.apply([['100.5', '4'], ['100', '0']], [['101', '0']], 2)
+    assert book.best_bid() == (100.5, 4.0)
+    assert book.best_ask() == (102.0, 3.0)
+    assert book.top(2) == {'bids': [(100.5, 4.0), (99.0, 2.0)], 'asks': [(102.0, 3.0)]}
+    assert book.last_update_id == 2
+    assert len(book) == 3
+
+
+def test_spot_sequence_drops_stale_and_applies_straddling_event():
+    sync = OrderBookSync('BTCUSDT', _Snapshots(_snapshot(100)))
+    sync.on_event(_spot(90, 95, bids=[('100', '9')]))        # before the snapshot
+    sync.on_event(_spot(96, 102, bids=[('100', '2')]))       # straddles lastUpdateId + 1
+    _wait(lambda: sync.synced)
+    assert sync.book.best_bid() == (100.0, 2.0)
+    sync.on_event(_spot(103, 104, asks=[('100.5', '1')]))
+    assert sync.book.best_ask() == (100.5, 1.0)
+    assert sync.book.last_update_id == 104
+    assert sync.resyncs == 0
+
+
+def test_spot_gap_resyncs():
+    fetch = _Snapshots(_snapshot(100), _snapshot(110, bids=[('99', '1')]))
+    sync = OrderBookSync('BTCUSDT', fetch)
+    sync.on_event(_spot(100, 101))
+    _wait(lambda: sync.synced)
+    sync.on_event(_spot(105, 106))          # 102..104 missing
+    assert sync.resyncs == 1
+    assert not sync.synced
+    sync.on_event(_spot(107, 111))
+    _wait(lambda: sync.synced)
+    assert fetch.calls == 2
+    assert sync.book.best_bid() == (99.0, 1.0)
+    assert sync.book.last_update_id == 111
+
+
+def test_futures_sequence_follows_pu():
+    sync = OrderBookSync('BTCUSDT', _Snapshots(_snapshot(100)))
+    sync.on_event(_futures(90, 99, 89))                      # stale
+    sync.on_event(_futures(100, 105, 99, bids=[('100', '3')]))
+    _wait(lambda: sync.synced)
+    # Futures ids are not contiguous: only pu has to match the previous u
+    sync.on_event(_futures(108, 110, 105, bids=[('100', '4')]))
+    assert sync.book.best_bid() == (100.0, 4.0)
+    assert sync.resyncs == 0
+    sync.on_event(_futures(112, 115, 111))
+    assert sync.resyncs == 1
+
+
+def test_snapshot_older_than_buffer_is_refetched():
+    fetch = _Snapshots(_snapshot(50), _snapshot(100))
+    sync = OrderBookSync('BTCUSDT', fetch)
+    sync.on_event(_spot(99, 101, bids=[('100', '5')]))
+    _wait(lambda: sync.synced)
+    assert fetch.calls == 2
+    assert sync.book.best_bid() == (100.0, 5.0)
+
+
+def test_buffer_is_capped_while_snapshot_is_pending():
+    release = threading.Event()
+
+    def fetch(symbol):
+        release.wait(5)
+        return _snapshot(1012)
+
+    sync = OrderBookSync('BTCUSDT', fetch, max_buffered=10)
+    for i in range(25):
+        sync.on_event(_spot(990 + i, 990 + i))
+    # The 20 oldest diffs were dropped; the snapshot has to cover them
+    assert [event.final_id for event in sync._buffer] == list(range(1010, 1015))
+    release.set()
+    _wait(lambda: sync.synced)
+    assert sync.book.last_update_id == 1014
@@ -0,0 +1,17 @@
+from binance.exceptions import BinanceAPIException
+
+from order_gateway import GatewayAPIError
+
+
+def test_json_error_body():
+    error = GatewayAPIError(400, '{"code": -2019, "msg": "Margin is insufficient."}')
+    assert isinstance(error, BinanceAPIException)
+    assert (error.status_code, error.code, error.message) == (400, -2019, 'Margin is insufficient.')
+    assert str(error) == 'APIError(code=-2019): Margin is insufficient.'
+
+
+def test_non_json_error_body():
+    error = GatewayAPIError(502, '<html><body>502 Bad Gateway</body></html>\n')
+    assert error.code == 0
+    assert str(error) == 'APIError(code=0): HTTP 502: <html><body>502 Bad Gateway</body></html>'
+    assert GatewayAPIError(429, '').message == 'HTTP 429: '
@@ -0,0 +1,23 @@
+import datetime
+from decimal import Decimal
+
+from order_journal import OrderJournal
+
+
+def test_unserializable_values_do_not_stop_the_writer(tmp_path):
+    journal = OrderJournal(str(tmp_path / 'orders.db'), window=2)
+    journal.append({'symbol': 'BTCUSDT', 'side': 'BUY', 'price': Decimal('50000.1'),
+                    'placed': datetime.datetime(2024, 1, 1)})
+    circular = {'symbol': 'BTCUSDT', 'side': 'SELL'}
+    circular['self'] = circular
+    journal.append(circular)
+    for i in range(3):
+        journal.append({'symbol': 'ETHUSDT', 'side': 'BUY', 'quantity': i})
+    assert journal.flush()
+    journal.close()
+
+    reopened = OrderJournal(str(tmp_path / 'orders.db'), window=2)
+    orders, _ = reopened.page(limit=10)
+    assert [o['seq'] for o in orders] == [5, 4, 3, 1]
+    assert orders[-1]['price'] == '50000.1' and orders[-1]['placed'] == '2024-01-01 00:00:00'
+    reopened.close()
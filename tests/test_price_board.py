@@ -0,0 +1,104 @@
+import itertools
+import os
+import threading
+
+import pytest
+
+from price_board import PriceBoard
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def board():
+    board = PriceBoard.create(['BTCUSDT', 'ETHUSDT'], name=f"test_board_{os.getpid()}_{next(_names)}", capacity=4)
+    yield board
+    board.close()
+    board.unlink()
+
+
+def test_write_and_read(board):
+    assert board.read('BTCUSDT') is None
+    assert board.read('XRPUSDT') is None
+    board.write('BTCUSDT', 50000.0, 1.5, 1000.0, 1700000000.0)
+    assert board.read('BTCUSDT') == {'price': 50000.0, 'change_24h': 1.5, 'volume': 1000.0,
+                                     'timestamp': 1700000000.0}
+    assert board.snapshot() == {'BTCUSDT': board.read('BTCUSDT')}
+
+
+def test_reader_picks_up_new_symbols(board):
+    reader = PriceBoard.attach(board.name)
+    try:
+        board.write('SOLUSDT', 150.0)
+        assert reader.read('SOLUSDT')['price'] == 150.0
+        assert list(reader.ids) == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+    finally:
+        reader.close()
+
+
+def test_changed_reports_written_symbols(board):
+    versions = board.versions()
+    board.write('ETHUSDT', 3000.0)
+    board.write('ADAUSDT', 0.5)
+    symbols, versions = board.changed(versions)
+    assert symbols == ['ETHUSDT', 'ADAUSDT']
+    assert board.changed(versions)[0] == []
+
+
+def test_capacity_and_name_limits(board):
+    with pytest.raises(ValueError):
+        board.symbol_id('A' * 17)
+    board.symbol_id('SOLUSDT')
+    board.symbol_id('ADAUSDT')
+    with pytest.raises(ValueError):
+        board.symbol_id('XRPUSDT')
+
+
+def test_restart_clears_torn_slot(board):
+    board.write('BTCUSDT', 50000.0)
+    board.write('ETHUSDT', 3000.0)
+    # A feeder killed between the two sequence stores
+    board._seq[0] += 1
+    restarted = PriceBoard.create(['BTCUSDT'], name=board.name)
+    try:
+        assert restarted.read('BTCUSDT') is None
+        assert restarted.read('ETHUSDT')['price'] == 3000.0
+        restarted.write('BTCUSDT', 51000.0)
+        assert board.read('BTCUSDT')['price'] == 51000.0
+    finally:
+        restarted.close()
+
+
+def test_reads_are_never_torn(board):
+    reader = PriceBoard.attach(board.name)
+    stop = threading.Event()
+
+    def feed():
+        for i in itertools.count(1):
+            if stop.is_set():
+                break
+            board.write('BTCUSDT', float(i), float(i), float(i), float(i))
+
+    board.write('BTCUSDT', 0.5, 0.5, 0.5, 0.5)
+    writer = threading.Thread(target=feed)
+    writer.start()
+    try:
+        for _ in range(50000):
+            quote = reader.read('BTCUSDT')
+            assert quote['price'] == quote['change_24h'] == quote['volume'] == quote['timestamp']
+    finally:
+        stop.set()
+        writer.join()
+        reader.close()
+
+
+def test_read_gives_up_on_a_slot_left_mid_write(board):
+    board.write('BTCUSDT', 50000.0)
+    # The feeder died between the two sequence stores and has not restarted
+    board._seq[0] += 1
+    reader = PriceBoard.attach(board.name)
+    try:
+        assert reader.read('BTCUSDT') is None
+        assert reader.snapshot() == {}
+    finally:
+        reader.close()
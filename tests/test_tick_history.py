@@ -0,0 +1,23 @@
+import pytest
+
+from tick_history import TickBuffer
+
+
+def test_ohlcv_resamples_across_the_ring_wrap():
+    buffer = TickBuffer(capacity=4)
+    for ts, price in ((0, 1.0), (500, 2.0), (1000, 3.0), (1500, 0.5), (2100, 4.0), (2900, 5.0)):
+        buffer.append(ts, price, 1.0)
+    bars = buffer.ohlcv(1000)
+    assert bars['time'].tolist() == [1000, 2000]
+    assert bars['open'].tolist() == [3.0, 4.0]
+    assert bars['low'].tolist() == [0.5, 4.0]
+    assert bars['close'].tolist() == [0.5, 5.0]
+    assert bars['volume'].tolist() == [2.0, 2.0]
+
+
+@pytest.mark.parametrize('bar_ms', [0, -1000])
+def test_ohlcv_rejects_non_positive_bars(bar_ms):
+    buffer = TickBuffer(capacity=4)
+    buffer.append(0, 1.0)
+    with pytest.raises(ValueError):
+        buffer.ohlcv(bar_ms)
@@ -0,0 +1,146 @@
+import random
+from concurrent.futures import Future
+
+import pytest
+
+from trigger_engine import TriggerEngine, _TrailingBook
+
+
+def _engine():
+    sent = []
+
+    def submit_order(**order):
+        sent.append(order)
+        future = Future()
+        future.set_result({'orderId': len(sent), 'status': 'NEW'})
+        return future
+
+    return TriggerEngine(submit_order), sent
+
+
+def test_stop_and_take_profit_fire_on_crossing():
+    engine, sent = _engine()
+    sell_stop = engine.stop('BTCUSDT', 'SELL', 1, 95)
+    buy_stop = engine.stop('BTCUSDT', 'BUY', 1, 105)
+    take_profit = engine.take_profit('BTCUSDT', 'SELL', 1, 110, limit_price=109)
+
+    assert engine.on_price('BTCUSDT', 101) == 0
+    assert engine.on_price('BTCUSDT', 105) == 1
+    assert buy_stop.status == 'SENT'
+    assert engine.on_price('BTCUSDT', 120) == 1
+    assert sent[-1] == {'symbol': 'BTCUSDT', 'side': 'SELL', 'quantity': 1, 'type': 'LIMIT',
+                        'price': 109, 'timeInForce': 'GTC'}
+    assert take_profit.triggered_price == 120
+    assert engine.on_price('BTCUSDT', 90) == 1
+    assert sell_stop.triggered_price == 90
+    assert sent[0]['type'] == 'MARKET'
+    assert engine.pending() == []
+
+
+def test_gap_fires_every_crossed_level_once():
+    engine, sent = _engine()
+    for price in (99, 98, 97, 96):
+        engine.stop('BTCUSDT', 'SELL', 1, price)
+    engine.on_price('BTCUSDT', 100.0)
+    assert engine.on_price('BTCUSDT', 97.5) == 2
+    assert engine.on_price('BTCUSDT', 97.5) == 0
+    assert engine.on_price('BTCUSDT', 50) == 2
+    assert len(sent) == 4
+
+
+def test_trigger_through_the_market_is_refused():
+    engine, _ = _engine()
+    engine.stop('BTCUSDT', 'SELL', 1, 50)
+    engine.on_price('BTCUSDT', 100.0)
+    with pytest.raises(ValueError):
+        engine.stop('BTCUSDT', 'SELL', 1, 100)
+    with pytest.raises(ValueError):
+        engine.take_profit('BTCUSDT', 'SELL', 1, 90)
+    assert len(engine.pending()) == 1
+
+
+def test_cancel_removes_trigger():
+    engine, sent = _engine()
+    stop = engine.stop('BTCUSDT', 'SELL', 1, 95)
+    assert engine.cancel(stop.id)
+    assert stop.status == 'CANCELED'
+    assert not engine.cancel(stop.id)
+    assert engine.on_price('BTCUSDT', 90) == 0
+    assert sent == []
+
+
+def test_trailing_stops_follow_the_peak():
+    engine, _ = _engine()
+    sell = engine.trailing_stop('BTCUSDT', 'SELL', 1, 5)
+    buy = engine.trailing_stop('BTCUSDT', 'BUY', 1, 5)
+
+    engine.on_price('BTCUSDT', 120)
+    assert engine.on_price('BTCUSDT', 114.5) == 0
+    assert engine.on_price('BTCUSDT', 113.9) == 1
+    assert sell.triggered_price == 113.9
+    # The buy side trails the low: 113.9 * 1.05 = 119.6
+    assert engine.on_price('BTCUSDT', 119) == 0
+    assert engine.on_price('BTCUSDT', 119.7) == 1
+    assert buy.status == 'SENT'
+
+
+def test_trailing_stop_placed_before_first_tick_arms_on_it():
+    engine, _ = _engine()
+    engine.trailing_stop('BTCUSDT', 'SELL', 1, 10)
+    assert engine.on_price('BTCUSDT', 100) == 0
+    assert engine.on_price('BTCUSDT', 91) == 0
+    assert engine.on_price('BTCUSDT', 89) == 1
+
+
+class _Reference:
+    """Each stop tracks its own peak: what the grouped book must reproduce"""
+
+    def __init__(self):
+        self.stops = {}
+
+    def add(self, ratio, trigger_id, x):
+        self.stops[trigger_id] = [ratio, x]
+
+    def remove(self, trigger_id):
+        del self.stops[trigger_id]
+
+    def update(self, x):
+        fired = []
+        for trigger_id, stop in list(self.stops.items()):
+            stop[1] = x if stop[1] is None else max(stop[1], x)
+            if x / stop[1] <= stop[0]:
+                fired.append(trigger_id)
+                del self.stops[trigger_id]
+        return fired
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_trailing_book_matches_per_stop_peaks(seed):
+    rng = random.Random(seed)
+    book, reference = _TrailingBook(), _Reference()
+    x = None
+    ids = iter(range(1, 1000000))
+    live = {}
+    for _ in range(2000):
+        action = rng.random()
+        if action < 0.3:
+            trigger_id = next(ids)
+            ratio = rng.uniform(0.8, 0.999)
+            book.add(ratio, trigger_id, x)
+            reference.add(ratio, trigger_id, x)
+            live[trigger_id] = ratio
+        elif action < 0.35 and live:
+            trigger_id = rng.choice(sorted(live))
+            assert book.remove(live.pop(trigger_id), trigger_id)
+            reference.remove(trigger_id)
+        else:
+            x = (x or 100.0) * rng.uniform(0.97, 1.03)
+            fired = book.update(x)
+            expected = reference.update(x)
+            assert sorted(fired) == sorted(expected)
+            for trigger_id in fired:
+                del live[trigger_id]
+        assert len(book) == len(live)
+        peaks = [group[0] for group in book.groups]
+        assert peaks == sorted(peaks, reverse=True)
+        assert all(members == sorted(members) and members for _, members in book.groups)
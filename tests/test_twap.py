@@ -0,0 +1,26 @@
+import pytest
+
+from advanced.twap import TWAPOrder
+from backtest import Backtester
+from test_backtest import BARS
+from twap_scheduler import TWAPSchedule
+
+
+def test_slices_are_whole_lots_adding_up_to_the_total():
+    schedule = TWAPSchedule('BTCUSDT', 'BUY', 0.1, 3, 60, None, step=0.001)
+    assert [schedule.quantity(i) for i in (1, 2, 3)] == [0.033, 0.033, 0.034]
+
+
+def test_fewer_lots_than_slices_is_refused():
+    with pytest.raises(ValueError):
+        TWAPSchedule('BTCUSDT', 'BUY', 0.003, 5, 60, None, step=0.001)
+
+
+def test_twap_order_in_backtest_uses_the_market_lot_step():
+    bt = Backtester('BTCUSDT', BARS)
+    schedules = []
+    bt.run(lambda client: schedules.append(TWAPOrder(client, bt.scheduler).place_order('BTCUSDT', 'BUY', 0.01, 3, 60)))
+    assert schedules[0].step == 0.001
+    assert [fill[3] for fill in bt.fills] == [0.003, 0.003, 0.004]
+    assert bt.position == pytest.approx(0.01)
+    assert TWAPOrder(bt.client, bt.scheduler).place_order('BTCUSDT', 'BUY', 0.002, 3, 60) is None
@@ -1,63 +1,88 @@
 #!/usr/bin/env python3
 import logging
+import os
 import sys
 import argparse
-from binance import Client
 from binance.exceptions import BinanceAPIException
 
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from account_mirror import get_account_mirror, wallet_balance
+from endpoints import env_base_url, make_client
+from latency import get_latency_metrics
+from log_pipeline import setup_logging
+from order_gateway import gateway_for
+from risk import RiskRejected, get_risk_engine
+from stream_manager import futures_stream_manager
+from symbol_registry import get_registry
+from trigger_engine import get_trigger_engine
+from twap_scheduler import TWAPSchedule, get_twap_scheduler
+
 class BasicBot:
-    def __init__(self, api_key, api_secret, testnet=True):
-        self.client = Client(api_key, api_secret, testnet=testnet)
+    def __init__(self, api_key, api_secret, testnet=True, base_url=None):
+        # BINANCE_BASE_URL points every bot at another exchange, e.g. src/mock_exchange.py
+        self.base_url = base_url or env_base_url()
+        self.client = make_client(api_key, api_secret, testnet=testnet, base_url=self.base_url)
+        self.registry = get_registry(self.client)
+        self.gateway = gateway_for(self.client)
+        # Checked in-process before any order is sent; limits live on self.risk.limits
+        self.risk = get_risk_engine(self.client)
+        self.account = get_account_mirror(self.client, self.base_url)
+        self.twap_scheduler = get_twap_scheduler()
+        # Local stops and trailing stops, fired from the futures trade stream
+        self.triggers = get_trigger_engine(self.gateway, futures_stream_manager(self.client))
         self.setup_logging()
         
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('trading_bot.log'),
-                logging.StreamHandler()
-            ]
-        )
+        # JSON lines written by a background listener; logging calls only enqueue
+        setup_logging('trading_bot.log')
         self.logger = logging.getLogger(__name__)
         
     def validate_symbol(self, symbol):
         try:
-            info = self.client.futures_exchange_info()
-            symbols = [s['symbol'] for s in info['symbols']]
-            return symbol.upper() in symbols
+            return self.registry.contains(symbol)
         except Exception as e:
-            self.logger.error(f"Error validating symbol: {e}")
+            self.logger.error("Error validating symbol: %s", e)
             return False
             
+    def account_mirror(self):
+        """The started account mirror; the first call loads a REST snapshot, the stream does the rest"""
+        if not self.account.started:
+            self.account.start()
+            self.risk.position_source = self.account.position_amount
+        return self.account
+
     def get_balance(self):
+        """Wallet balance from the account mirror once started, else from one REST call"""
         try:
-            account = self.client.futures_account()
-            self.logger.info("Balance retrieved successfully")
-            return float(account['totalWalletBalance'])
+            return wallet_balance(self.client, self.base_url)
         except BinanceAPIException as e:
-            self.logger.error(f"API Error getting balance: {e}")
+            self.logger.error("API Error getting balance: %s", e)
             raise
+
+    def get_position(self, symbol):
+        """Signed position size from the account mirror"""
+        return self.account_mirror().position_amount(symbol)
             
     def market_order(self, symbol, side, quantity):
         try:
-            self.logger.info(f"Placing market order: {side} {quantity} {symbol}")
-            order = self.client.futures_create_order(
+            self.logger.info("Placing market order: %s %s %s", side, quantity, symbol)
+            order = self.gateway.create_order(
                 symbol=symbol,
                 side=side,
                 type='MARKET',
                 quantity=quantity
             )
-            self.logger.info(f"Market order executed: {order}")
+            self.logger.info("Market order executed: %s", order)
             return order
-        except BinanceAPIException as e:
-            self.logger.error(f"Market order failed: {e}")
+        except (BinanceAPIException, RiskRejected) as e:
+            self.logger.error("Market order failed: %s", e)
             raise
             
     def limit_order(self, symbol, side, quantity, price):
         try:
-            self.logger.info(f"Placing limit order: {side} {quantity} {symbol} @ {price}")
-            order = self.client.futures_create_order(
+            self.logger.info("Placing limit order: %s %s %s @ %s", side, quantity, symbol, price)
+            order = self.gateway.create_order(
                 symbol=symbol,
                 side=side,
                 type='LIMIT',
@@ -65,16 +90,22 @@ class BasicBot:
                 price=price,
                 timeInForce='GTC'
             )
-            self.logger.info(f"Limit order placed: {order}")
+            self.logger.info("Limit order placed: %s", order)
             return order
-        except BinanceAPIException as e:
-            self.logger.error(f"Limit order failed: {e}")
+        except (BinanceAPIException, RiskRejected) as e:
+            self.logger.error("Limit order failed: %s", e)
             raise
             
-    def stop_limit_order(self, symbol, side, quantity, stop_price, limit_price):
+    def stop_limit_order(self, symbol, side, quantity, stop_price, limit_price, local=False):
         try:
-            self.logger.info(f"Placing stop-limit order: {side} {quantity} {symbol} stop@{stop_price} limit@{limit_price}")
-            order = self.client.futures_create_order(
+            self.logger.info("Placing stop-limit order: %s %s %s stop@%s limit@%s",
+                             side, quantity, symbol, stop_price, limit_price)
+            if local:
+                # Held in-process: no open order on the exchange until the stop trades
+                trigger = self.triggers.stop(symbol, side, quantity, stop_price, limit_price)
+                self.logger.info("Local stop-limit %s pending", trigger.id)
+                return trigger
+            order = self.gateway.create_order(
                 symbol=symbol,
                 side=side,
                 type='STOP',
@@ -83,44 +114,46 @@ class BasicBot:
                 price=limit_price,
                 timeInForce='GTC'
             )
-            self.logger.info(f"Stop-limit order placed: {order}")
+            self.logger.info("Stop-limit order placed: %s", order)
             return order
-        except BinanceAPIException as e:
-            self.logger.error(f"Stop-limit order failed: {e}")
+        except (BinanceAPIException, RiskRejected, ValueError) as e:
+            self.logger.error("Stop-limit order failed: %s", e)
+            raise
+            
+    def trailing_stop_order(self, symbol, side, quantity, callback_rate):
+        """Local trailing stop: a market order once the price retraces callback_rate percent"""
+        try:
+            self.logger.info("Placing trailing stop: %s %s %s callback %s%%", side, quantity, symbol, callback_rate)
+            trigger = self.triggers.trailing_stop(symbol, side, quantity, callback_rate)
+            self.logger.info("Trailing stop %s pending", trigger.id)
+            return trigger
+        except ValueError as e:
+            self.logger.error("Trailing stop failed: %s", e)
             raise
             
+    def cancel_trigger(self, trigger_id):
+        return self.triggers.cancel(trigger_id)
+            
     def twap_order(self, symbol, side, total_quantity, duration_minutes, intervals=10):
         """TWAP - Time Weighted Average Price order"""
-        import time
-        import threading
-        
         try:
-            chunk_size = total_quantity / intervals
             interval_seconds = (duration_minutes * 60) / intervals
             
-            self.logger.info(f"Starting TWAP order: {side} {total_quantity} {symbol} over {duration_minutes}min in {intervals} chunks")
-            
-            orders = []
+            self.logger.info("Starting TWAP order: %s %s %s over %smin in %d chunks",
+                             side, total_quantity, symbol, duration_minutes, intervals)
             
-            def execute_chunk(chunk_num):
-                try:
-                    time.sleep(chunk_num * interval_seconds)
-                    order = self.market_order(symbol, side, chunk_size)
-                    orders.append(order)
-                    self.logger.info(f"TWAP chunk {chunk_num + 1}/{intervals} executed: {order['orderId']}")
-                except Exception as e:
-                    self.logger.error(f"TWAP chunk {chunk_num + 1} failed: {e}")
-            
-            # Execute chunks in parallel with delays
-            threads = []
-            for i in range(intervals):
-                thread = threading.Thread(target=execute_chunk, args=(i,))
-                threads.append(thread)
-                thread.start()
+            # Slices are fired from the shared scheduler thread without blocking it;
+            # whole lots each, the last slice taking the remainder
+            rules = self.risk.rules(symbol)
+            schedule = self.twap_scheduler.add(TWAPSchedule(
+                symbol, side, total_quantity, intervals, interval_seconds, self._place_twap_slice,
+                step=rules.market_step if rules else None
+            ))
             
             return {
                 'type': 'TWAP',
                 'status': 'EXECUTING',
+                'schedule_id': schedule.id,
                 'total_quantity': total_quantity,
                 'intervals': intervals,
                 'duration_minutes': duration_minutes,
@@ -128,8 +161,33 @@ class BasicBot:
             }
             
         except Exception as e:
-            self.logger.error(f"TWAP order failed: {e}")
+            self.logger.error("TWAP order failed: %s", e)
             raise
+            
+    def _place_twap_slice(self, schedule, quantity):
+        return self.gateway.submit_order(
+            symbol=schedule.symbol,
+            side=schedule.side,
+            type='MARKET',
+            quantity=quantity,
+            newOrderRespType='RESULT'
+        )
+        
+    def twap_progress(self, schedule_id):
+        """Live progress of a TWAP: filled quantity, average price and status"""
+        return self.twap_scheduler.get(schedule_id).progress()
+        
+    def cancel_twap(self, schedule_id):
+        self.twap_scheduler.cancel(schedule_id)
+        
+    def pause_twap(self, schedule_id):
+        self.twap_scheduler.pause(schedule_id)
+        
+    def resume_twap(self, schedule_id):
+        self.twap_scheduler.resume(schedule_id)
+        
+    def wait_twap(self, schedule_id, timeout=None):
+        return self.twap_scheduler.get(schedule_id).wait(timeout)
 
 def main():
     parser = argparse.ArgumentParser(description='Binance Futures Trading Bot')
@@ -138,22 +196,40 @@ def main():
     parser.add_argument('--symbol', required=True, help='Trading pair (e.g., BTCUSDT)')
     parser.add_argument('--side', choices=['BUY', 'SELL'], required=True, help='Order side')
     parser.add_argument('--quantity', type=float, required=True, help='Order quantity')
-    parser.add_argument('--type', choices=['MARKET', 'LIMIT', 'STOP_LIMIT', 'TWAP'], required=True, help='Order type')
+    parser.add_argument('--type', choices=['MARKET', 'LIMIT', 'STOP_LIMIT', 'TRAILING_STOP', 'TWAP'], required=True, help='Order type')
     parser.add_argument('--price', type=float, help='Price for limit orders')
     parser.add_argument('--stop-price', type=float, help='Stop price for stop-limit orders')
     parser.add_argument('--duration', type=int, help='Duration in minutes for TWAP orders')
     parser.add_argument('--intervals', type=int, default=10, help='Number of intervals for TWAP orders')
+    parser.add_argument('--callback-rate', type=float, help='Retrace in percent for trailing stops')
+    parser.add_argument('--local', action='store_true', help='Hold stop-limit orders in-process until the stop trades')
+    parser.add_argument('--metrics', action='store_true', help='Print stage latency histograms when done')
+    parser.add_argument('--base-url', help='Exchange root URL, e.g. http://127.0.0.1:8765 for the mock exchange')
+    parser.add_argument('--max-notional', type=float, help='Reject orders worth more than this (USDT)')
+    parser.add_argument('--max-position', type=float, help='Reject orders that would grow the position past this quantity')
+    parser.add_argument('--max-order-rate', type=float, help='Reject orders beyond this many per second')
     
     args = parser.parse_args()
     
     try:
-        bot = BasicBot(args.api_key, args.api_secret)
+        bot = BasicBot(args.api_key, args.api_secret, base_url=args.base_url)
+        bot.risk.limits.max_notional = args.max_notional
+        bot.risk.limits.max_position = args.max_position
+        bot.risk.limits.max_order_rate = args.max_order_rate
         
         # Validate symbol
         if not bot.validate_symbol(args.symbol):
             print(f"Error: Invalid symbol {args.symbol}")
             return
             
+        # Position limits are checked against the live account mirror
+        if args.max_position:
+            bot.account_mirror()
+            
+        # Market orders have no price of their own: give the risk checks the last trade
+        if args.max_notional:
+            bot.risk.update_price(args.symbol, float(bot.client.futures_symbol_ticker(symbol=args.symbol)['price']))
+            
         # Show balance
         balance = bot.get_balance()
         print(f"Account Balance: {balance} USDT")
@@ -170,22 +246,43 @@ def main():
             if not args.stop_price or not args.price:
                 print("Error: --stop-price and --price required for stop-limit orders")
                 return
-            order = bot.stop_limit_order(args.symbol, args.side, args.quantity, args.stop_price, args.price)
+            order = bot.stop_limit_order(args.symbol, args.side, args.quantity, args.stop_price, args.price,
+                                         local=args.local)
+        elif args.type == 'TRAILING_STOP':
+            if not args.callback_rate:
+                print("Error: --callback-rate required for trailing stops")
+                return
+            order = bot.trailing_stop_order(args.symbol, args.side, args.quantity, args.callback_rate)
         elif args.type == 'TWAP':
             if not args.duration:
                 print("Error: --duration required for TWAP orders")
                 return
             order = bot.twap_order(args.symbol, args.side, args.quantity, args.duration, args.intervals)
             
-        if args.type == 'TWAP':
+        if args.type == 'TRAILING_STOP' or (args.type == 'STOP_LIMIT' and args.local):
+            print(f"Trigger {order.id} pending: {order.kind} {order.side} {order.symbol}")
+            # Triggers fire from the stream thread, so stay alive until this one has
+            order.wait()
+            print(f"Triggered at {order.triggered_price}: {order.status}")
+            if order.result:
+                print(f"Order ID: {order.result['orderId']}")
+        elif args.type == 'TWAP':
             print(f"TWAP Status: {order['status']}")
             print(f"Message: {order['message']}")
             print(f"Total Quantity: {order['total_quantity']}")
             print(f"Intervals: {order['intervals']}")
+            # The scheduler thread is a daemon, so stay alive until every slice is done
+            bot.wait_twap(order['schedule_id'])
+            progress = bot.twap_progress(order['schedule_id'])
+            print(f"Filled Quantity: {progress['filled_qty']} @ avg {progress['avg_price']:.2f}")
         else:
             print(f"Order Status: {order['status']}")
             print(f"Order ID: {order['orderId']}")
             print(f"Executed Quantity: {order.get('executedQty', 'N/A')}")
+            
+        if args.metrics:
+            print()
+            get_latency_metrics().dump()
         
     except Exception as e:
         print(f"Error: {e}")